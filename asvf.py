@@ -23,6 +23,9 @@ COPYRIGHT:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTASvf:
@@ -36,6 +39,7 @@ class RVTASvf:
         self.level = "1-low"  # in prepare changed to int
         self.direction = 315.
         self.padding = int(self.max_rad)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
         self.mode_bytscl = "value"
@@ -126,13 +130,15 @@ class RVTASvf:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         no_data = props["noData"]
         if no_data is not None:
@@ -144,13 +150,13 @@ class RVTASvf:
         dict_asvf = rvt.vis.sky_view_factor(dem=dem, resolution=pixel_size[0], compute_svf=False, compute_asvf=True,
                                             compute_opns=False, svf_n_dir=self.nr_directions, svf_r_max=self.max_rad,
                                             svf_noise=self.noise, asvf_level=self.level, asvf_dir=self.direction,
-                                            no_data=no_data)
-        asvf = dict_asvf["asvf"][self.padding:-self.padding, self.padding:-self.padding]  # remove padding
+                                            no_data=no_data, overwrite_dem=True, halo=self.padding,
+                                            workspace=self.workspace)
+        asvf = dict_asvf["asvf"]  # computed without padding
         if self.calc_8_bit:
-            asvf = rvt.blend_func.normalize_image(visualization="anisotropic sky-view factor", image=asvf,
-                                                  min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                  normalization=self.mode_bytscl)
-            asvf = rvt.vis.byte_scale(data=asvf, no_data=no_data)
+            asvf = rvt.blend_func.normalize_byte_scale(visualization="anisotropic sky-view factor", image=asvf,
+                                                       min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                       normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = asvf.astype(props['pixelType'], copy=False)
 
@@ -180,24 +186,3 @@ class RVTASvf:
         self.level = int(level[0])
         self.calc_8_bit = bool(calc_8_bit)
         self.padding = int(max_rad)
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
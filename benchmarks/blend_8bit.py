@@ -0,0 +1,112 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Compares fixed point 8-bit blending (blend raster function with 8-bit inputs and output) with the float path on
+uint8 tiles, also tiles which include 0 and tiles with small range of values (which the float path doesn't scale
+by 1/255, so the raster function blends them in float). Prints max difference (DN) for each blend mode, time of
+both paths on tiles which are blended in fixed point and raises exception if any difference is larger than
+MAX_DIFFERENCE.
+
+Usage (from repository directory):
+    python benchmarks/blend_8bit.py
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import os
+import sys
+import time
+import warnings
+
+# python3 site-packages
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import blend  # noqa: E402
+import rvt.blend_func  # noqa: E402
+
+TILE_SIZE = 512
+MAX_DIFFERENCE = 1  # DN
+BLEND_MODES = ("normal", "multiply", "screen", "overlay", "soft_light", "luminosity")
+OPACITIES = (100, 50)
+
+
+def synthetic_tiles(size, rng):
+    """uint8 tiles (name: 2D array): full range, without 0, including 0, small ranges and constant."""
+    ramp = np.linspace(0, 1, size * size).reshape(size, size)
+    noise = rng.random((size, size))
+    return {
+        "range 0-255": np.round(noise * 255).astype(np.uint8),
+        "range 1-255": np.round(1 + noise * 254).astype(np.uint8),
+        "range 0-200": np.round(ramp * 200).astype(np.uint8),
+        "range 100-120": np.round(100 + noise * 20).astype(np.uint8),
+        "range 0-20": np.round(noise * 20).astype(np.uint8),
+        "range 1-2": np.round(1 + noise).astype(np.uint8),
+        "constant 128": np.full((size, size), 128, dtype=np.uint8),
+    }
+
+
+def render(function, top, background):
+    """Output of blend raster function for uint8 top and background tile (2D or 3D) and time (s)."""
+    props = {'cellSize': (1., 1.), 'pixelType': 'u1'}
+    pixel_blocks = {'topraster_pixels': top if top.ndim == 3 else top[np.newaxis],
+                    'bgraster_pixels': background if background.ndim == 3 else background[np.newaxis]}
+    start = time.perf_counter()
+    with warnings.catch_warnings():  # float path on constant tiles
+        warnings.simplefilter("ignore", RuntimeWarning)
+        output = function.updatePixels(None, None, props, **{name: pixels.copy() for name, pixels in
+                                                             pixel_blocks.items()})['output_pixels']
+    return output, time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    tiles = synthetic_tiles(TILE_SIZE, rng)
+    rgb = np.stack([tiles["range 1-255"], tiles["range 0-200"], tiles["range 0-255"]])
+    pairs = [(top_name, background_name, tiles[top_name], tiles[background_name])
+             for top_name in tiles for background_name in ("range 1-255", "range 0-255", "range 0-20")]
+    pairs.append(("rgb", "range 1-255", rgb, tiles["range 1-255"]))
+    pairs.append(("range 1-255", "rgb", tiles["range 1-255"], rgb))
+    failed = []
+    for blend_mode in BLEND_MODES:
+        for opacity in OPACITIES:
+            max_difference = 0
+            times = [0., 0.]
+            for top_name, background_name, top, background in pairs:
+                fixed_point = rvt.blend_func.scaled_by_255(top) and rvt.blend_func.scaled_by_255(background)
+                outputs = []
+                for i_path, integer_blend in enumerate((False, True)):
+                    function = blend.RVTBlend()
+                    function.prepare(blend_mode=blend_mode, opacity=opacity, calc_8_bit=True)
+                    function.integer_blend = integer_blend
+                    output, elapsed = render(function, top, background)
+                    outputs.append(output.astype(np.int16))
+                    if fixed_point:
+                        times[i_path] += elapsed
+                difference = int(np.abs(outputs[0] - outputs[1]).max())
+                max_difference = max(max_difference, difference)
+                if difference > MAX_DIFFERENCE:
+                    failed.append("{} {}% {} over {}: {} DN".format(blend_mode, opacity, top_name, background_name,
+                                                                  difference))
+            print("{:<11} opacity {:3d}%  max difference {:3d} DN  "
+              "fixed point tiles: float {:6.1f} ms, fixed point {:6.1f} ms".format(
+                blend_mode, opacity, max_difference, times[0] * 1000, times[1] * 1000))
+    if failed:
+        raise Exception("blend_8bit: fixed point differs from float path:\n" + "\n".join(failed))
+
+
+if __name__ == "__main__":
+    main()
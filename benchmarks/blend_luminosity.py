@@ -0,0 +1,161 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Compares rvt.blend_func.blend_luminosity (float32, one clipping scale per pixel with boolean masks) with the previous
+pipeline (float64 channels, clipping with np.where index tuples, copied below as previous_blend_luminosity) on
+synthetic 3 band tiles, with 1 and 3 band active images. Prints time of both and the speedup and raises exception if
+results differ more than MAX_DIFFERENCE.
+
+Usage (from repository directory):
+    python benchmarks/blend_luminosity.py
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import os
+import sys
+import time
+
+# python3 site-packages
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rvt.blend_func  # noqa: E402
+
+TILE_SIZE = 2000
+REPEATS = 3
+MAX_DIFFERENCE = 1e-4  # float32 rounding
+
+
+# previous luminosity pipeline (float64, np.where index tuples)
+def previous_lum(img):
+    if len(img.shape) == 3:
+        r = img[0]
+        g = img[1]
+        b = img[2]
+        lum_img = np.float32((0.3 * r) + (0.59 * g) + (0.11 * b))
+    else:
+        lum_img = img
+
+    return lum_img
+
+
+def previous_matrix_eq_min_lt_zero(r, idx_min_lt_zero, lum_c, min_c):
+    r[idx_min_lt_zero] = lum_c[idx_min_lt_zero] + (((r[idx_min_lt_zero] - lum_c[idx_min_lt_zero]) *
+                                                    lum_c[idx_min_lt_zero]) / (lum_c[idx_min_lt_zero] -
+                                                                               min_c[idx_min_lt_zero]))
+    return r
+
+
+def previous_matrix_eq_max_gt_one(r, idx_max_c_gt_one, lum_c, max_c):
+    r[idx_max_c_gt_one] = lum_c[idx_max_c_gt_one] + (((r[idx_max_c_gt_one] - lum_c[idx_max_c_gt_one]) *
+                                                      (1.0 - lum_c[idx_max_c_gt_one])) / (max_c[idx_max_c_gt_one]
+                                                                                          - lum_c[idx_max_c_gt_one]))
+    return r
+
+
+def previous_channel_min(r, g, b):
+    min_c = r * 1.0
+    idx_min = np.where(g < min_c)
+    min_c[idx_min] = g[idx_min]
+    idx_min = np.where(b < min_c)
+    min_c[idx_min] = b[idx_min]
+    return min_c
+
+
+def previous_channel_max(r, g, b):
+    max_c = r * 1.0
+    idx_max = np.where(g > max_c)
+    max_c[idx_max] = g[idx_max]
+    idx_max = np.where(b > max_c)
+    max_c[idx_max] = b[idx_max]
+    return max_c
+
+
+def previous_clip_color(c):
+    lum_c = previous_lum(c)
+
+    r = np.float32(c[0])
+    g = np.float32(c[1])
+    b = np.float32(c[2])
+
+    min_c = previous_channel_min(r, g, b)
+    max_c = previous_channel_max(r, g, b)
+
+    idx_min_lt_zero = np.where(min_c < 0)
+    r = previous_matrix_eq_min_lt_zero(r, idx_min_lt_zero, lum_c, min_c)
+    g = previous_matrix_eq_min_lt_zero(g, idx_min_lt_zero, lum_c, min_c)
+    b = previous_matrix_eq_min_lt_zero(b, idx_min_lt_zero, lum_c, min_c)
+
+    idx_max_c_gt_one = np.where(max_c > 1)
+    r = previous_matrix_eq_max_gt_one(r, idx_max_c_gt_one, lum_c, max_c)
+    g = previous_matrix_eq_max_gt_one(g, idx_max_c_gt_one, lum_c, max_c)
+    b = previous_matrix_eq_max_gt_one(b, idx_max_c_gt_one, lum_c, max_c)
+
+    c_out = np.zeros(c.shape)
+    c_out[0, :, :] = r
+    c_out[1, :, :] = g
+    c_out[2, :, :] = b
+    return c_out
+
+
+def previous_blend_luminosity(active, background):
+    lum_active = previous_lum(active)
+    lum_background = previous_lum(background)
+    luminosity = lum_active - lum_background
+
+    if len(background.shape) < 3:
+        return lum_active
+
+    c = np.zeros(background.shape)
+    c[0, :, :] = background[0] + luminosity
+    c[1, :, :] = background[1] + luminosity
+    c[2, :, :] = background[2] + luminosity
+
+    return previous_clip_color(c)
+
+
+def best_time(function, *args):
+    """Result and the best time (s) of REPEATS calls of function(*args)."""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    background = rng.random((3, TILE_SIZE, TILE_SIZE), dtype=np.float32)  # saturated colors clip often
+    actives = {"1 band active": rng.random((TILE_SIZE, TILE_SIZE), dtype=np.float32),
+               "3 band active": rng.random((3, TILE_SIZE, TILE_SIZE), dtype=np.float32)}
+    failed = []
+    for name, active in actives.items():
+        previous, previous_time = best_time(previous_blend_luminosity, active, background)
+        current, current_time = best_time(rvt.blend_func.blend_luminosity, active, background)
+        difference = float(np.abs(previous - current).max())
+        print("{:<14} previous (float64) {:6.3f} s  current (float32) {:6.3f} s  speedup {:4.1f}x  "
+              "max difference {:.1e}".format(name, previous_time, current_time, previous_time / current_time,
+                                             difference))
+        if difference > MAX_DIFFERENCE:
+            failed.append(name)
+    if failed:
+        raise Exception("blend_luminosity: results differ from previous pipeline: {}".format(", ".join(failed)))
+
+
+if __name__ == "__main__":
+    main()
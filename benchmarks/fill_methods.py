@@ -0,0 +1,101 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Compares methods of rvt.vis.fill_where_nan (idw, kd_tree, nearest_neighbour and laplace) on a synthetic DEM with
+small voids (dropouts and small holes) and with large voids (lake, quarry and void on the edge of the DEM). Prints
+time, number of unfilled pixels and error (RMSE, maximal absolute error) against the DEM without voids. Raises
+exception if laplace leaves any void pixel unfilled (every void in the synthetic DEM has valid neighbours).
+
+Usage (from repository directory):
+    python benchmarks/fill_methods.py
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import os
+import sys
+import time
+
+# python3 site-packages
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rvt.vis  # noqa: E402
+
+DEM_SIZE = 2000
+METHODS = ("idw", "kd_tree", "nearest_neighbour", "laplace")
+
+
+def synthetic_dem(size, rng):
+    """Smooth random DEM (float32) of size x size pixels, without voids."""
+    dem = np.cumsum(np.cumsum(rng.standard_normal((size, size)), axis=0), axis=1)
+    dem -= np.linspace(0, 1, size)[:, np.newaxis] * dem[-1:, :]  # remove drift of cumulative sums
+    dem -= np.linspace(0, 1, size)[np.newaxis, :] * dem[:, -1:]
+    y, x = np.mgrid[0:size, 0:size] / size
+    dem = (dem - dem.min()) / (dem.max() - dem.min()) * 50 + 200 * np.sin(3 * x) * np.cos(2 * y) + 300
+    return dem.astype(np.float32)
+
+
+def small_voids(size, rng):
+    """Void mask of 1 % single pixel dropouts and 200 holes of 2-8 pixels."""
+    mask = rng.random((size, size)) < 0.01
+    for row, column, height, width in zip(rng.integers(0, size - 8, 200), rng.integers(0, size - 8, 200),
+                                          rng.integers(2, 9, 200), rng.integers(2, 9, 200)):
+        mask[row:row + height, column:column + width] = True
+    return mask
+
+
+def large_voids(size):
+    """Void mask of a lake (radius 0.075 * size), a quarry (0.15 x 0.075 * size) and a void on the DEM edge."""
+    y, x = np.mgrid[0:size, 0:size]
+    mask = (y - 0.3 * size) ** 2 + (x - 0.3 * size) ** 2 < (0.075 * size) ** 2
+    mask[int(0.6 * size):int(0.675 * size), int(0.5 * size):int(0.65 * size)] = True
+    mask[int(0.8 * size):int(0.9 * size), :int(0.05 * size)] = True
+    return mask
+
+
+def fill(dem, mask, method):
+    """Filled copy of dem with voids (mask) and time of fill_where_nan (s)."""
+    dem_voids = dem.copy()
+    dem_voids[mask] = np.nan
+    start = time.perf_counter()
+    filled = rvt.vis.fill_where_nan(dem_voids, method=method)
+    return filled, time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    dem = synthetic_dem(DEM_SIZE, rng)
+    unfilled_laplace = []
+    for voids_name, mask in (("small voids", small_voids(DEM_SIZE, rng)), ("large voids", large_voids(DEM_SIZE))):
+        print("{} ({} x {} DEM, {} void pixels)".format(voids_name, DEM_SIZE, DEM_SIZE, np.count_nonzero(mask)))
+        for method in METHODS:
+            filled, elapsed = fill(dem, mask, method)
+            error = (filled - dem)[mask]
+            unfilled = np.count_nonzero(np.isnan(error))
+            error = error[~np.isnan(error)]
+            rmse = np.sqrt(np.mean(error.astype(np.float64) ** 2)) if error.size else np.nan
+            max_error = np.abs(error).max() if error.size else np.nan
+            print("    {:<18} {:7.2f} s  unfilled {:7d}  rmse {:7.2f}  max error {:7.2f}".format(
+                method, elapsed, unfilled, rmse, max_error))
+            if method == "laplace" and unfilled:
+                unfilled_laplace.append(voids_name)
+    if unfilled_laplace:
+        raise Exception("fill_methods: laplace left unfilled pixels: {}".format(", ".join(unfilled_laplace)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Checks import time of raster function (wrapper) modules. Each module is imported in a fresh python process (after
+numpy, which ArcGIS has already loaded) and the median time of REPEATS imports has to be under BUDGET_S. Heavy
+packages (HEAVY_PACKAGES) may not be loaded by the import, they are imported lazily by the functions that need them.
+Raises exception if any module is over budget or loads a heavy package.
+
+Usage (from repository directory):
+    python benchmarks/import_time.py [module ...]
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import compileall
+import glob
+import os
+import statistics
+import subprocess
+import sys
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_S = 0.060  # import time of one wrapper module (numpy already imported)
+REPEATS = 5
+HEAVY_PACKAGES = ("scipy", "matplotlib")
+
+# runs in fresh process, prints import time and loaded heavy packages
+IMPORT_SCRIPT = """
+import sys
+import time
+import numpy
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))))
+"""
+
+
+def wrapper_modules():
+    """Names of raster function modules (python files with raster function template of the same name)."""
+    return sorted(os.path.basename(path)[:-len(".rft.xml")]
+                  for path in glob.glob(os.path.join(REPOSITORY_DIR, "*.rft.xml"))
+                  if os.path.isfile(path[:-len(".rft.xml")] + ".py"))
+
+
+def import_time(module):
+    """Median import time (seconds) of module in fresh processes and heavy packages it loaded."""
+    times = []
+    heavy = set()
+    for _ in range(REPEATS):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT.format(module=module,
+                                                                                     heavy=HEAVY_PACKAGES)],
+                                         cwd=REPOSITORY_DIR, universal_newlines=True).split()
+        times.append(float(output[0]))
+        if len(output) > 1:
+            heavy.update(output[1].split(","))
+    return statistics.median(times), sorted(heavy)
+
+
+def main(modules=None):
+    compileall.compile_dir(REPOSITORY_DIR, quiet=1)  # measure import, not compilation
+    failed = []
+    for module in modules or wrapper_modules():
+        elapsed, heavy = import_time(module)
+        print("{:<18} {:6.1f} ms  {}".format(module, elapsed * 1000, "loads " + ", ".join(heavy) if heavy else ""))
+        if elapsed > BUDGET_S or heavy:
+            failed.append(module)
+    if failed:
+        raise Exception("import_time: over budget ({:.0f} ms) or heavy imports: {}".format(BUDGET_S * 1000,
+                                                                                         ", ".join(failed)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
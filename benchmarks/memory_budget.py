@@ -0,0 +1,100 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Checks peak memory of rvt.vis functions against a budget, measured with tracemalloc in units of one input tile
+(float32 DEM of TILE_SIZE x TILE_SIZE pixels), as wrappers call them (overwrite_dem=True). Raises exception if any
+function is over its budget.
+
+Usage (from repository directory):
+    python benchmarks/memory_budget.py
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import os
+import sys
+import tracemalloc
+
+# python3 site-packages
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rvt.vis  # noqa: E402
+
+TILE_SIZE = 600  # smaller tiles have relatively more fixed allocations
+# function: (peak budget in tiles, call with dem)
+BUDGETS = {
+    "slope_aspect": (8, lambda dem: rvt.vis.slope_aspect(dem=dem, resolution_x=2, resolution_y=2,
+                                                         output_units="degree", ve_factor=1.5, no_data=-9999,
+                                                         overwrite_dem=True)),
+    "hillshade": (8, lambda dem: rvt.vis.hillshade(dem=dem, resolution_x=1, resolution_y=1, no_data=-9999,
+                                                   overwrite_dem=True)),
+    "multi_hillshade": (24, lambda dem: rvt.vis.multi_hillshade(dem=dem, resolution_x=1, resolution_y=1,
+                                                               nr_directions=16, no_data=-9999,
+                                                               overwrite_dem=True)),
+    "slrm": (12, lambda dem: rvt.vis.slrm(dem=dem, radius_cell=20, no_data=-9999, overwrite_dem=True)),
+    "sky_view_factor": (7, lambda dem: rvt.vis.sky_view_factor(dem=dem, resolution=2, compute_svf=True,
+                                                               compute_asvf=True, compute_opns=True, svf_noise=1,
+                                                               ve_factor=2, no_data=-9999, overwrite_dem=True)),
+    "sky_view_factor (svf)": (5, lambda dem: rvt.vis.sky_view_factor(dem=dem, resolution=1, no_data=-9999,
+                                                                     overwrite_dem=True)),
+    "local_dominance": (5, lambda dem: rvt.vis.local_dominance(dem=dem, no_data=-9999, overwrite_dem=True)),
+    "msrm": (16, lambda dem: rvt.vis.msrm(dem=dem, resolution=1, feature_min=1, feature_max=20, scaling_factor=2,
+                                         no_data=-9999, overwrite_dem=True)),
+    "sky_illumination": (19, lambda dem: rvt.vis.sky_illumination(dem=dem, resolution=1, max_fine_radius=50,
+                                                                 no_data=-9999, overwrite_dem=True)),
+}
+
+
+def synthetic_dem(size):
+    """Smooth random DEM (float32) of size x size pixels with no data (-9999) hole."""
+    rng = np.random.default_rng(0)
+    dem = np.cumsum(np.cumsum(rng.standard_normal((size, size)), axis=0), axis=1)
+    dem = (dem - dem.min()) / (dem.max() - dem.min()) * 300 + 100
+    dem = dem.astype(np.float32)
+    dem[size // 10:size // 10 + 10, size // 8:size // 8 + 20] = -9999
+    return dem
+
+
+def peak_tiles(function, dem):
+    """Peak memory (traced by tracemalloc) of function(copy of dem) in units of dem size."""
+    dem = dem.copy()
+    if hasattr(rvt.vis, "clear_pyramid_cache"):
+        rvt.vis.clear_pyramid_cache()
+    tracemalloc.start()
+    try:
+        with np.errstate(divide="ignore", invalid="ignore"):  # no data hole
+            function(dem)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / dem.nbytes
+
+
+def main():
+    dem = synthetic_dem(TILE_SIZE)
+    over = []
+    for name, (budget, function) in BUDGETS.items():
+        peak = peak_tiles(function, dem)
+        print("{:<24} peak {:5.1f} tiles, budget {:3d}".format(name, peak, budget))
+        if peak > budget:
+            over.append(name)
+    if over:
+        raise Exception("memory_budget: over budget: {}".format(", ".join(over)))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,17 +20,21 @@ Copyright:
 
 import numpy as np
 import rvt.blend_func
+import rvt.stats
 import rvt.vis
+import rvt.workspace
 
 
 class RVTBlend:
     def __init__(self):
         self.name = "RVT blend"
         self.description = "Blend and render two images together."
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # default values
         self.blend_mode = "normal"
         self.opacity = 100.
         self.calc_8_bit = True
+        self.integer_blend = False  # both inputs 8-bit and 8-bit output, blend in fixed point
 
     def getParameterInfo(self):
         return [
@@ -97,16 +101,22 @@ class RVTBlend:
             kwargs['output_info']['bandCount'] = 3
         else:
             kwargs['output_info']['bandCount'] = 1
+        self.integer_blend = self.calc_8_bit and t.get('pixelType') == 'u1' and b.get('pixelType') == 'u1'
         kwargs['output_info']['noData'] = np.nan
         if not self.calc_8_bit:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['statistics'] = ()
-        kwargs['output_info']['histogram'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
+        if self.integer_blend and rvt.blend_func.scaled_by_255(pixelBlocks['topraster_pixels']) and \
+                rvt.blend_func.scaled_by_255(pixelBlocks['bgraster_pixels']):
+            return self.update_pixels_8bit(props, **pixelBlocks)
         top_raster = np.array(pixelBlocks['topraster_pixels'], dtype='f4', copy=False)
         if top_raster.shape[0] == 1:
             top_raster = top_raster[0]
@@ -122,12 +132,34 @@ class RVTBlend:
         if np.nanmin(background_raster) < 0 or np.nanmax(background_raster) > 1:
             background_raster = rvt.blend_func.scale_0_to_1(background_raster)
 
+        blend_shape = np.broadcast(top_raster, background_raster).shape
         top_raster = rvt.blend_func.blend_images(blend_mode=self.blend_mode, active=top_raster,
-                                                 background=background_raster)
+                                                 background=background_raster,
+                                                 out=self.workspace.empty("blend", blend_shape, np.float32))
         rendered_image = rvt.blend_func.render_images(active=top_raster, background=background_raster,
                                                       opacity=self.opacity)
         if self.calc_8_bit:
-            rendered_image = rvt.vis.byte_scale(data=rendered_image, c_min=0.0, c_max=1.0)
+            rendered_image = rvt.blend_func.normalize_byte_scale(visualization=None, image=rendered_image,
+                                                                 min_norm=0.0, max_norm=1.0, normalization="value")
+
+        pixelBlocks['output_pixels'] = rendered_image.astype(props['pixelType'], copy=False)
+
+        return pixelBlocks
+
+    def update_pixels_8bit(self, props, **pixelBlocks):
+        # 8-bit inputs (0-255 means 0-1) blended in fixed point integer arithmetic, within 1 of float path, used only
+        # for tiles which float path scales by dividing with 255 (tiles with 0 or small range are scaled differently)
+        top_raster = np.array(pixelBlocks['topraster_pixels'], dtype='u1', copy=False)
+        if top_raster.shape[0] == 1:
+            top_raster = top_raster[0]
+        background_raster = np.array(pixelBlocks['bgraster_pixels'], dtype='u1', copy=False)
+        if background_raster.shape[0] == 1:
+            background_raster = background_raster[0]
+
+        top_raster = rvt.blend_func.blend_images_8bit(blend_mode=self.blend_mode, active=top_raster,
+                                                      background=background_raster)
+        rendered_image = rvt.blend_func.render_images_8bit(active=top_raster, background=background_raster,
+                                                           opacity=self.opacity)
 
         pixelBlocks['output_pixels'] = rendered_image.astype(props['pixelType'], copy=False)
 
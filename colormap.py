@@ -20,6 +20,7 @@ Copyright:
 
 import numpy as np
 import rvt.blend_func
+import rvt.stats
 
 
 class RVTColormap:
@@ -108,8 +109,10 @@ class RVTColormap:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['statistics'] = ()
-        kwargs['output_info']['histogram'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
@@ -143,3 +146,6 @@ class RVTColormap:
         self.min_colormap_cut = float(min_colormap_cut)
         self.max_colormap_cut = float(max_colormap_cut)
         self.calc_8_bit = calc_8_bit
+        # compile colormap lookup table once, not on first tile
+        rvt.blend_func.colormap_lut(colormap=self.colormap, min_colormap_cut=self.min_colormap_cut,
+                                    max_colormap_cut=self.max_colormap_cut, output_8bit=bool(self.calc_8_bit))
@@ -0,0 +1,163 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+RVT Composite esri raster function
+rvt_py, rvt.composite.composite
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+import numpy as np
+import rvt.composite
+import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
+
+
+class RVTComposite:
+    def __init__(self):
+        self.name = "RVT composite"
+        self.description = "Computes composite of blended visualizations (e.g. VAT) in one raster function."
+        # default values
+        self.preset = "VAT general"
+        self.layers_json = ""
+        self.layers = rvt.composite.get_layers(preset=self.preset)
+        self.padding = rvt.composite.layers_padding(self.layers)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
+        self.calc_8_bit = True
+        # global (whole raster) histograms for percent normalization of layers
+        self.histograms = {}
+
+    def getParameterInfo(self):
+        return [
+            {
+                'name': 'raster',
+                'dataType': 'raster',
+                'value': None,
+                'required': True,
+                'displayName': "Input Raster",
+                'description': "Input raster (elevation model) for which to create the composite."
+            },
+            {
+                'name': 'calc_8_bit',
+                'dataType': 'boolean',
+                'value': self.calc_8_bit,
+                'required': False,
+                'displayName': "Calculate 8-bit",
+                'description': "If True it returns 8-bit raster (0-255)."
+            },
+            {
+                'name': 'preset',
+                'dataType': 'string',
+                'value': self.preset,
+                'required': False,
+                'displayName': "Composite",
+                'domain': ("VAT general", "VAT flat", "VAT steep", "Prism openness general", "Prism openness flat",
+                           "Prism openness steep", "MSTP enhanced", "Custom"),
+                'description': "Composite preset, if Custom layers are used."
+            },
+            {
+                'name': 'layers',
+                'dataType': 'string',
+                'value': self.layers_json,
+                'required': False,
+                'displayName': "Layers",
+                'description': "Custom composite layers from top to bottom as JSON list, each layer with "
+                               "visualization, params, normalization, minimum, maximum, blend_mode and opacity "
+                               "(see rvt.composite)."
+            }
+        ]
+
+    def getConfiguration(self, **scalars):
+        self.prepare(preset=scalars.get('preset'), layers=scalars.get('layers'),
+                     calc_8_bit=scalars.get('calc_8_bit'))
+        return {
+            'compositeRasters': False,
+            'inheritProperties': 2 | 4,
+            'invalidateProperties': 2 | 4 | 8,
+            'inputMask': False,
+            'resampling': False,
+            'padding': self.padding,
+            'resamplingType': 1
+        }
+
+    def updateRasterInfo(self, **kwargs):
+        kwargs['output_info']['bandCount'] = rvt.composite.layers_band_count(self.layers)
+        kwargs['output_info']['noData'] = np.nan
+        if not self.calc_8_bit:
+            kwargs['output_info']['pixelType'] = 'f4'
+        else:
+            kwargs['output_info']['pixelType'] = 'u1'
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
+        # percent cut-offs from histograms of layer visualizations of windows sampled from whole input raster
+        r = kwargs['raster_info']
+        self.histograms = {}
+        for i_layer, layer in enumerate(rvt.composite.leaf_layers(self.layers)):
+            if layer["normalization"] not in ("perc", "percent"):
+                continue
+            histograms = rvt.stats.output_histograms(
+                kwargs.get('raster'), r, ("composite", layer["visualization"], sorted(layer["params"].items())),
+                lambda dem, layer=layer: rvt.composite.layer_visualization(layer, dem, r['cellSize'][0], self.padding),
+                padding=self.padding)
+            if histograms is not None:
+                self.histograms[i_layer] = histograms[0].copy()
+                for histogram in histograms[1:]:
+                    self.histograms[i_layer].merge(histogram)
+        return kwargs
+
+    def updatePixels(self, tlc, shape, props, **pixelBlocks):
+        dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
+        pixel_size = props['cellSize']
+        if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
+            raise Exception("Input raster cell size is invalid.")
+        no_data = props["noData"]
+        if no_data is not None:
+            no_data = props["noData"][0]
+
+        composite = rvt.composite.composite(dem=dem, resolution=pixel_size[0], layers=self.layers,
+                                            padding=self.padding, no_data=no_data, histograms=self.histograms,
+                                            workspace=self.workspace)
+        if self.calc_8_bit:
+            composite = rvt.blend_func.normalize_byte_scale(visualization=None, image=composite, min_norm=0.0,
+                                                            max_norm=1.0, normalization="value")
+
+        pixelBlocks['output_pixels'] = composite.astype(props['pixelType'], copy=False)
+
+        return pixelBlocks
+
+    def updateKeyMetadata(self, names, bandIndex, **keyMetadata):
+        if bandIndex == -1:
+            name = 'COMPOSITE_{}'.format(self.preset.replace(" ", "_"))
+            if self.calc_8_bit:
+                keyMetadata['datatype'] = 'Processed'
+                name += "_8bit"
+            else:
+                keyMetadata['datatype'] = 'Generic'
+            keyMetadata['productname'] = 'RVT {}'.format(name)
+        return keyMetadata
+
+    def prepare(self, preset="VAT general", layers="", calc_8_bit=False):
+        self.preset = str(preset)
+        self.layers_json = layers or ""
+        if self.preset.lower() == "custom":
+            self.layers = rvt.composite.get_layers(layers=self.layers_json)
+        else:
+            self.layers = rvt.composite.get_layers(preset=self.preset)
+        self.padding = max(rvt.composite.layers_padding(self.layers), 1)
+        self.calc_8_bit = calc_8_bit
@@ -2,7 +2,7 @@
 Relief Visualization Toolbox – Visualization Functions
 
 RVT Convert to 8bit esri raster function
-rvt_py, rvt.vis.byte_scale
+rvt_py, rvt.blend_func.normalize_byte_scale
 
 Credits:
     Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
@@ -19,13 +19,16 @@ Copyright:
 """
 # TODO: Add cmin and cmax! use minimum and maximum from normalization
 import numpy as np
-import rvt.vis
+import rvt.blend_func
+import rvt.stats
 
 
 class RVTto8Bit:
     def __init__(self):
         self.name = "RVT Convert to 8bit"
         self.description = "Convert image values 0-255 (Byte scale)."
+        # global (whole raster) minimum and maximum of each band
+        self.band_ranges = None
 
     def getParameterInfo(self):
         return [
@@ -59,8 +62,17 @@ class RVTto8Bit:
             kwargs['output_info']['bandCount'] = 1
         kwargs['output_info']['noData'] = np.nan
         kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        self.band_ranges = None
+        try:  # band statistics of whole raster
+            self.band_ranges = [(float(band["minimum"]), float(band["maximum"])) for band in r["statistics"]]
+        except (KeyError, TypeError, ValueError):
+            self.band_ranges = None
+        if not self.band_ranges:  # decimated read of whole input raster
+            self.band_ranges = None
+            histograms = rvt.stats.input_histograms(kwargs.get('raster'), r)
+            if histograms is not None:
+                self.band_ranges = [tuple(histogram.percentile([0, 100])) for histogram in histograms]
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
@@ -71,7 +83,19 @@ class RVTto8Bit:
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
 
-        bytescl_raster = rvt.vis.byte_scale(data=dem)
+        bytescl_raster = np.empty(dem.shape, dtype=np.uint8)
+        bands = list(np.ndindex(dem.shape[:-2]))
+        if self.band_ranges is not None and len(self.band_ranges) == len(bands):
+            for i_band, (minimum, maximum) in zip(bands, self.band_ranges):  # stretch between raster min and max
+                rvt.blend_func.normalize_byte_scale(visualization=None, image=dem[i_band], min_norm=minimum,
+                                                    max_norm=max(maximum, minimum + 1e-6), normalization="value",
+                                                    out=bytescl_raster[i_band])
+        else:
+            histograms = rvt.blend_func.image_histogram(dem, per_band=True)  # all bands in one pass
+            for i_band, histogram in zip(bands, histograms):  # each band is stretched between its tile min and max
+                rvt.blend_func.normalize_byte_scale(visualization=None, image=dem[i_band], min_norm=0, max_norm=0,
+                                                    normalization="perc", out=bytescl_raster[i_band],
+                                                    histogram=histogram)
 
         pixelBlocks['output_pixels'] = bytescl_raster.astype(props['pixelType'], copy=False)
 
@@ -81,3 +105,7 @@ class RVTto8Bit:
         if bandIndex == -1:
             keyMetadata['datatype'] = 'Processed'
             keyMetadata['productname'] = 'RVT 8-bit'
+        return keyMetadata
+
+    def prepare(self):
+        pass
@@ -0,0 +1,139 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+RVT Fill no data esri raster function
+rvt_py, rvt.vis.fill_where_nan
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+import numpy as np
+import rvt.vis
+import rvt.stats
+import rvt.padding
+
+
+class RVTFillNan:
+    def __init__(self):
+        self.name = "RVT fill no data"
+        self.description = "Fills no data (voids) in the elevation model."
+        # default values
+        self.method = "idw"
+        self.radius = 20.
+        self.power = 2.
+        self.padding = int(self.radius)
+
+    def getParameterInfo(self):
+        return [
+            {
+                'name': 'raster',
+                'dataType': 'raster',
+                'value': None,
+                'required': True,
+                'displayName': "Input Raster",
+                'description': "Input raster (elevation model) with voids (no data) to fill."
+            },
+            {
+                'name': 'method',
+                'dataType': 'string',
+                'value': self.method,
+                'required': False,
+                'displayName': "Method",
+                'domain': ("idw", "kd_tree", "nearest_neighbour", "laplace", "linear_row"),
+                'description': "Interpolation method (idw - Inverse Distance Weighting, kd_tree, nearest_neighbour,"
+                               " laplace - Laplace inpainting, linear_row)."
+            },
+            {
+                'name': 'radius',
+                'dataType': 'numeric',
+                'value': self.radius,
+                'required': False,
+                'displayName': "Radius",
+                'description': "Interpolation radius in pixels (also tile padding)."
+            },
+            {
+                'name': 'power',
+                'dataType': 'numeric',
+                'value': self.power,
+                'required': False,
+                'displayName': "Power",
+                'description': "Power of inverse distance weights (only idw)."
+            }
+        ]
+
+    def getConfiguration(self, **scalars):
+        self.prepare(method=scalars.get('method'), radius=scalars.get('radius'), power=scalars.get('power'))
+        return {
+            'compositeRasters': False,
+            'inheritProperties': 2 | 4,
+            'invalidateProperties': 2 | 4 | 8,
+            'inputMask': False,
+            'resampling': False,
+            'padding': self.padding,
+            'resamplingType': 1
+        }
+
+    def updateRasterInfo(self, **kwargs):
+        kwargs['output_info']['bandCount'] = 1
+        kwargs['output_info']['noData'] = np.nan
+        kwargs['output_info']['pixelType'] = 'f4'
+        # filled values are interpolated between valid values, so the range of input is kept
+        r = kwargs['raster_info']
+        statistics = r.get('statistics') or ()
+        if len(statistics) > 0 and 'minimum' in statistics[0] and 'maximum' in statistics[0]:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=statistics[0]['minimum'],
+                                            maximum=statistics[0]['maximum'])
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'])
+        return kwargs
+
+    def updatePixels(self, tlc, shape, props, **pixelBlocks):
+        dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
+        no_data = props["noData"]
+        if no_data is not None:
+            no_data = props["noData"][0]
+        if no_data is not None and not np.isnan(no_data):
+            dem = np.where(dem == no_data, np.float32(np.nan), dem)
+        if not np.isnan(dem[self.padding:-self.padding, self.padding:-self.padding]).any():  # no voids in tile
+            pixelBlocks['output_pixels'] = dem[np.newaxis, self.padding:-self.padding,
+                                               self.padding:-self.padding].astype(props['pixelType'], copy=False)
+            return pixelBlocks
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
+
+        if self.method == "idw":
+            method = "idw_{}_{}".format(self.radius, self.power)
+        else:
+            method = self.method
+        dem_fill = rvt.vis.fill_where_nan(dem=dem, method=method)
+        dem_fill = dem_fill[self.padding:-self.padding, self.padding:-self.padding]  # remove padding
+
+        pixelBlocks['output_pixels'] = dem_fill[np.newaxis].astype(props['pixelType'], copy=False)
+
+        return pixelBlocks
+
+    def updateKeyMetadata(self, names, bandIndex, **keyMetadata):
+        if bandIndex == -1:
+            if self.method == "idw":
+                name = "FILL_IDW_R{}_P{}".format(self.radius, self.power)
+            else:
+                name = "FILL_{}".format(self.method.upper())
+            keyMetadata['datatype'] = 'Generic'
+            keyMetadata['productname'] = 'RVT {}'.format(name)
+        return keyMetadata
+
+    def prepare(self, method="idw", radius=20, power=2):
+        self.method = str(method).lower()
+        self.radius = int(radius)
+        self.power = float(power)
+        self.padding = max(int(radius), 1)
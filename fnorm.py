@@ -20,6 +20,7 @@ Copyright:
 
 import numpy as np
 import rvt.blend_func
+import rvt.stats
 
 
 class RVTNormalize:
@@ -31,6 +32,8 @@ class RVTNormalize:
         self.minimum = 0.
         self.maximum = 1.
         self.normalization = "value"
+        # global (whole raster) histogram for percent normalization
+        self.histogram = None
 
     def getParameterInfo(self):
         return [
@@ -101,8 +104,16 @@ class RVTNormalize:
             kwargs['output_info']['bandCount'] = 1
         kwargs['output_info']['noData'] = np.nan
         kwargs['output_info']['pixelType'] = 'f4'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
+        self.histogram = None
+        if self.normalization == "perc":  # percent cut-offs from histogram of whole raster (all bands)
+            histograms = rvt.stats.histograms_from_raster_info(r)
+            if histograms is None:  # decimated read of whole input raster
+                histograms = rvt.stats.input_histograms(kwargs.get('raster'), r)
+            if histograms is not None:
+                self.histogram = histograms[0].copy()
+                for histogram in histograms[1:]:
+                    self.histogram.merge(histogram)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
@@ -113,9 +124,19 @@ class RVTNormalize:
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
 
+        min_norm = self.minimum
+        max_norm = self.maximum
+        normalization = self.normalization
+        if self.normalization == "perc" and self.histogram is not None:  # global cut-offs
+            cutoffs = self.histogram.cutoffs(self.minimum, self.maximum)
+            if cutoffs["min_lin"] < cutoffs["max_lin"]:
+                min_norm = cutoffs["min_lin"]
+                max_norm = cutoffs["max_lin"]
+                normalization = "value"
+
         normalized_raster = rvt.blend_func.normalize_image(visualization=self.visualization,
-                                                           image=dem, min_norm=self.minimum, max_norm=self.maximum,
-                                                           normalization=self.normalization)
+                                                           image=dem, min_norm=min_norm, max_norm=max_norm,
+                                                           normalization=normalization)
 
         pixelBlocks['output_pixels'] = normalized_raster.astype(props['pixelType'], copy=False)
 
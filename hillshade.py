@@ -21,6 +21,8 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
 
 
 class RVTHillshade:
@@ -92,16 +94,15 @@ class RVTHillshade:
         kwargs['output_info']['noData'] = np.nan
         if not self.calc_8_bit:
             kwargs['output_info']['pixelType'] = 'f4'
-            kwargs['output_info']['statistics'] = ({'minimum': 0, 'maximum': 1})
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-            kwargs['output_info']['statistics'] = ({'minimum': 0, 'maximum': 255})
-        kwargs['output_info']['histogram'] = ()
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -111,13 +112,12 @@ class RVTHillshade:
 
         hillshade = rvt.vis.hillshade(dem=dem, resolution_x=pixel_size[0],
                                       resolution_y=pixel_size[1], sun_azimuth=self.azimuth,
-                                      sun_elevation=self.elevation, no_data=no_data)
+                                      sun_elevation=self.elevation, no_data=no_data, overwrite_dem=True)
         hillshade = hillshade[self.padding:-self.padding, self.padding:-self.padding]  # remove padding
         if self.calc_8_bit:
-            hillshade = rvt.blend_func.normalize_image(visualization="hillshade", image=hillshade,
-                                                       min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                       normalization=self.mode_bytscl)
-            hillshade = rvt.vis.byte_scale(data=hillshade, no_data=no_data)
+            hillshade = rvt.blend_func.normalize_byte_scale(visualization="hillshade", image=hillshade,
+                                                            min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                            normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = hillshade.astype(props['pixelType'], copy=False)
 
@@ -138,24 +138,3 @@ class RVTHillshade:
         self.azimuth = float(azimuth)
         self.elevation = float(elevation)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
@@ -23,6 +23,9 @@ COPYRIGHT:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTLocalDominance:
@@ -36,6 +39,7 @@ class RVTLocalDominance:
         self.anglr_res = 15.
         self.observer_h = 1.7
         self.padding = int(self.max_rad)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
         self.mode_bytscl = "value"
@@ -126,13 +130,23 @@ class RVTLocalDominance:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:  # statistics of windows sampled from whole input raster
+            rvt.stats.set_output_statistics(kwargs['output_info'], histograms=rvt.stats.output_histograms(
+                kwargs.get('raster'), r, ("local_dom", self.min_rad, self.max_rad, self.rad_inc, self.anglr_res,
+                                          self.observer_h), self.sample_visualization, padding=self.padding))
         return kwargs
 
+    def sample_visualization(self, dem):
+        """Visualization of window with padding (see rvt.stats.output_histograms), the same as in updatePixels."""
+        return rvt.vis.local_dominance(dem=dem, min_rad=self.min_rad, max_rad=self.max_rad, rad_inc=self.rad_inc,
+                                       angular_res=self.anglr_res, observer_height=self.observer_h,
+                                       overwrite_dem=True, halo=self.padding)  # computed without padding
+
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -142,13 +156,14 @@ class RVTLocalDominance:
 
         local_dominance = rvt.vis.local_dominance(dem=dem, min_rad=self.min_rad, max_rad=self.max_rad,
                                                   rad_inc=self.rad_inc, angular_res=self.anglr_res,
-                                                  observer_height=self.observer_h, no_data=no_data)
-        local_dominance = local_dominance[self.padding:-self.padding, self.padding:-self.padding]  # remove padding
+                                                  observer_height=self.observer_h, no_data=no_data,
+                                                  overwrite_dem=True, halo=self.padding,
+                                                  workspace=self.workspace)  # computed without padding
         if self.calc_8_bit:
-            local_dominance = rvt.blend_func.normalize_image(visualization="local dominance", image=local_dominance,
-                                                             min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                             normalization=self.mode_bytscl)
-            local_dominance = rvt.vis.byte_scale(data=local_dominance, no_data=no_data)
+            local_dominance = rvt.blend_func.normalize_byte_scale(visualization="local dominance",
+                                                                  image=local_dominance,
+                                                                  min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                                  normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = local_dominance.astype(props['pixelType'], copy=False)
 
@@ -175,24 +190,3 @@ class RVTLocalDominance:
         self.observer_h = float(observer_h)
         self.padding = int(max_rad)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
@@ -21,6 +21,9 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTMsrm:
@@ -32,6 +35,7 @@ class RVTMsrm:
         self.feature_max = 20.
         self.scaling_factor = 2.
         self.padding = 1  # set in prepare
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
         self.mode_bytscl = "value"
@@ -114,13 +118,23 @@ class RVTMsrm:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:  # statistics of windows sampled from whole input raster
+            rvt.stats.set_output_statistics(kwargs['output_info'], histograms=rvt.stats.output_histograms(
+                kwargs.get('raster'), r, ("msrm", self.feature_min, self.feature_max, self.scaling_factor),
+                lambda dem: self.sample_visualization(dem, r['cellSize']), padding=self.padding))
         return kwargs
 
+    def sample_visualization(self, dem, pixel_size):
+        """Visualization of window with padding (see rvt.stats.output_histograms), the same as in updatePixels."""
+        msrm = rvt.vis.msrm(dem=dem, resolution=pixel_size[0], feature_min=self.feature_min,
+                            feature_max=self.feature_max, scaling_factor=self.scaling_factor, overwrite_dem=True)
+        return msrm[self.padding:-self.padding, self.padding:-self.padding]
+
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -131,13 +145,12 @@ class RVTMsrm:
 
         msrm = rvt.vis.msrm(dem=dem, resolution=pixel_size[0], feature_min=self.feature_min,
                             feature_max=self.feature_max, scaling_factor=self.scaling_factor,
-                            no_data=no_data)
+                            no_data=no_data, overwrite_dem=True, workspace=self.workspace)
         msrm = msrm[self.padding:-self.padding, self.padding:-self.padding]
         if self.calc_8_bit:
-            msrm = rvt.blend_func.normalize_image(visualization="multi-scale relief model", image=msrm,
-                                                  min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                  normalization=self.mode_bytscl)
-            msrm = rvt.vis.byte_scale(data=msrm, no_data=no_data)
+            msrm = rvt.blend_func.normalize_byte_scale(visualization="multi-scale relief model", image=msrm,
+                                                       min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                       normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = msrm.astype(props['pixelType'], copy=False)
 
@@ -162,24 +175,3 @@ class RVTMsrm:
         n = int(np.ceil(((self.feature_max - resolution) / (2 * resolution)) ** (1 / self.scaling_factor)))
         self.padding = n ** self.scaling_factor
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
\ No newline at end of file
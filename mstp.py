@@ -24,6 +24,10 @@ COPYRIGHT:
 import numpy as np
 
 import rvt.vis
+import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTMstp:
@@ -43,6 +47,7 @@ class RVTMstp:
         self.broad_scale_step = 50.
         self.lightness = 1.2
         self.padding = int(self.broad_scale_max)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
 
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
@@ -182,13 +187,15 @@ class RVTMstp:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         no_data = props["noData"]
         if no_data is not None:
             no_data = props["noData"][0]
@@ -199,16 +206,20 @@ class RVTMstp:
             meso_scale=(self.meso_scale_min, self.meso_scale_max, self.meso_scale_step),
             broad_scale=(self.broad_scale_min, self.broad_scale_max, self.broad_scale_step),
             lightness=self.lightness,
-            no_data=no_data
+            no_data=no_data,
+            overwrite_dem=True,
+            workspace=self.workspace
         )
         mstp = mstp[:, self.padding:-self.padding, self.padding:-self.padding]  # remove padding
 
         if self.calc_8_bit:
-            mstp = rvt.vis.byte_scale(
-                data=mstp,
-                no_data=no_data,
-                c_min=self.min_bytscl,
-                c_max=self.max_bytscl
+            mstp = rvt.blend_func.normalize_byte_scale(
+                visualization="multi-scale topographic position",
+                image=mstp,
+                min_norm=self.min_bytscl,
+                max_norm=self.max_bytscl,
+                normalization="value",
+                no_data=no_data
             )
 
         pixelBlocks['output_pixels'] = mstp.astype(props['pixelType'], copy=False)
@@ -252,24 +263,3 @@ class RVTMstp:
         self.lightness = float(lightness)
         self.padding = int(self.broad_scale_max)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
@@ -21,6 +21,7 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.padding
 
 
 class RVTMultiHillshade:
@@ -93,7 +94,7 @@ class RVTMultiHillshade:
         if self.calc_8_bit:
             kwargs['output_info']['pixelType'] = 'u1'
             kwargs['output_info']['bandCount'] = 3
-            kwargs['output_info']['statistics'] = int(self.nr_directions) * ({'minimum': 0, 'maximum': 255},)
+            kwargs['output_info']['statistics'] = 3 * ({'minimum': 0, 'maximum': 255},)
         else:
             kwargs['output_info']['pixelType'] = 'f4'
             kwargs['output_info']['bandCount'] = int(self.nr_directions)
@@ -102,7 +103,7 @@ class RVTMultiHillshade:
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -111,43 +112,31 @@ class RVTMultiHillshade:
             no_data = props["noData"][0]
 
         dict_slp_asp = rvt.vis.slope_aspect(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
-                                            ve_factor=1, no_data=no_data)
+                                            ve_factor=1, no_data=no_data, overwrite_dem=True)
 
         if self.calc_8_bit:  # calc 8 bit
-            hillshade_r = rvt.vis.hillshade(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
-                                            sun_azimuth=315, sun_elevation=self.elevation,
-                                            slope=dict_slp_asp["slope"], aspect=dict_slp_asp["aspect"],
-                                            no_data=no_data)
-            hillshade_g = rvt.vis.hillshade(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
-                                            sun_azimuth=22.5, sun_elevation=self.elevation,
-                                            slope=dict_slp_asp["slope"], aspect=dict_slp_asp["aspect"],
-                                            no_data=no_data)
-            hillshade_b = rvt.vis.hillshade(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
-                                            sun_azimuth=90, sun_elevation=self.elevation,
-                                            slope=dict_slp_asp["slope"], aspect=dict_slp_asp["aspect"],
-                                            no_data=no_data)
-            if self.mode_bytscl.lower() == "value":
-                hillshade_r = rvt.blend_func.normalize_lin(image=hillshade_r, minimum=self.min_bytscl,
-                                                           maximum=self.max_bytscl)
-                hillshade_r = rvt.vis.byte_scale(data=hillshade_r, no_data=no_data)
-                hillshade_g = rvt.blend_func.normalize_lin(image=hillshade_g, minimum=self.min_bytscl,
-                                                           maximum=self.max_bytscl)
-                hillshade_g = rvt.vis.byte_scale(data=hillshade_g, no_data=no_data)
-                hillshade_b = rvt.blend_func.normalize_lin(image=hillshade_b, minimum=self.min_bytscl,
-                                                           maximum=self.max_bytscl)
-                hillshade_b = rvt.vis.byte_scale(data=hillshade_b, no_data=no_data)
-            else:  # self.mode_bytscl == "perc" or "percent"
-                hillshade_r = rvt.blend_func.normalize_perc(image=hillshade_r, minimum=self.min_bytscl,
-                                                            maximum=self.max_bytscl)
-                hillshade_r = rvt.vis.byte_scale(data=hillshade_r, no_data=no_data)
-                hillshade_g = rvt.blend_func.normalize_perc(image=hillshade_g, minimum=self.min_bytscl,
-                                                            maximum=self.max_bytscl)
-                hillshade_g = rvt.vis.byte_scale(data=hillshade_g, no_data=no_data)
-                hillshade_b = rvt.blend_func.normalize_perc(image=hillshade_b, minimum=self.min_bytscl,
-                                                            maximum=self.max_bytscl)
-                hillshade_b = rvt.vis.byte_scale(data=hillshade_b, no_data=no_data)
-
-            hillshade_rgb = np.array([hillshade_r, hillshade_g, hillshade_b])
+            sun_azimuths = (315, 22.5, 90)
+            hillshades = None
+            histograms = [None] * len(sun_azimuths)
+            if self.mode_bytscl.lower() in ("perc", "percent"):  # all bands first, their histograms in one pass
+                for i_band, sun_azimuth in enumerate(sun_azimuths):
+                    hillshade = self.hillshade(dem, pixel_size, sun_azimuth, dict_slp_asp, no_data)
+                    if hillshades is None:
+                        hillshades = np.empty((len(sun_azimuths),) + hillshade.shape, dtype=np.float32)
+                    hillshades[i_band] = hillshade
+                histograms = rvt.blend_func.image_histogram(hillshades, per_band=True)
+            hillshade_rgb = None
+            for i_band, sun_azimuth in enumerate(sun_azimuths):
+                if hillshades is None:
+                    hillshade = self.hillshade(dem, pixel_size, sun_azimuth, dict_slp_asp, no_data)
+                else:
+                    hillshade = hillshades[i_band]
+                if hillshade_rgb is None:
+                    hillshade_rgb = np.empty((3,) + hillshade.shape, dtype=np.uint8)
+                rvt.blend_func.normalize_byte_scale(visualization="hillshade", image=hillshade,
+                                                    min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                    normalization=self.mode_bytscl, no_data=no_data,
+                                                    out=hillshade_rgb[i_band], histogram=histograms[i_band])
             pixelBlocks['output_pixels'] = hillshade_rgb.astype(props['pixelType'], copy=False)
         else:  # calc nr_directions
             multihillshade = rvt.vis.multi_hillshade(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
@@ -158,6 +147,11 @@ class RVTMultiHillshade:
 
         return pixelBlocks
 
+    def hillshade(self, dem, pixel_size, sun_azimuth, dict_slp_asp, no_data):
+        return rvt.vis.hillshade(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
+                                 sun_azimuth=sun_azimuth, sun_elevation=self.elevation, slope=dict_slp_asp["slope"],
+                                 aspect=dict_slp_asp["aspect"], no_data=no_data)
+
     def updateKeyMetadata(self, names, bandIndex, **keyMetadata):
         if bandIndex == -1:
             name = 'MULTI-HS_D{}_H{}'.format(self.nr_directions, self.elevation)
@@ -186,24 +180,3 @@ class RVTMultiHillshade:
         self.nr_directions = int(nr_directions)
         self.elevation = float(elevation)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
@@ -23,8 +23,9 @@ Copyright:
 import warnings
 
 import numpy as np
-from matplotlib.cm import get_cmap
-from matplotlib.colors import LinearSegmentedColormap
+# matplotlib (slow to import) is imported only when colormap lookup table is compiled (colormap_lut)
+
+import rvt.stats
 
 
 def gray_scale_to_color_ramp(gray_scale, colormap, min_colormap_cut=None, max_colormap_cut=None, alpha=False,
@@ -55,8 +56,30 @@ def gray_scale_to_color_ramp(gray_scale, colormap, min_colormap_cut=None, max_co
     rgba_out : np.array (3D: red 0-255, green 0-255, blue 0-255)
             If alpha False: np.array (4D: red 0-255, green 0-255, blue 0-255, alpha 0-255)
     """
-    cm = get_cmap(colormap)
+    lut = colormap_lut(colormap=colormap, min_colormap_cut=min_colormap_cut, max_colormap_cut=max_colormap_cut,
+                       output_8bit=output_8bit)
+    if not alpha:  # Discard 4th band if not using Alpha
+        lut = lut[:3]
+    # (bands, x, y) directly from lookup table
+    rgba_out = np.take(lut, colormap_lut_index(gray_scale, lut.shape[1] - 3), axis=1)
+
+    return rgba_out
+
+
+_colormap_luts = {}  # (colormap, min_colormap_cut, max_colormap_cut, output_8bit): lookup table
+
+
+def colormap_lut(colormap, min_colormap_cut=None, max_colormap_cut=None, output_8bit=True):
+    """
+    Lookup table (compiled once and cached) of matplotlib colormap (truncated with min_colormap_cut and
+    max_colormap_cut, see gray_scale_to_color_ramp).
 
+    Returns
+    -------
+    lut : np.array (2D: 4 bands (RGBA) x N + 3 entries)
+        N colors of colormap followed by under (< 0), over (> 1) and bad (np.nan) color, uint8 (0-255) if
+        output_8bit else float32 (0-1).
+    """
     # Truncate colormap if required
     if min_colormap_cut is not None or max_colormap_cut is not None:
         if min_colormap_cut is None:
@@ -69,27 +92,49 @@ def gray_scale_to_color_ramp(gray_scale, colormap, min_colormap_cut=None, max_co
         if min_colormap_cut >= max_colormap_cut:
             raise Exception("rvt.blend_func.gray_scale_to_color_ramp: min_colormap_cut can't be smaller than"
                             " max_colormap_cut!")
-        cm = truncate_colormap(cmap=cm, minval=min_colormap_cut, maxval=max_colormap_cut)
-
-    # Compute normalized RGBA
-    rgba_mtpl_out = cm(gray_scale)
-
-    if output_8bit:
-        nan_mask = np.isnan(gray_scale)
-        rgba_mtpl_out[nan_mask] = 0  # Change nan to 0
-        rgba_mtpl_out = np.uint8(rgba_mtpl_out * 255)  # 0-1 scale to 0-255 and change type to uint8
-
-    # Move array axes to correct positions, i.e. (x, y, bands) to (bands, x, y)
-    rgba_out = rgba_mtpl_out.transpose(2, 0, 1)
-
-    # Discard 4th band if not using Alpha
-    if not alpha:
-        rgba_out = rgba_out[:3, ...]
-
-    return rgba_out
+    key = (colormap, min_colormap_cut, max_colormap_cut, bool(output_8bit))
+    lut = _colormap_luts.get(key) if isinstance(colormap, str) else None
+    if lut is None:
+        from matplotlib.cm import get_cmap
+
+        cm = get_cmap(colormap)
+        if min_colormap_cut is not None:
+            cm = truncate_colormap(cmap=cm, minval=min_colormap_cut, maxval=max_colormap_cut)
+        # colors, under, over and bad (matplotlib integer index)
+        lut = np.concatenate([cm(np.arange(cm.N)), cm(np.array([-1])), cm(np.array([cm.N])),
+                              cm(np.array([np.nan]))]).T
+        if output_8bit:
+            lut[:, -1] = 0  # nan is 0
+            lut = np.uint8(lut * 255)  # 0-1 scale to 0-255 and change type to uint8
+        else:
+            lut = lut.astype(np.float32)
+        lut = np.ascontiguousarray(lut)
+        if isinstance(colormap, str):
+            _colormap_luts[key] = lut
+    return lut
+
+
+def colormap_lut_index(gray_scale, n):
+    """Index into colormap_lut (with n colors) of gray_scale values (0-1), same quantization as matplotlib colormap
+    (value * n truncated, 1 is last color)."""
+    gray_scale = np.asarray(gray_scale)
+    if gray_scale.dtype.kind != "f":
+        gray_scale = gray_scale.astype(np.float64)
+    scaled = np.multiply(gray_scale, n, dtype=gray_scale.dtype)
+    scaled[scaled == n] = n - 1  # 1 is last color
+    index = np.empty(scaled.shape, dtype=np.intp)
+    with np.errstate(invalid="ignore"):
+        np.clip(scaled, -1, n, out=scaled)  # nan stays nan
+        np.copyto(index, scaled, casting="unsafe")  # truncate
+    index[scaled < 0] = n  # under
+    index[scaled >= n] = n + 1  # over
+    index[np.isnan(scaled)] = n + 2  # bad
+    return index
 
 
 def truncate_colormap(cmap, minval=0.0, maxval=1.0, n=100):
+    from matplotlib.colors import LinearSegmentedColormap
+
     new_cmap = LinearSegmentedColormap.from_list(
         'trunc({n},{a:.2f},{b:.2f})'.format(n=cmap.name, a=minval, b=maxval),
         cmap(np.linspace(minval, maxval, n)))
@@ -108,26 +153,39 @@ def normalize_lin(image, minimum, maximum):
     return np.float32(image)
 
 
-def lin_cutoff_calc_from_perc(image, minimum, maximum):
+def lin_cutoff_calc_from_perc(image, minimum, maximum, histogram=None, per_band=False):
     """Minimum cutoff in percent, maximum cutoff in percent (0%-100%). Returns min and max values for linear
-    stretch (cut-off)."""
+    stretch (cut-off). Percentiles are exact (as numpy.nanpercentile), a 4096 bins histogram of image selects the
+    values around them so only these are partitioned instead of the whole image. To reuse it for the same image pass
+    histogram (rvt.stats.Histogram or list of them, see image_histogram). If per_band, image is 3D (bands, rows,
+    columns) and list of results (one per band) is returned, histograms of all bands are computed in one pass."""
     if minimum < 0 or maximum < 0 or minimum > 100 or maximum > 100:
         raise Exception("rvt.blend_func.lin_cutoff_calc_from_perc: minimum, maximum are percent and have to be in "
                         "range 0-100!")
     if minimum + maximum > 100:
         raise Exception("rvt.blend_func.lin_cutoff_calc_from_perc: if minimum + maximum > 100% then there are no"
                         " values left! You can't cutoff whole image!")
-    distribution = np.nanpercentile(a=image, q=np.array([minimum, 100 - maximum]))
-    min_lin = distribution[0]
-    max_lin = distribution[1]
-    if min_lin == max_lin:
-        min_lin = np.nanmin(image)
-        max_lin = np.nanmax(image)
-    return {"min_lin": min_lin, "max_lin": max_lin}
-
-
-def normalize_perc(image, minimum, maximum):
-    min_max_lin_dict = lin_cutoff_calc_from_perc(image, minimum, maximum)
+    if histogram is None:
+        histogram = image_histogram(image, per_band=per_band)
+    if per_band:
+        bands = image if image.ndim == 3 else image[np.newaxis]
+        return [{"min_lin": np.nan, "max_lin": np.nan} if band_histogram is None else
+                band_histogram.cutoffs(minimum, maximum, values=band) for band_histogram, band in zip(histogram, bands)]
+    if histogram is None:  # only nan
+        return {"min_lin": np.nan, "max_lin": np.nan}
+    return histogram.cutoffs(minimum, maximum, values=image)
+
+
+def image_histogram(image, per_band=False):
+    """Histogram (rvt.stats.Histogram) of image for lin_cutoff_calc_from_perc, list of band histograms if
+    per_band."""
+    if per_band:
+        return rvt.stats.band_histograms(image)
+    return rvt.stats.Histogram.from_image(image)
+
+
+def normalize_perc(image, minimum, maximum, histogram=None):
+    min_max_lin_dict = lin_cutoff_calc_from_perc(image, minimum, maximum, histogram=histogram)
     min_lin = min_max_lin_dict["min_lin"]
     max_lin = min_max_lin_dict["max_lin"]
     return normalize_lin(image, min_lin, max_lin)
@@ -160,10 +218,9 @@ def advanced_normalization(image, minimum, maximum, normalization):
 
 def lum(img):
     if len(img.shape) == 3:
-        r = img[0]
-        g = img[1]
-        b = img[2]
-        lum_img = np.float32((0.3 * r) + (0.59 * g) + (0.11 * b))
+        lum_img = np.multiply(img[0], 0.3, dtype=np.float32)
+        lum_img += np.multiply(img[1], 0.59, dtype=np.float32)
+        lum_img += np.multiply(img[2], 0.11, dtype=np.float32)
     else:
         lum_img = img
 
@@ -171,164 +228,149 @@ def lum(img):
 
 
 def matrix_eq_min_lt_zero(r: np.ndarray, idx_min_lt_zero, lum_c, min_c):
-    r[idx_min_lt_zero] = lum_c[idx_min_lt_zero] + (((r[idx_min_lt_zero] - lum_c[idx_min_lt_zero]) *
-                                                    lum_c[idx_min_lt_zero]) / (lum_c[idx_min_lt_zero] -
-                                                                               min_c[idx_min_lt_zero]))
+    """In place r = lum_c + (r - lum_c) * lum_c / (lum_c - min_c) where boolean mask idx_min_lt_zero (rows, columns)
+    is True, r can be single band or bands."""
+    scale = np.divide(lum_c, lum_c - min_c, out=np.zeros(lum_c.shape, dtype=np.float32), where=idx_min_lt_zero)
+    np.subtract(r, lum_c, out=r, where=idx_min_lt_zero)
+    np.multiply(r, scale, out=r, where=idx_min_lt_zero)
+    np.add(r, lum_c, out=r, where=idx_min_lt_zero)
     return r
 
 
 def matrix_eq_max_gt_one(r: np.ndarray, idx_max_c_gt_one, lum_c, max_c):
-    r[idx_max_c_gt_one] = lum_c[idx_max_c_gt_one] + (((r[idx_max_c_gt_one] - lum_c[idx_max_c_gt_one]) *
-                                                      (1.0 - lum_c[idx_max_c_gt_one])) / (max_c[idx_max_c_gt_one]
-                                                                                          - lum_c[idx_max_c_gt_one]))
+    """In place r = lum_c + (r - lum_c) * (1 - lum_c) / (max_c - lum_c) where boolean mask idx_max_c_gt_one
+    (rows, columns) is True, r can be single band or bands."""
+    scale = np.divide(1 - lum_c, max_c - lum_c, out=np.zeros(lum_c.shape, dtype=np.float32),
+                      where=idx_max_c_gt_one)
+    np.subtract(r, lum_c, out=r, where=idx_max_c_gt_one)
+    np.multiply(r, scale, out=r, where=idx_max_c_gt_one)
+    np.add(r, lum_c, out=r, where=idx_max_c_gt_one)
     return r
 
 
 def channel_min(r: np.ndarray, g: np.ndarray, b: np.ndarray):
-    min_c = r * 1.0
-    idx_min = np.where(g < min_c)
-    min_c[idx_min] = g[idx_min]
-    idx_min = np.where(b < min_c)
-    min_c[idx_min] = b[idx_min]
+    min_c = np.minimum(r, g)
+    np.minimum(min_c, b, out=min_c)
     return min_c
 
 
 def channel_max(r: np.ndarray, g: np.ndarray, b: np.ndarray):
-    max_c = r * 1.0
-    idx_max = np.where(g > max_c)
-    max_c[idx_max] = g[idx_max]
-    idx_max = np.where(b > max_c)
-    max_c[idx_max] = b[idx_max]
+    max_c = np.maximum(r, g)
+    np.maximum(max_c, b, out=max_c)
     return max_c
 
 
-def clip_color(c, min_c=None, max_c=None):
+def clip_color(c, min_c=None, max_c=None, out=None):
+    """Clips color c (3 bands) into 0-1 keeping its luminosity, in float32. Result is written into out (can be c)
+    if given."""
     lum_c = lum(c)
 
-    r = np.float32(c[0])
-    g = np.float32(c[1])
-    b = np.float32(c[2])
+    if out is None:
+        out = np.array(c, dtype=np.float32)
+    elif out is not c:
+        np.copyto(out, c)
 
     if min_c is None and max_c is None:
-        min_c = channel_min(r, g, b)
-        max_c = channel_max(r, g, b)
+        min_c = np.minimum.reduce(out, axis=0)
+        max_c = np.maximum.reduce(out, axis=0)
+
+    # both clippings as one scale per pixel (1 where not clipped): out = lum_c + (out - lum_c) * scale
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(min_c < 0, lum_c / (lum_c - min_c), np.float32(1))
+        scale *= np.where(max_c > 1, (1 - lum_c) / (max_c - lum_c), np.float32(1))
+    out *= scale
+    out += lum_c * (1 - scale)
 
-    idx_min_lt_zero = np.where(min_c < 0)
-    r = matrix_eq_min_lt_zero(r, idx_min_lt_zero, lum_c, min_c)
-    g = matrix_eq_min_lt_zero(g, idx_min_lt_zero, lum_c, min_c)
-    b = matrix_eq_min_lt_zero(b, idx_min_lt_zero, lum_c, min_c)
+    return out
 
-    idx_max_c_gt_one = np.where(max_c > 1)
-    r = matrix_eq_max_gt_one(r, idx_max_c_gt_one, lum_c, max_c)
-    g = matrix_eq_max_gt_one(g, idx_max_c_gt_one, lum_c, max_c)
-    b = matrix_eq_max_gt_one(b, idx_max_c_gt_one, lum_c, max_c)
 
-    c_out = np.zeros(c.shape)
-    c_out[0, :, :] = r
-    c_out[1, :, :] = g
-    c_out[2, :, :] = b
-    return c_out
+def blend_output(active, background, out=None):
+    """Output array for blending active and background (2D or 3D bands, rows, columns, broadcast) in float32,
+    out if given."""
+    if out is None:
+        out = np.empty(np.broadcast(active, background).shape, dtype=np.float32)
+    return out
 
 
 def blend_normal(active, background):
     return active
 
 
-def blend_screen(active, background):
-    return 1 - (1 - active) * (1 - background)
+def blend_screen(active, background, out=None):
+    out = blend_output(active, background, out)
+    np.subtract(1, active, out=out)
+    out *= 1 - background
+    np.subtract(1, out, out=out)  # 1 - (1 - active) * (1 - background)
+    return out
 
 
-def blend_multiply(active, background):
-    return active * background
+def blend_multiply(active, background, out=None):
+    out = blend_output(active, background, out)
+    np.multiply(active, background, out=out)
+    return out
 
 
-def blend_overlay(active, background):
-    idx1 = np.where(background > 0.5)
-    idx2 = np.where(background <= 0.5)
-    background[idx1] = (1 - (1 - 2 * (background[idx1] - 0.5)) * (1 - active[idx1]))
-    background[idx2] = ((2 * background[idx2]) * active[idx2])
-    return background
+def blend_overlay(active, background, out=None):
+    out = blend_output(active, background, out)
+    np.multiply(active, background, out=out)
+    out *= 2  # background <= 0.5
+    light = 1 - 2 * (1 - background) * (1 - active)  # background > 0.5
+    np.copyto(out, light, where=np.broadcast_to(background > 0.5, out.shape))
+    return out
 
 
-def blend_soft_light(active, background):
-    # idx1 = np.where(active > 0.5)
-    # idx2 = np.where(active <= 0.5)
-    # background[idx1] = 1 - (1-background[idx1]) * (1-(active[idx1]-0.5))
-    # background[idx2] = background[idx2] * (active[idx2]+0.5)
-    idx1 = np.where(active < 0.5)
-    idx2 = np.where(active >= 0.5)
-    background[idx1] = 2 * background[idx1] * active[idx1] + background[idx1] ** 2 * (1.0 - 2 * active[idx1])
-    background[idx2] = 2 * background[idx2] * (1.0 - active[idx2]) + np.sqrt(background[idx2]) * (
-                2 * active[idx2] - 1.0)
-    return background
+def blend_soft_light(active, background, out=None):
+    out = blend_output(active, background, out)
+    np.copyto(out, 2 * background * active + background ** 2 * (1.0 - 2 * active))  # active < 0.5
+    light = 2 * background * (1.0 - active) + np.sqrt(background) * (2 * active - 1.0)  # active >= 0.5
+    np.copyto(out, light, where=np.broadcast_to(active >= 0.5, out.shape))
+    return out
 
 
-def blend_luminosity(active, background, min_c=None, max_c=None):
+def blend_luminosity(active, background, min_c=None, max_c=None, out=None):
     lum_active = lum(active)
-    lum_background = lum(background)
-    luminosity = lum_active - lum_background
 
     if len(background.shape) < 3:
         return lum_active
 
-    r = background[0] + luminosity
-    g = background[1] + luminosity
-    b = background[2] + luminosity
+    luminosity = lum_active - lum(background)
 
-    c = np.zeros(background.shape)
-    c[0, :, :] = r
-    c[1, :, :] = g
-    c[2, :, :] = b
+    # color with background hue and saturation and active luminosity
+    c = blend_output(luminosity, background, out)
+    np.add(background, luminosity, out=c)
 
-    clipped_image = clip_color(c, min_c, max_c)
+    clipped_image = clip_color(c, min_c, max_c, out=c)
 
     return clipped_image
 
 
-def equation_blend(blend_mode, active, background):
+def equation_blend(blend_mode, active, background, out=None):
     if blend_mode.lower() == "screen":
-        return blend_screen(active, background)
+        return blend_screen(active, background, out)
     elif blend_mode.lower() == "multiply":
-        return blend_multiply(active, background)
+        return blend_multiply(active, background, out)
     elif blend_mode.lower() == "overlay":
-        return blend_overlay(active, background)
+        return blend_overlay(active, background, out)
     elif blend_mode.lower() == "soft_light":
-        return blend_soft_light(active, background)
-
-
-def blend_multi_dim_images(blend_mode, active, background):
-    a_rgb = len(active.shape) == 3  # bool, is active rgb
-    b_rgb = len(background.shape) == 3  # bool, is background rgb
-    blended_image = None
-    if a_rgb and b_rgb:
-        blended_image = np.zeros(background.shape)
-        for i in range(3):
-            blended_image[i, :, :] = equation_blend(blend_mode, active[i, :, :], background[i, :, :])
-    if a_rgb and not b_rgb:
-        blended_image = np.zeros(active.shape)
-        for i in range(3):
-            blended_image[i, :, :] = equation_blend(blend_mode, active[i, :, :], background)
-    if not a_rgb and b_rgb:
-        blended_image = np.zeros(background.shape)
-        for i in range(3):
-            blended_image[i, :, :] = equation_blend(blend_mode, active, background[i, :, :])
-    if not a_rgb and not b_rgb:
-        blended_image = equation_blend(blend_mode, active, background)
-
-    return blended_image
-
-
-def blend_images(blend_mode, active, background, min_c=None, max_c=None):
+        return blend_soft_light(active, background, out)
+
+
+def blend_multi_dim_images(blend_mode, active, background, out=None):
+    """Blends 1 or 3 band active and background (single band is broadcast to all bands) in float32."""
+    return equation_blend(blend_mode, active, background, out)
+
+
+def blend_images(blend_mode, active, background, min_c=None, max_c=None, out=None):
     if blend_mode.lower() == "multiply" or blend_mode.lower() == "overlay" or blend_mode.lower() == "screen" \
             or blend_mode.lower() == "soft_light":
-        return blend_multi_dim_images(blend_mode, active, background)
+        return blend_multi_dim_images(blend_mode, active, background, out)
     elif blend_mode.lower() == "luminosity":
-        return blend_luminosity(active, background, min_c, max_c)
+        return blend_luminosity(active, background, min_c, max_c, out)
     else:
         return blend_normal(active, background)
 
 
-def render_images(active, background, opacity):
+def render_images(active, background, opacity, out=None):
 
     # Both active and background image have to be between 0 and 1, scale if not
     if np.nanmin(active) < 0 or np.nanmax(active) > 1:
@@ -336,30 +378,8 @@ def render_images(active, background, opacity):
     if np.nanmin(background) < 0 or np.nanmax(background) > 1:
         background = scale_0_to_1(background)
 
-    # True if image has 3 bands (RGB), false if single band
-    a_rgb = len(active.shape) == 3
-    b_rgb = len(background.shape) == 3
-
-    # Apply opacity
-    if a_rgb and b_rgb:
-        # Both images 3 bands
-        render_image = np.zeros(background.shape)
-        for i in range(3):
-            render_image[i, :, :] = apply_opacity(active[i, :, :], background[i, :, :], opacity)
-    elif a_rgb and not b_rgb:
-        # Active image 3 bands
-        render_image = np.zeros(active.shape)
-        for i in range(3):
-            render_image[i, :, :] = apply_opacity(active[i, :, :], background, opacity)
-    elif not a_rgb and b_rgb:
-        # Background image 3 bands
-        render_image = np.zeros(background.shape)
-        for i in range(3):
-            render_image[i, :, :] = apply_opacity(active, background[i, :, :], opacity)
-    else:
-        render_image = apply_opacity(active, background, opacity)
-
-    return render_image
+    # Apply opacity, 1 or 3 band images (single band is broadcast to all bands)
+    return apply_opacity(active, background, opacity, out)
 
 
 def scale_within_0_and_1(numeric_value):
@@ -406,7 +426,7 @@ def scale_strict_0_to_1(numeric_value):
     scaled = (numeric_value - min_value) / (max_value - min_value)
 
     if np.nanmin(scaled) > -0.01:
-        scaled[0 > scaled > -0.01] = 0
+        scaled[(0 > scaled) & (scaled > -0.01)] = 0
 
     return scaled
 
@@ -420,10 +440,125 @@ def scale_0_to_1(numeric_value):
         return scale_strict_0_to_1(numeric_value)
 
 
-def apply_opacity(active, background, opacity):
+def apply_opacity(active, background, opacity, out=None):
+    if opacity > 1:
+        opacity = opacity / 100
+    out = blend_output(active, background, out)
+    np.subtract(active, background, out=out)
+    out *= np.float32(opacity)
+    out += background  # active * opacity + background * (1 - opacity)
+    return out
+
+
+def scaled_by_255(image):
+    """
+    True if scale_0_to_1 scales uint8 image (0-255) by dividing it with 255 (minimum > 0 and range > 30). Only then
+    fixed point blending (blend_images_8bit, render_images_8bit) is within 1 of the float path, other images (which
+    include 0 or have small range) are left unscaled or stretched by scale_0_to_1.
+    """
+    minimum = int(np.min(image))
+    maximum = int(np.max(image))
+    return minimum > 0 and maximum - minimum > 30
+
+
+_blend_lut_8bit = {}  # blend mode: 256 x 256 uint8 lookup table (active, background)
+
+
+def div_255(x):
+    """Rounded x / 255 of uint16 array x (0-65025), exact, computed in place."""
+    x += 128
+    x += x >> 8
+    x >>= 8
+    return x
+
+
+def multiply_8bit(a, b):
+    """Rounded a * b / 255 of uint8 (or uint16 0-255) arrays as uint16."""
+    return div_255(np.multiply(a, b, dtype=np.uint16))
+
+
+def blend_lut_8bit(blend_mode):
+    """Lookup table (256 x 256, indexed with active, background) of float blend equation rounded to 0-255."""
+    lut = _blend_lut_8bit.get(blend_mode)
+    if lut is None:
+        values = np.arange(256, dtype=np.float32) / 255
+        lut = equation_blend(blend_mode, values[:, np.newaxis], values[np.newaxis, :])
+        lut = np.round(np.clip(lut, 0, 1) * 255).astype(np.uint8)
+        _blend_lut_8bit[blend_mode] = lut
+    return lut
+
+
+def lum_8bit(img):
+    """Luminosity of uint8 image in 1/1024 units (0.3, 0.59, 0.11 as 307, 604, 113) as int32."""
+    if len(img.shape) == 3:
+        lum_img = np.multiply(img[0], 307, dtype=np.int32)
+        lum_img += np.multiply(img[1], 604, dtype=np.int32)
+        lum_img += np.multiply(img[2], 113, dtype=np.int32)
+        return lum_img
+    return np.left_shift(img, 10, dtype=np.int32)
+
+
+def blend_luminosity_8bit(active, background):
+    lum_active = lum_8bit(active)
+    if len(background.shape) < 3:
+        return ((lum_active + 512) >> 10).astype(np.uint8)
+    # color (1/1024 units) with background hue and saturation and active luminosity
+    c = np.left_shift(background, 10, dtype=np.int32)
+    c += (lum_active - lum_8bit(background))[np.newaxis]
+    # clip color, rounded integer division
+    min_c = c.min(axis=0)
+    max_c = c.max(axis=0)
+    idx_min_lt_zero = min_c < 0
+    if idx_min_lt_zero.any():
+        den = np.maximum(lum_active - min_c, 1)
+        scaled = lum_active + ((c - lum_active) * lum_active.astype(np.int64) + den // 2) // den
+        np.copyto(c, scaled, where=idx_min_lt_zero)
+    idx_max_gt_one = max_c > 255 << 10
+    if idx_max_gt_one.any():
+        den = np.maximum(max_c - lum_active, 1)
+        scaled = lum_active + ((c - lum_active) * ((255 << 10) - lum_active.astype(np.int64)) + den // 2) // den
+        np.copyto(c, scaled, where=idx_max_gt_one)
+    c += 512
+    c >>= 10
+    return np.clip(c, 0, 255).astype(np.uint8)
+
+
+def blend_images_8bit(blend_mode, active, background):
+    """
+    Blends uint8 (0-255 means 0-1) active and background (1 or 3 bands, broadcast) in fixed point integer
+    arithmetic without conversion to float. Result (uint8) is within 1 of the float blend_images on images which
+    scale_0_to_1 divides with 255 (see scaled_by_255).
+    """
+    blend_mode = blend_mode.lower()
+    if blend_mode == "multiply":
+        return multiply_8bit(active, background).astype(np.uint8)
+    elif blend_mode == "screen":
+        return (255 - multiply_8bit(255 - active, 255 - background)).astype(np.uint8)
+    elif blend_mode == "overlay":
+        out = multiply_8bit(active, background) << 1  # background <= 0.5
+        light = 255 - (multiply_8bit(255 - active, 255 - background) << 1)  # background > 0.5
+        np.copyto(out, light, where=np.broadcast_to(background > 127, out.shape))
+        return out.astype(np.uint8)
+    elif blend_mode == "soft_light":  # square root, lookup table
+        lut = blend_lut_8bit(blend_mode)
+        return lut[active, background]
+    elif blend_mode == "luminosity":
+        return blend_luminosity_8bit(active, background)
+    else:
+        return blend_normal(active, background)
+
+
+def render_images_8bit(active, background, opacity, out=None):
+    """Renders uint8 active over uint8 background with opacity (1 or 3 bands, broadcast) in fixed point."""
     if opacity > 1:
         opacity = opacity / 100
-    return active * opacity + background * (1 - opacity)
+    alpha = int(round(opacity * 255))
+    rendered = np.add(np.multiply(active, alpha, dtype=np.uint16),
+                      np.multiply(background, 255 - alpha, dtype=np.uint16))
+    if out is None:
+        out = np.empty(rendered.shape, dtype=np.uint8)
+    np.copyto(out, div_255(rendered), casting="unsafe")  # active * opacity + background * (1 - opacity)
+    return out
 
 
 def normalize_image(visualization, image, min_norm, max_norm, normalization):
@@ -458,6 +593,46 @@ def normalize_image(visualization, image, min_norm, max_norm, normalization):
     return norm_image
 
 
+def normalize_byte_scale(visualization, image, min_norm, max_norm, normalization, no_data=None, out=None,
+                         histogram=None):
+    """Fused normalization and byte scale. Maps image (float) linearly from min_norm-max_norm (value) or from
+    min_norm-max_norm percent cut-off (perc) to 0-255 uint8 with clipping, inverted for slope and negative openness.
+    No data (np.nan or no_data) is 255. Replaces normalize_image followed by rvt.vis.byte_scale, except that the
+    cut-off range maps to 0-255 directly instead of being re-stretched to the min and max of each tile.
+    If out (uint8 array of image shape) is given result is written into it. Histogram of image (see
+    image_histogram) can be given to reuse it for perc cut-offs.
+    """
+    if normalization == "percent":
+        normalization = "perc"
+    if normalization.lower() == "value":
+        if min_norm >= max_norm:
+            raise Exception("rvt.blend_func.normalize_byte_scale: If normalization == value, max has to be larger"
+                            " than min!")
+        minimum = min_norm
+        maximum = max_norm
+    elif normalization.lower() == "perc":
+        min_max_lin_dict = lin_cutoff_calc_from_perc(image, min_norm, max_norm, histogram=histogram)
+        minimum = min_max_lin_dict["min_lin"]
+        maximum = min_max_lin_dict["max_lin"]
+    else:
+        raise Exception(f"rvt.blend_func.normalize_byte_scale: Unknown normalization type: {normalization}")
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+
+    scale = 255.9999 / (maximum - minimum) if maximum > minimum else 0.  # copied from IDL BYTSCL
+    byte_data = np.subtract(image, np.float32(minimum), dtype=np.float32)
+    byte_data *= np.float32(scale)
+    if visualization is not None and visualization.lower() in ("slope gradient", "openness - negative", "slp",
+                                                               "neg_opns"):
+        np.subtract(np.float32(255.9999), byte_data, out=byte_data)  # invert scale (high slopes will be black)
+    np.clip(byte_data, 0, 255, out=byte_data)
+    byte_data[np.isnan(byte_data)] = 255  # change no_data to 255
+    if no_data is not None and not np.isnan(no_data):
+        byte_data[image == no_data] = 255
+    np.copyto(out, byte_data, casting="unsafe")
+    return out
+
+
 def cut_off_normalize(image, mode, cutoff_min=None, cutoff_max=None, bool_norm=True):
     """
     One band image cut-off or normalization or both. Image is 2D np.ndarray of raster, mode is perc or value
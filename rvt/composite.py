@@ -0,0 +1,440 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Contains functions for composites (blended combinations of visualizations) evaluated from elevation model in one call.
+
+Composite is described with a layer specification, a list of layers from top to bottom. Each layer is a dictionary:
+    visualization : str
+        Visualization name (see VISUALIZATIONS).
+    params : dict
+        Parameters of visualization function in rvt.vis (e.g. {"sun_azimuth": 315, "sun_elevation": 35}), missing
+        parameters have function default values.
+    normalization : str
+        Normalization, 'value' (minimum and maximum are cut-off values) or 'perc' (cut-off percents).
+    minimum, maximum : float
+        Normalization cut-offs.
+    invert : bool
+        Invert normalized image (default True for slope gradient and negative openness, else False).
+    colormap : dict
+        Optional, colors normalized image with rvt.blend_func.gray_scale_to_color_ramp, keys colormap,
+        min_colormap_cut, max_colormap_cut.
+    layers : list
+        Instead of visualization, group of layers (same specification) rendered into one layer.
+    blend_mode : str
+        Blend mode of layer with rendered layers below ('normal', 'multiply', 'overlay', 'luminosity', 'screen',
+        'soft_light').
+    opacity : float
+        Opacity of layer in percent (0-100).
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+import json
+
+import numpy as np
+
+import rvt.vis
+import rvt.blend_func
+import rvt.workspace
+
+VISUALIZATIONS = ("hillshade", "multiple directions hillshade", "slope gradient", "simple local relief model",
+                  "sky-view factor", "anisotropic sky-view factor", "openness - positive", "openness - negative",
+                  "openness - difference", "sky illumination", "local dominance", "multi-scale relief model",
+                  "multi-scale topographic position")
+SKY_VIEW_FACTOR_OUTPUTS = {"sky-view factor": "svf", "anisotropic sky-view factor": "asvf",
+                           "openness - positive": "opns"}
+
+
+def vat_layers(svf_r_max, svf_noise, svf_minimum, opns_minimum, opns_maximum, slope_maximum, sun_elevation):
+    svf_params = {"svf_n_dir": 16, "svf_r_max": svf_r_max, "svf_noise": svf_noise}
+    return [
+        {"visualization": "sky-view factor", "params": svf_params, "normalization": "value",
+         "minimum": svf_minimum, "maximum": 1, "blend_mode": "multiply", "opacity": 25},
+        {"visualization": "openness - positive", "params": svf_params, "normalization": "value",
+         "minimum": opns_minimum, "maximum": opns_maximum, "blend_mode": "overlay", "opacity": 50},
+        {"visualization": "slope gradient", "params": {"output_units": "degree"}, "normalization": "value",
+         "minimum": 0, "maximum": slope_maximum, "blend_mode": "luminosity", "opacity": 50},
+        {"visualization": "hillshade", "params": {"sun_azimuth": 315, "sun_elevation": sun_elevation},
+         "normalization": "value", "minimum": 0, "maximum": 1, "blend_mode": "normal", "opacity": 100}
+    ]
+
+
+def prism_openness_layers(svf_r_max, svf_noise, sun_elevation, neg_opns_minimum, opns_minimum, opns_maximum):
+    svf_params = {"svf_n_dir": 16, "svf_r_max": svf_r_max, "svf_noise": svf_noise}
+    return [
+        {"layers": [
+            {"visualization": "multiple directions hillshade", "params": {"sun_elevation": sun_elevation},
+             "normalization": "perc", "minimum": 1, "maximum": 1, "blend_mode": "normal", "opacity": 50},
+            {"visualization": "openness - negative", "params": svf_params, "normalization": "value",
+             "minimum": neg_opns_minimum, "maximum": 95, "blend_mode": "normal", "opacity": 100}
+        ], "blend_mode": "normal", "opacity": 50},
+        {"visualization": "openness - positive", "params": svf_params, "normalization": "value",
+         "minimum": opns_minimum, "maximum": opns_maximum, "blend_mode": "normal", "opacity": 100}
+    ]
+
+
+def mstp_enhanced_layers():
+    opns_params = {"svf_n_dir": 16, "svf_r_max": 10, "svf_noise": 0}
+    return [
+        {"visualization": "simple local relief model", "params": {"radius_cell": 10}, "normalization": "value",
+         "minimum": -0.5, "maximum": 0.5, "blend_mode": "screen", "opacity": 25},
+        {"layers": [
+            {"visualization": "openness - difference", "params": opns_params, "normalization": "value",
+             "minimum": -28, "maximum": 28, "blend_mode": "overlay", "opacity": 50},
+            {"visualization": "openness - difference", "params": opns_params, "normalization": "value",
+             "minimum": -28, "maximum": 28, "blend_mode": "luminosity", "opacity": 50},
+            {"visualization": "slope gradient", "params": {"output_units": "radian"}, "normalization": "value",
+             "minimum": 0, "maximum": 0.8, "invert": False,
+             "colormap": {"colormap": "OrRd", "min_colormap_cut": 0, "max_colormap_cut": 1},
+             "blend_mode": "normal", "opacity": 100}
+        ], "blend_mode": "soft_light", "opacity": 70},
+        {"visualization": "multi-scale topographic position",
+         "params": {"local_scale": (1, 5, 1), "meso_scale": (5, 50, 5), "broad_scale": (50, 500, 50),
+                    "lightness": 0.9},
+         "normalization": "value", "minimum": 0, "maximum": 1, "blend_mode": "normal", "opacity": 100}
+    ]
+
+
+# layer specifications of RVT composites (same as VAT_*, Prism_Opns_* and enhanced MSTP raster function templates)
+PRESETS = {
+    "vat general": vat_layers(svf_r_max=10, svf_noise=0, svf_minimum=0.7, opns_minimum=68, opns_maximum=93,
+                              slope_maximum=50, sun_elevation=35),
+    "vat flat": vat_layers(svf_r_max=20, svf_noise=3, svf_minimum=0.9, opns_minimum=85, opns_maximum=93,
+                           slope_maximum=15, sun_elevation=15),
+    "vat steep": vat_layers(svf_r_max=10, svf_noise=0, svf_minimum=0.55, opns_minimum=55, opns_maximum=95,
+                            slope_maximum=60, sun_elevation=35),
+    "prism openness general": prism_openness_layers(svf_r_max=10, svf_noise=0, sun_elevation=35,
+                                                    neg_opns_minimum=60, opns_minimum=68, opns_maximum=93),
+    "prism openness flat": prism_openness_layers(svf_r_max=20, svf_noise=3, sun_elevation=15,
+                                                 neg_opns_minimum=75, opns_minimum=85, opns_maximum=93),
+    "prism openness steep": prism_openness_layers(svf_r_max=10, svf_noise=0, sun_elevation=45,
+                                                  neg_opns_minimum=45, opns_minimum=55, opns_maximum=95),
+    "mstp enhanced": mstp_enhanced_layers()
+}
+
+
+def get_layers(preset=None, layers=None):
+    """
+    Returns checked layer specification of composite.
+
+    Parameters
+    ----------
+    preset : str
+        Name of composite in PRESETS (case insensitive), used if layers is None.
+    layers : list or str
+        Layer specification (list of dictionaries, see module description) or its JSON string.
+
+    Returns
+    -------
+    layers : list
+        Layer specification, visualization and blend mode names are lower case.
+    """
+    if layers is None or (isinstance(layers, str) and layers.strip() == ""):
+        if preset is None or str(preset).lower() not in PRESETS:
+            raise Exception("rvt.composite.get_layers: Unknown preset {}, has to be one of {}!".format(
+                preset, ", ".join(PRESETS)))
+        layers = PRESETS[str(preset).lower()]
+    elif isinstance(layers, str):
+        try:
+            layers = json.loads(layers)
+        except ValueError as e:
+            raise Exception("rvt.composite.get_layers: Layers is not valid JSON ({})!".format(e))
+    return check_layers(layers)
+
+
+def check_layers(layers):
+    if not isinstance(layers, (list, tuple)) or len(layers) == 0:
+        raise Exception("rvt.composite.check_layers: Layers has to be a non-empty list!")
+    checked_layers = []
+    for layer in layers:
+        if not isinstance(layer, dict):
+            raise Exception("rvt.composite.check_layers: Layer has to be a dictionary!")
+        layer = dict(layer)
+        layer["blend_mode"] = str(layer.get("blend_mode", "normal")).lower()
+        layer["opacity"] = float(layer.get("opacity", 100))
+        if not 0 <= layer["opacity"] <= 100:
+            raise Exception("rvt.composite.check_layers: Opacity has to be between 0 and 100!")
+        if "layers" in layer:
+            layer["layers"] = check_layers(layer["layers"])
+        else:
+            layer["visualization"] = str(layer.get("visualization")).lower()
+            if layer["visualization"] not in VISUALIZATIONS:
+                raise Exception("rvt.composite.check_layers: Unknown visualization {}, has to be one of {}!".format(
+                    layer["visualization"], ", ".join(VISUALIZATIONS)))
+            layer["params"] = dict(layer.get("params") or {})
+            layer["normalization"] = str(layer.get("normalization", "value")).lower()
+            layer["minimum"] = float(layer.get("minimum", 0))
+            layer["maximum"] = float(layer.get("maximum", 1))
+        checked_layers.append(layer)
+    return checked_layers
+
+
+def leaf_layers(layers):
+    """Visualization layers (groups expanded), in order of evaluation."""
+    leaves = []
+    for layer in layers:
+        if "layers" in layer:
+            leaves += leaf_layers(layer["layers"])
+        else:
+            leaves.append(layer)
+    return leaves
+
+
+def layers_band_count(layers):
+    """Number of bands of composite (3 if any layer is RGB, else 1)."""
+    for layer in leaf_layers(layers):
+        if layer["visualization"] in ("multiple directions hillshade", "multi-scale topographic position") or \
+                layer.get("colormap"):
+            return 3
+    return 1
+
+
+def visualization_padding(visualization, params, resolution=1):
+    """Padding in pixels needed by visualization with params (same as its raster function)."""
+    if visualization in ("hillshade", "multiple directions hillshade", "slope gradient"):
+        return 1
+    elif visualization == "simple local relief model":
+        return int(params.get("radius_cell", 20))
+    elif visualization in SKY_VIEW_FACTOR_OUTPUTS or visualization in ("openness - negative",
+                                                                        "openness - difference"):
+        return int(params.get("svf_r_max", 10))
+    elif visualization == "sky illumination":
+        return int(params.get("max_fine_radius", 100))
+    elif visualization == "local dominance":
+        return int(params.get("max_rad", 20))
+    elif visualization == "multi-scale relief model":
+        scaling_factor = int(params.get("scaling_factor", 2))
+        n = int(np.ceil(((float(params.get("feature_max", 20)) - resolution) / (2 * resolution)) **
+                        (1 / scaling_factor)))
+        return n ** scaling_factor
+    elif visualization == "multi-scale topographic position":
+        return int(params.get("broad_scale", (223, 2023, 180))[1])
+    return 0
+
+
+def layers_padding(layers, resolution=1):
+    """Padding in pixels needed by all visualizations of layers."""
+    return max(visualization_padding(layer["visualization"], layer["params"], resolution)
+               for layer in leaf_layers(layers))
+
+
+def sky_view_factor_outputs(layers):
+    """Sky-view factor outputs (svf, asvf, opns) needed for each parameter set, so they are computed in one horizon
+    search."""
+    outputs = {}
+    for layer in leaf_layers(layers):
+        if layer["visualization"] in SKY_VIEW_FACTOR_OUTPUTS or layer["visualization"] == "openness - difference":
+            key = sky_view_factor_key(layer["params"])
+            outputs.setdefault(key, set()).add(SKY_VIEW_FACTOR_OUTPUTS.get(layer["visualization"], "opns"))
+    return outputs
+
+
+def sky_view_factor_key(params):
+    return (int(params.get("svf_n_dir", 16)), int(params.get("svf_r_max", 10)), int(params.get("svf_noise", 0)),
+            float(params.get("asvf_dir", 315)), int(params.get("asvf_level", 1)))
+
+
+def compute_slope_aspect(dem, resolution, cache):
+    """Slope and aspect in radians, computed once for all layers."""
+    if "slope_aspect" not in cache:
+        cache["slope_aspect"] = rvt.vis.slope_aspect(dem=dem, resolution_x=resolution, resolution_y=resolution,
+                                                     output_units="radian")
+    return cache["slope_aspect"]
+
+
+def compute_hillshade(dem, resolution, sun_azimuth, sun_elevation, cache):
+    dict_slp_asp = compute_slope_aspect(dem, resolution, cache)
+    # rvt.vis.hillshade removes 1 pixel edge from given slope and aspect
+    return rvt.vis.hillshade(dem=dem, resolution_x=resolution, resolution_y=resolution, sun_azimuth=sun_azimuth,
+                             sun_elevation=sun_elevation, slope=np.pad(dict_slp_asp["slope"], 1, mode="edge"),
+                             aspect=np.pad(dict_slp_asp["aspect"], 1, mode="edge"))
+
+
+def compute_sky_view_factor(dem, resolution, params, cache, outputs, negative=False):
+    key = ("sky_view_factor", negative) + sky_view_factor_key(params)
+    if key not in cache:
+        n_dir, r_max, noise, asvf_dir, asvf_level = sky_view_factor_key(params)
+        cache[key] = rvt.vis.sky_view_factor(dem=-dem if negative else dem, resolution=resolution,
+                                             compute_svf="svf" in outputs, compute_asvf="asvf" in outputs,
+                                             compute_opns="opns" in outputs, svf_n_dir=n_dir, svf_r_max=r_max,
+                                             svf_noise=noise, asvf_dir=asvf_dir, asvf_level=asvf_level)
+    return cache[key]
+
+
+def compute_visualization(visualization, dem, resolution, params, cache, sky_view_outputs=None):
+    """
+    Computes visualization of dem (2D, no data as np.nan), intermediate results (slope and aspect, horizon search) are
+    shared between visualizations through cache (dictionary).
+
+    Returns
+    -------
+    image : np.array (2D or 3D for multiple directions hillshade and multi-scale topographic position)
+    """
+    if visualization == "hillshade":
+        return compute_hillshade(dem, resolution, float(params.get("sun_azimuth", 315)),
+                                 float(params.get("sun_elevation", 35)), cache)
+    elif visualization == "multiple directions hillshade":  # RGB, same as 8-bit multi hillshade raster function
+        return np.array([compute_hillshade(dem, resolution, sun_azimuth, float(params.get("sun_elevation", 35)),
+                                           cache) for sun_azimuth in (315, 22.5, 90)])
+    elif visualization == "slope gradient":
+        slope = compute_slope_aspect(dem, resolution, cache)["slope"]
+        output_units = params.get("output_units", "degree")
+        if output_units == "degree":
+            return np.rad2deg(slope)
+        elif output_units == "percent":
+            return np.tan(slope) * 100
+        elif output_units == "radian":
+            return slope
+        raise Exception("rvt.composite.compute_visualization: Wrong slope output_units {}!".format(output_units))
+    elif visualization == "simple local relief model":
+        return rvt.vis.slrm(dem=dem, radius_cell=int(params.get("radius_cell", 20)))
+    elif visualization in SKY_VIEW_FACTOR_OUTPUTS:
+        output = SKY_VIEW_FACTOR_OUTPUTS[visualization]
+        outputs = (sky_view_outputs or {}).get(sky_view_factor_key(params), {output})
+        return compute_sky_view_factor(dem, resolution, params, cache, outputs)[output]
+    elif visualization == "openness - negative":
+        return compute_sky_view_factor(dem, resolution, params, cache, {"opns"}, negative=True)["opns"]
+    elif visualization == "openness - difference":  # positive - negative openness
+        outputs = (sky_view_outputs or {}).get(sky_view_factor_key(params), {"opns"})
+        return compute_sky_view_factor(dem, resolution, params, cache, outputs)["opns"] - \
+            compute_sky_view_factor(dem, resolution, params, cache, {"opns"}, negative=True)["opns"]
+    elif visualization == "sky illumination":
+        sky_model = str(params.get("sky_model", "overcast")).lower()
+        output = "{}_shaded".format(sky_model) if params.get("compute_shadow", False) else sky_model
+        return rvt.vis.sky_illumination(dem=dem, resolution=resolution, outputs=[output], **params)[output]
+    elif visualization == "local dominance":
+        return rvt.vis.local_dominance(dem=dem, **params)
+    elif visualization == "multi-scale relief model":
+        return rvt.vis.msrm(dem=dem, resolution=resolution, feature_min=float(params.get("feature_min", 0)),
+                            feature_max=float(params.get("feature_max", 20)),
+                            scaling_factor=int(params.get("scaling_factor", 2)))
+    elif visualization == "multi-scale topographic position":
+        return rvt.vis.mstp(dem=dem, local_scale=tuple(params.get("local_scale", (3, 21, 2))),
+                            meso_scale=tuple(params.get("meso_scale", (23, 203, 18))),
+                            broad_scale=tuple(params.get("broad_scale", (223, 2023, 180))),
+                            lightness=float(params.get("lightness", 1.2)))
+    raise Exception("rvt.composite.compute_visualization: Unknown visualization {}!".format(visualization))
+
+
+def layer_visualization(layer, dem, resolution, padding=0):
+    """Visualization of layer (not normalized, padding removed) of dem (2D, no data as np.nan), e.g. of window of
+    whole raster for percent normalization statistics (see rvt.stats.output_histograms)."""
+    image = compute_visualization(layer["visualization"], dem, resolution, layer["params"], {})
+    if padding > 0:
+        image = image[..., padding:-padding, padding:-padding]
+    return image
+
+
+def normalize_layer(layer, image, histogram=None):
+    """Normalizes (0-1) visualization image of layer, with percent cut-offs from histogram (rvt.stats.Histogram of
+    whole raster) if given, and applies colormap."""
+    minimum = layer["minimum"]
+    maximum = layer["maximum"]
+    normalization = layer["normalization"]
+    if normalization in ("perc", "percent") and histogram is not None:
+        cutoffs = histogram.cutoffs(minimum, maximum)
+        if cutoffs["min_lin"] < cutoffs["max_lin"]:
+            minimum = cutoffs["min_lin"]
+            maximum = cutoffs["max_lin"]
+            normalization = "value"
+    visualization = layer["visualization"]
+    if layer.get("invert") is not None:  # only slope gradient and negative openness are inverted by normalize_image
+        visualization = "slope gradient" if layer["invert"] else "other"
+    norm_image = rvt.blend_func.normalize_image(visualization=visualization, image=image, min_norm=minimum,
+                                                max_norm=maximum, normalization=normalization)
+    if layer.get("colormap"):
+        colormap = layer["colormap"]
+        norm_image = rvt.blend_func.gray_scale_to_color_ramp(gray_scale=norm_image,
+                                                             colormap=colormap.get("colormap", "Reds_r"),
+                                                             min_colormap_cut=colormap.get("min_colormap_cut"),
+                                                             max_colormap_cut=colormap.get("max_colormap_cut"),
+                                                             output_8bit=False)
+    return np.asarray(norm_image, dtype=np.float32)
+
+
+def render_layers(layers, compute_layer, workspace=None):
+    """Renders layers from bottom to top, compute_layer(layer) returns normalized image of visualization layer.
+    Blended images (work arrays) are taken from workspace (rvt.workspace.Workspace) if given."""
+    rendered_image = None
+    for layer in reversed(layers):
+        if "layers" in layer:
+            image = render_layers(layer["layers"], compute_layer, workspace)
+        else:
+            image = compute_layer(layer)
+        if rendered_image is None:  # bottom layer
+            rendered_image = image
+            continue
+        blend_shape = np.broadcast(image, rendered_image).shape
+        blended_image = rvt.blend_func.blend_images(blend_mode=layer["blend_mode"], active=image,
+                                                    background=rendered_image,
+                                                    out=rvt.workspace.empty(workspace, "blend", blend_shape))
+        rendered_image = rvt.blend_func.render_images(active=blended_image, background=rendered_image,
+                                                      opacity=layer["opacity"] / 100)
+    return rendered_image
+
+
+def composite(dem, resolution, layers, padding=0, no_data=None, histograms=None, workspace=None):
+    """
+    Computes composite (blended visualizations) of elevation model in one call. Each visualization is computed once
+    (also if used in more layers) and visualizations share slope, aspect and horizon search.
+
+    Parameters
+    ----------
+    dem : np.array (2D)
+        Input elevation model.
+    resolution : float
+        Pixel size of dem.
+    layers : list
+        Layer specification (see module description and get_layers).
+    padding : int
+        Number of edge pixels to remove from visualizations (raster function padding).
+    no_data : float
+        Value of dem representing no data.
+    histograms : dict
+        Layer index (in leaf_layers order): rvt.stats.Histogram of visualization of whole raster, for percent
+        normalization cut-offs of whole raster instead of tile.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays (blended images) are taken from (and kept in) workspace.
+
+    Returns
+    -------
+    composite : np.array (2D or 3D, float32, 0-1)
+    """
+    dem = np.array(dem, dtype=np.float32)
+    if no_data is not None and not np.isnan(no_data):
+        dem[dem == no_data] = np.nan
+    histograms = histograms or {}
+    leaf_index = {id(layer): i_layer for i_layer, layer in enumerate(leaf_layers(layers))}
+    sky_view_outputs = sky_view_factor_outputs(layers)
+    cache = {}
+    normalized = {}
+
+    def compute_layer(layer):
+        i_layer = leaf_index[id(layer)]
+        key = (layer["visualization"], repr(sorted(layer["params"].items())))
+        key_norm = key + (layer["normalization"], layer["minimum"], layer["maximum"], layer.get("invert"),
+                          repr(layer.get("colormap")), histograms.get(i_layer) is not None)
+        if key_norm not in normalized:  # same layer used more times
+            if key not in cache:
+                image = compute_visualization(layer["visualization"], dem, resolution, layer["params"], cache,
+                                              sky_view_outputs)
+                if padding > 0:  # remove padding
+                    image = image[..., padding:-padding, padding:-padding]
+                cache[key] = image
+            image = cache[key]
+            normalized[key_norm] = normalize_layer(layer, image, histograms.get(i_layer))
+        return normalized[key_norm]
+
+    return render_layers(layers, compute_layer, workspace)
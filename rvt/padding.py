@@ -0,0 +1,139 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Contains functions for padding of pixel blocks (tiles) in raster functions.
+
+ArcGIS fills the padding of pixel blocks which lies outside of the raster extent with zeros, raster functions replace
+it with edge padding (nearest valid row or column), so that the visualizations at the raster edge are not distorted.
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python3 site-packages
+import numpy as np
+
+
+def padding_outside_extent(block_shape, pad_width, tlc, props):
+    """
+    Number of padding rows and columns of pixel block which are outside of the raster extent, on each side.
+
+    Parameters
+    ----------
+    block_shape : tuple
+        Shape (rows, columns) of pixel block with padding.
+    pad_width : int
+        Padding of pixel block in pixels.
+    tlc : tuple
+        Top left corner (x, y) of requested pixel block (without padding), updatePixels argument.
+    props : dict
+        Output raster properties, updatePixels argument (keys extent and cellSize are used).
+
+    Returns
+    -------
+    sides : tuple
+        (top, bottom, left, right) number of rows (columns) outside of raster extent, between 0 and pad_width,
+        None if tlc or raster extent isn't known.
+    """
+    if tlc is None or props is None or props.get("extent") is None or props.get("cellSize") is None:
+        return None
+    x_min, y_min, x_max, y_max = props["extent"]
+    cell_x, cell_y = props["cellSize"][0], props["cellSize"][1]
+    rows, columns = block_shape
+    block_left = tlc[0] - pad_width * cell_x
+    block_top = tlc[1] + pad_width * cell_y
+    top = int(round((block_top - y_max) / cell_y))
+    bottom = int(round((y_min - (block_top - rows * cell_y)) / cell_y))
+    left = int(round((x_min - block_left) / cell_x))
+    right = int(round((block_left + columns * cell_x - x_max) / cell_x))
+    return tuple(min(max(side, 0), pad_width) for side in (top, bottom, left, right))
+
+
+def zero_padding_sides(dem, pad_width):
+    """
+    Sides of pixel block with padding of zeros (scans pixel values, when raster extent isn't known), returns
+    (top, bottom, left, right) number of rows (columns) to replace, pad_width or 0.
+    """
+    if pad_width <= 0:
+        return 0, 0, 0, 0
+    return tuple(0 if np.any(border) else pad_width
+                 for border in (dem[:pad_width, :], dem[-pad_width:, :], dem[:, :pad_width], dem[:, -pad_width:]))
+
+
+def edge_pad(dem, sides, out=None):
+    """
+    Replaces rows and columns on sides of dem with edge padding (the nearest remaining row or column), the same as
+    removing them and padding back with np.pad(mode="edge"), in one copy.
+
+    Parameters
+    ----------
+    dem : numpy.ndarray
+        Input pixel block (2D).
+    sides : tuple
+        (top, bottom, left, right) number of rows (columns) to replace.
+    out : numpy.ndarray
+        Output array of dem shape (may be dem itself), if None a new array is allocated.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        Edge padded pixel block.
+    """
+    rows, columns = dem.shape
+    top, bottom, left, right = sides
+    bottom = min(bottom, rows - top - 1)  # keep at least one row and column
+    right = min(right, columns - left - 1)
+    if out is None:
+        out = np.empty_like(dem)
+    if out is not dem:
+        out[top:rows - bottom, left:columns - right] = dem[top:rows - bottom, left:columns - right]
+    if top > 0:
+        out[:top, left:columns - right] = out[top, left:columns - right]
+    if bottom > 0:
+        out[rows - bottom:, left:columns - right] = out[rows - bottom - 1, left:columns - right]
+    if left > 0:
+        out[:, :left] = out[:, left:left + 1]
+    if right > 0:
+        out[:, columns - right:] = out[:, columns - right - 1:columns - right]
+    return out
+
+
+def change_0_pad_to_edge_pad(dem, pad_width, tlc=None, props=None, out=None):
+    """
+    Replaces padding of pixel block outside of raster extent (ArcGIS fills it with zeros) with edge padding.
+    Sides are determined from tlc and raster extent (props), if they aren't available sides with padding of only
+    zeros are edge padded.
+
+    Parameters
+    ----------
+    dem : numpy.ndarray
+        Input pixel block (2D) with padding.
+    pad_width : int
+        Padding of pixel block in pixels.
+    tlc : tuple
+        Top left corner of requested pixel block, updatePixels argument.
+    props : dict
+        Output raster properties, updatePixels argument.
+    out : numpy.ndarray
+        Output array of dem shape (may be dem itself), if None a new array is allocated.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        Edge padded pixel block (new array if out is None, even if nothing is padded).
+    """
+    sides = padding_outside_extent(dem.shape, pad_width, tlc, props)
+    if sides is None:
+        sides = zero_padding_sides(dem, pad_width)
+    return edge_pad(dem, sides, out=out)
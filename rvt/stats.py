@@ -0,0 +1,503 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Contains functions for raster statistics (mergeable histograms, percentile cut-offs) shared between tiles.
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# python3 site-packages
+import numpy as np
+
+HISTOGRAM_CACHE_SIZE = 32  # number of rasters (keys) for which histograms are cached
+_histogram_cache = OrderedDict()  # key: list of Histogram (one per band)
+_histogram_cache_lock = threading.Lock()
+STATS_SAMPLE_SIZE = 1024  # decimated read of whole input raster: max number of rows and columns
+STATS_WINDOW_SIZE = 128  # windows (full resolution) read for statistics of visualizations of whole input raster
+STATS_WINDOW_COUNT = 4  # number of windows along each axis
+
+
+class Histogram:
+    """
+    Fixed number of equal bins histogram which can be updated with new images (tiles) and merged with other
+    histograms. When values fall outside of the range the bins are merged in pairs and the range is doubled, so
+    the counts stay exact and the percentile error is at most one bin width ((maximum - minimum) / n_bins). Bin width
+    follows the whole range, so a few outliers can put most values into one bin; if the values the histogram was
+    computed from are still available, pass them to percentile (or cutoffs) to get exact percentiles.
+
+    Parameters
+    ----------
+    minimum : float
+        Lower edge of the first bin.
+    bin_width : float
+        Width of the bins.
+    n_bins : int
+        Number of bins (even).
+    counts : numpy.ndarray
+        Bin counts, zeros if None.
+    """
+
+    def __init__(self, minimum, bin_width, n_bins=4096, counts=None):
+        self.minimum = float(minimum)
+        self.bin_width = float(bin_width)
+        self.n_bins = int(n_bins) + int(n_bins) % 2
+        if counts is None:
+            counts = np.zeros(self.n_bins, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @property
+    def maximum(self):
+        return self.minimum + self.bin_width * self.n_bins
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @classmethod
+    def from_image(cls, image, n_bins=4096):
+        """Histogram of finite values of image (any shape), None if there are none."""
+        return band_histograms(np.reshape(image, (1, -1)), n_bins=n_bins)[0]
+
+    @classmethod
+    def from_arcgis(cls, histogram):
+        """Histogram from ArcGIS raster info histogram (dict with minimum, maximum, size and counts keys) or None."""
+        try:
+            counts = np.asarray(histogram["counts"], dtype=np.int64)
+            minimum = float(histogram["minimum"])
+            maximum = float(histogram["maximum"])
+        except (KeyError, TypeError, ValueError, IndexError):
+            return None
+        if counts.size < 2 or counts.sum() == 0 or not maximum > minimum:
+            return None
+        if counts.size % 2:
+            counts = np.append(counts, 0)
+            maximum += (maximum - minimum) / (counts.size - 1)
+        return cls(minimum=minimum, bin_width=(maximum - minimum) / counts.size, n_bins=counts.size, counts=counts)
+
+    def copy(self):
+        return Histogram(minimum=self.minimum, bin_width=self.bin_width, n_bins=self.n_bins,
+                         counts=self.counts.copy())
+
+    def expand(self, v_min, v_max):
+        """Doubles the range (merging bins in pairs) until it covers v_min-v_max."""
+        while v_min < self.minimum or v_max >= self.maximum:
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            counts = np.zeros(self.n_bins, dtype=np.int64)
+            if v_min < self.minimum:  # grow downwards
+                counts[self.n_bins // 2:] = merged
+                self.minimum -= self.bin_width * self.n_bins
+            else:  # grow upwards
+                counts[:self.n_bins // 2] = merged
+            self.counts = counts
+            self.bin_width *= 2
+
+    def add_values(self, values):
+        """Adds finite 1D values to the histogram."""
+        if values.size == 0:
+            return
+        self.expand(float(values.min()), float(values.max()))
+        i_bin = ((values - self.minimum) / self.bin_width).astype(np.int64)
+        np.clip(i_bin, 0, self.n_bins - 1, out=i_bin)
+        self.counts += np.bincount(i_bin, minlength=self.n_bins)
+
+    def update(self, image):
+        """Adds finite values of image (any shape) to the histogram."""
+        values = np.asarray(image)
+        self.add_values(values[np.isfinite(values)])
+        return self
+
+    def merge(self, other):
+        """Adds counts of other histogram (bin centers are rebinned into this histogram)."""
+        if other is None or other.total == 0:
+            return self
+        centers = other.minimum + (np.arange(other.n_bins) + 0.5) * other.bin_width
+        nonzero = other.counts > 0
+        self.expand(float(centers[nonzero].min()), float(centers[nonzero].max()))
+        i_bin = ((centers[nonzero] - self.minimum) / self.bin_width).astype(np.int64)
+        np.clip(i_bin, 0, self.n_bins - 1, out=i_bin)
+        self.counts += np.bincount(i_bin, weights=other.counts[nonzero], minlength=self.n_bins).astype(np.int64)
+        return self
+
+    def percentile(self, q, values=None):
+        """
+        Values at percentiles q (0-100, scalar or array), linearly interpolated inside the bin. If values (image of
+        any shape from which the histogram was computed, non finite values are ignored) are given, percentiles are
+        exact (as numpy.nanpercentile): the histogram only selects the values inside the bins of each percentile and
+        only these are partitioned.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        cumulative = np.cumsum(self.counts)
+        total = cumulative[-1]
+        if total == 0:
+            return np.full(q.shape, np.nan)
+        if values is not None:
+            return self._exact_percentile(q, np.asarray(values), cumulative)
+        target = np.maximum(q / 100 * total, 1e-9)  # 0 percentile is the first non-empty bin
+        i_bin = np.searchsorted(cumulative, target, side="left")
+        i_bin = np.clip(i_bin, 0, self.n_bins - 1)
+        before = np.where(i_bin > 0, cumulative[i_bin - 1], 0)
+        in_bin = np.maximum(self.counts[i_bin], 1)
+        fraction = np.clip((target - before) / in_bin, 0, 1)
+        return self.minimum + (i_bin + fraction) * self.bin_width
+
+    def _exact_percentile(self, q, values, cumulative):
+        """Exact percentiles q of values (see percentile), cumulative are cumulative counts."""
+        total = int(cumulative[-1])
+        rank = q.ravel() / 100 * (total - 1)  # sorted index, linear interpolation between lower and upper
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.minimum(lower + 1, total - 1)
+        value_lower, value_upper = np.split(np.array(sorted_values(values, np.concatenate([lower, upper]),
+                                                                   histogram=self)), 2)
+        return (value_lower + (rank - lower) * (value_upper - value_lower)).reshape(q.shape)
+
+    def arcgis_statistics(self):
+        """ArcGIS band statistics (minimum, maximum, mean, standardDeviation) estimated from the histogram."""
+        centers = self.minimum + (np.arange(self.n_bins) + 0.5) * self.bin_width
+        mean = float(np.average(centers, weights=self.counts))
+        std = float(np.sqrt(np.average((centers - mean) ** 2, weights=self.counts)))
+        minimum, maximum = [float(value) for value in self.percentile([0, 100])]
+        return {'minimum': minimum, 'maximum': maximum, 'mean': mean, 'standardDeviation': std}
+
+    def arcgis_histogram(self, size=256):
+        """ArcGIS band histogram (minimum, maximum, size, counts) with size bins between minimum and maximum."""
+        minimum, maximum = [float(value) for value in self.percentile([0, 100])]
+        nonzero = self.counts > 0
+        centers = self.minimum + (np.arange(self.n_bins)[nonzero] + 0.5) * self.bin_width
+        bin_width = (maximum - minimum) / size if maximum > minimum else 1.
+        i_bin = np.clip(((centers - minimum) / bin_width).astype(np.int64), 0, size - 1)
+        counts = np.bincount(i_bin, weights=self.counts[nonzero], minlength=size).astype(np.int64)
+        return {'minimum': minimum, 'maximum': maximum, 'size': size, 'counts': counts}
+
+    def cutoffs(self, minimum, maximum, values=None):
+        """Minimum cutoff in percent, maximum cutoff in percent (0%-100%). Returns min and max values for linear
+        stretch (cut-off), like rvt.blend_func.lin_cutoff_calc_from_perc. Exact if values are given (see
+        percentile)."""
+        distribution = self.percentile([minimum, 100 - maximum], values=values)
+        min_lin = float(distribution[0])
+        max_lin = float(distribution[1])
+        if min_lin == max_lin:
+            min_lin, max_lin = [float(value) for value in self.percentile([0, 100], values=values)]
+        return {"min_lin": min_lin, "max_lin": max_lin}
+
+
+def band_histograms(image, n_bins=4096):
+    """
+    Histograms of all bands of image (2D or 3D: bands, rows, columns) in one pass, one bincount for all bands.
+    Returns list of Histogram (None for band without finite values).
+    """
+    bands = np.asarray(image)
+    if bands.ndim == 2:
+        bands = bands[np.newaxis]
+    bands = bands.reshape(bands.shape[0], -1)
+    if not np.issubdtype(bands.dtype, np.floating):
+        bands = bands.astype(np.float64)
+    n_bins = n_bins + n_bins % 2
+    finite = np.isfinite(bands)
+    v_min = np.fmin.reduce(bands, axis=1).astype(np.float64)  # ignores nan
+    v_max = np.fmax.reduce(bands, axis=1).astype(np.float64)
+    if not (np.isfinite(v_min[~np.isnan(v_min)]).all() and np.isfinite(v_max[~np.isnan(v_max)]).all()):  # inf
+        v_min = np.min(bands, axis=1, where=finite, initial=np.inf).astype(np.float64)
+        v_max = np.max(bands, axis=1, where=finite, initial=-np.inf).astype(np.float64)
+    empty = ~np.isfinite(v_min)  # band without finite values
+    v_min[empty] = 0
+    v_max[empty] = 0
+    bin_width = (v_max - v_min) / (n_bins - 1)  # maximum value inside the last bin
+    constant = ~(bin_width > 0)
+    bin_width[constant] = np.maximum(np.abs(v_min[constant]), 1.) * 1e-6 / n_bins
+    # bin index, non finite values go to extra (last) bin of each band
+    i_bin = np.subtract(bands, v_min[:, np.newaxis].astype(bands.dtype))
+    i_bin *= (1 / bin_width[:, np.newaxis]).astype(bands.dtype)
+    np.copyto(i_bin, n_bins, where=~finite)
+    i_bin = i_bin.astype(np.intp)  # values are in 0-n_bins, v_min <= value <= v_max
+    i_bin += np.arange(bands.shape[0])[:, np.newaxis] * (n_bins + 1)
+    counts = np.bincount(i_bin.ravel(), minlength=bands.shape[0] * (n_bins + 1))
+    counts = counts.reshape(bands.shape[0], n_bins + 1)[:, :n_bins]
+    return [None if empty[i] else Histogram(minimum=v_min[i], bin_width=bin_width[i], n_bins=n_bins,
+                                            counts=counts[i]) for i in range(bands.shape[0])]
+
+
+def sorted_values(values, indices, histogram=None, max_depth=3):
+    """
+    Values (float) at indices of sorted finite values of values (any shape), without sorting all of them.
+    Histogram of values (computed if None) selects the values inside the bins of the indices and only these are
+    partitioned. If they are still many (e.g. one outlier put most values into one bin) the same is repeated with
+    histogram of the selected values (up to max_depth times).
+    """
+    values = np.asarray(values)
+    indices = np.asarray(indices, dtype=np.int64)
+    if histogram is None:
+        histogram = Histogram.from_image(values)
+        if histogram is None:
+            return np.full(indices.size, np.nan)
+    cumulative = np.cumsum(histogram.counts)
+    # bins of the indices, one more bin on each side for rounding of the bin edges
+    i_first = np.maximum(np.searchsorted(cumulative, indices, side="right") - 1, 0)
+    i_last = np.searchsorted(cumulative, indices, side="right") + 1
+    n_below_minimum = np.count_nonzero(values < histogram.minimum)  # -inf
+    result = np.empty(indices.size)
+    order = np.argsort(indices, kind="stable")
+    start = 0
+    while start < order.size:  # indices with overlapping bins share the selected values
+        end = start + 1
+        while end < order.size and i_first[order[end]] <= i_last[order[end - 1]]:
+            end += 1
+        group = order[start:end]
+        window_min = histogram.minimum + i_first[group[0]] * histogram.bin_width
+        window_max = np.inf
+        if i_last[group[-1]] < histogram.n_bins - 1:
+            window_max = histogram.minimum + (i_last[group[-1]] + 1) * histogram.bin_width
+        below = np.count_nonzero(values < window_min) - n_below_minimum
+        window = values[(values >= window_min) & (values < window_max)]
+        if indices[group[0]] < below or indices[group[-1]] - below >= window.size:  # values don't match histogram
+            window = values[np.isfinite(values)]
+            below = 0
+        group_indices = indices[group] - below
+        if max_depth > 0 and window.size > 4 * histogram.n_bins and window.size < cumulative[-1]:
+            result[group] = sorted_values(window, group_indices, max_depth=max_depth - 1)
+        else:
+            window = np.partition(window, np.unique(group_indices))
+            result[group] = window[group_indices]
+        start = end
+    return result
+
+
+def compute_histogram(images, n_bins=4096, step=1):
+    """
+    Streams over images (iterable of tiles or bands, any shape) once and returns their merged Histogram (None if
+    there are no finite values). If step > 1 only every step-th pixel in each direction is sampled.
+    """
+    histogram = None
+    for image in images:
+        image = np.asarray(image)
+        if step > 1:
+            image = image[..., ::step, ::step]
+        if histogram is None:
+            histogram = Histogram.from_image(image, n_bins=n_bins)
+        else:
+            histogram.update(image)
+    return histogram
+
+
+def histograms_from_raster_info(raster_info):
+    """Histograms (list, one per band) from ArcGIS raster info, None if they are not available."""
+    if raster_info is None:
+        return None
+    histograms = [Histogram.from_arcgis(histogram) for histogram in (raster_info.get("histogram") or ())]
+    if len(histograms) == 0 or any(histogram is None for histogram in histograms):
+        return None
+    return histograms
+
+
+def histogram_cache_key(raster_info, *parameters):
+    """Cache key of raster (extent, cell size, bands, pixel type from ArcGIS raster info) and function parameters."""
+    raster_info = raster_info or {}
+    raster = tuple(repr(raster_info.get(name)) for name in ("extent", "nativeExtent", "cellSize", "bandCount",
+                                                           "pixelType", "noData"))
+    return raster + tuple(repr(parameter) for parameter in parameters)
+
+
+def cached_histograms(key, compute=None):
+    """Histograms of key, if they aren't cached they are computed by compute() (list of Histogram or None) and
+    cached. Returns None if they aren't available."""
+    with _histogram_cache_lock:
+        histograms = _histogram_cache.get(key)
+        if histograms is not None:
+            _histogram_cache.move_to_end(key)
+            return histograms
+    if compute is None:
+        return None
+    histograms = compute()
+    if histograms is None:
+        return None
+    with _histogram_cache_lock:
+        _histogram_cache[key] = histograms
+        _histogram_cache.move_to_end(key)
+        while len(_histogram_cache) > HISTOGRAM_CACHE_SIZE:
+            _histogram_cache.popitem(last=False)
+    return histograms
+
+
+def input_key(source):
+    """
+    Identity of input raster for histogram cache keys: dataset path (source is path or arcpy Raster) and its
+    modification time or hash of numpy array (source is array of whole raster). None if source is unknown.
+    """
+    if isinstance(source, np.ndarray):
+        digest = hashlib.blake2b(np.ascontiguousarray(source).data, digest_size=16).hexdigest()
+        return "array", source.shape, source.dtype.str, digest
+    path = source if isinstance(source, str) else getattr(source, "catalogPath", None)
+    if not path:
+        return None
+    try:
+        modified = os.path.getmtime(path)
+    except OSError:  # e.g. raster in geodatabase
+        modified = None
+    return "path", os.path.normcase(os.path.abspath(path)), modified
+
+
+def raster_shape(source, raster_info):
+    """Number of rows and columns of whole input raster (array source or ArcGIS raster info extent and cell size)."""
+    if isinstance(source, np.ndarray):
+        return source.shape[-2:]
+    x_min, y_min, x_max, y_max = [float(value) for value in raster_info["extent"]]
+    cell_size = raster_info["cellSize"]
+    return int(round((y_max - y_min) / float(cell_size[1]))), int(round((x_max - x_min) / float(cell_size[0])))
+
+
+def read_window(source, raster_info, row, col, n_rows, n_cols):
+    """
+    Reads window (row, col of upper left pixel, n_rows, n_cols) of whole input raster source (numpy array, dataset
+    path or arcpy Raster). Returns 3D float32 array (bands, rows, columns) with no data (raster_info noData) as np.nan.
+    """
+    if isinstance(source, np.ndarray):
+        window = source[..., row:row + n_rows, col:col + n_cols]
+    else:
+        import arcpy
+        raster = arcpy.Raster(source) if isinstance(source, str) else source
+        extent = [float(value) for value in raster_info["extent"]]
+        cell_size = [float(value) for value in raster_info["cellSize"]]
+        lower_left = arcpy.Point(extent[0] + col * cell_size[0], extent[3] - (row + n_rows) * cell_size[1])
+        window = arcpy.RasterToNumPyArray(raster, lower_left, n_cols, n_rows)
+    window = np.array(window, dtype=np.float32)
+    if window.ndim == 2:
+        window = window[np.newaxis]
+    no_data = raster_info.get("noData") if raster_info else None
+    if no_data is not None:
+        no_data = np.broadcast_to(np.asarray(no_data, dtype=np.float64).ravel(), (window.shape[0],))
+        for i_band in range(window.shape[0]):
+            if not np.isnan(no_data[i_band]):
+                window[i_band][window[i_band] == np.float32(no_data[i_band])] = np.nan
+    return window
+
+
+def read_decimated(source, raster_info, size=STATS_SAMPLE_SIZE):
+    """
+    Decimated read of whole input raster (see read_window): every step-th row and column, so there are at most size
+    of them. Returns 3D float32 array (bands, rows, columns) or None if source can't be read.
+    """
+    try:
+        n_rows, n_cols = raster_shape(source, raster_info)
+        step = max(-(-max(n_rows, n_cols) // size), 1)
+        if isinstance(source, np.ndarray):
+            return read_window(source[..., ::step, ::step], raster_info, 0, 0, n_rows, n_cols)
+        rows = [read_window(source, raster_info, row, 0, 1, n_cols)[..., ::step] for row in range(0, n_rows, step)]
+        return np.concatenate(rows, axis=1)
+    except Exception:  # no arcpy or source is not a dataset
+        return None
+
+
+def input_histograms(source, raster_info, size=STATS_SAMPLE_SIZE):
+    """
+    Histograms (list, one per band) of whole input raster from its decimated read (see read_decimated), computed
+    before any tile and cached by input (see input_key), so they don't depend on which tiles are rendered. Returns
+    None if input can't be read.
+    """
+    identity = input_key(source)
+    if identity is None:
+        return None
+
+    def compute():
+        sample = read_decimated(source, raster_info, size=size)
+        if sample is None:
+            return None
+        histograms = band_histograms(sample)
+        if any(histogram is None for histogram in histograms):  # band without values
+            return None
+        return histograms
+
+    return cached_histograms(histogram_cache_key(raster_info, identity, "input", size), compute)
+
+
+def _window_origins(n, size, count):
+    """First pixels of count windows of size pixels spread evenly over n pixels."""
+    if n <= size:
+        return [0]
+    return sorted(set(int(round(origin)) for origin in np.linspace(0, n - size, count)))
+
+
+def sample_windows(source, raster_info, padding=0, size=STATS_WINDOW_SIZE, count=STATS_WINDOW_COUNT):
+    """
+    Reads count x count windows (size x size pixels, full resolution, first band) spread evenly over whole input
+    raster (see read_window), each with padding pixels on each side, edge padded at raster edges like raster function
+    pixel blocks. Returns list of 2D float32 arrays (np.nan is no data).
+    """
+    n_rows, n_cols = raster_shape(source, raster_info)
+    windows = []
+    for row in _window_origins(n_rows, size, count):
+        for col in _window_origins(n_cols, size, count):
+            top = max(row - padding, 0)
+            left = max(col - padding, 0)
+            bottom = min(row + size + padding, n_rows)
+            right = min(col + size + padding, n_cols)
+            window = read_window(source, raster_info, top, left, bottom - top, right - left)[0]
+            pad_width = ((padding - (row - top), padding - (bottom - min(row + size, n_rows))),
+                         (padding - (col - left), padding - (right - min(col + size, n_cols))))
+            windows.append(np.pad(window, pad_width, mode="edge"))
+    return windows
+
+
+def output_histograms(source, raster_info, parameters, visualization, padding=0):
+    """
+    Histograms (list, one per band) of visualization of whole input raster, computed before any tile from
+    visualization of windows spread over the raster (see sample_windows) and cached by input (see input_key) and
+    parameters (tuple, identify visualization). Visualization gets window with padding (like updatePixels gets pixel
+    block) and returns visualization without padding (2D or 3D: bands, rows, columns). Returns None if input can't be
+    read.
+    """
+    identity = input_key(source)
+    if identity is None:
+        return None
+
+    def compute():
+        try:
+            windows = sample_windows(source, raster_info, padding=padding)
+        except Exception:  # no arcpy or source is not a dataset
+            return None
+        outputs = [np.asarray(visualization(window)) for window in windows]
+        outputs = [output if output.ndim == 3 else output[np.newaxis] for output in outputs]
+        histograms = [compute_histogram(output[i_band] for output in outputs) for i_band in range(outputs[0].shape[0])]
+        if any(histogram is None for histogram in histograms):  # band without values
+            return None
+        return histograms
+
+    return cached_histograms(histogram_cache_key(raster_info, identity, "output", padding, *parameters), compute)
+
+
+def set_output_statistics(output_info, minimum=None, maximum=None, histograms=None):
+    """
+    Sets statistics and histogram of ArcGIS output info (all bandCount bands) so ArcGIS doesn't have to read the
+    whole output before display. If minimum and maximum (analytic range) are given they are used, else histograms
+    (list, one per band, see output_histograms) if they are available, else they are empty.
+    """
+    band_count = int(output_info.get('bandCount', 1))
+    output_info['histogram'] = ()
+    output_info['statistics'] = ()
+    if minimum is not None and maximum is not None:
+        output_info['statistics'] = band_count * ({'minimum': minimum, 'maximum': maximum},)
+    elif histograms is not None and len(histograms) == band_count:
+        output_info['statistics'] = tuple(histogram.arcgis_statistics() for histogram in histograms)
+        output_info['histogram'] = tuple(histogram.arcgis_histogram() for histogram in histograms)
+
+
+def clear_histogram_cache():
+    """Removes all cached histograms."""
+    with _histogram_cache_lock:
+        _histogram_cache.clear()
@@ -19,10 +19,27 @@ Copyright:
 """
 
 # python libraries
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+
 import numpy as np
-from scipy.interpolate import griddata, RectBivariateSpline
-from scipy.ndimage.morphology import distance_transform_edt
-from scipy.spatial import cKDTree
+import rvt.padding
+import rvt.workspace
+# scipy and concurrent.futures (slow to import) are imported in void filling and sky illumination functions,
+# which are the only ones that need them
+
+# Max number of DEM pyramids kept in cache (see horizon_generate_pyramids)
+PYRAMID_CACHE_SIZE = 4
+_pyramid_cache = OrderedDict()
+_pyramid_cache_lock = threading.Lock()
+# Horizon search movements (see horizon_shift_vector), keyed by (num_directions, radius_pixels, min_radius)
+_shift_vector_cache = {}
+_shift_vector_cache_lock = threading.Lock()
+# Number of tiles of each class (see classify_tile) by visualization function, (function, tile class): count
+_tile_class_counts = Counter()
+_tile_class_counts_lock = threading.Lock()
 
 
 def byte_scale(data,
@@ -114,12 +131,79 @@ def byte_scale(data,
         return np.array(byte_data_bands)
 
 
+def prepare_dem(dem, ve_factor=1, resolution=1, no_data=None, overwrite_dem=False):
+    """
+    Prepares input DEM for visualization functions: float32, no_data changed to np.nan, multiplied with ve_factor
+    and divided by resolution (vertical exaggeration and elevation in pixel units) in one pass, scaling is skipped
+    if both are 1. If overwrite_dem is True and dem is float32 array it is changed in place (no copy), otherwise it is
+    copied once.
+    """
+    if overwrite_dem and isinstance(dem, np.ndarray) and dem.dtype == np.float32:
+        dem_out = dem
+    else:
+        dem_out = np.array(dem, dtype=np.float32)
+    if no_data is not None and not np.isnan(no_data):
+        dem_out[dem_out == no_data] = np.nan
+    if ve_factor != 1 and resolution != 1:
+        dem_out *= np.float32(ve_factor / resolution)
+    elif ve_factor != 1:
+        dem_out *= np.float32(ve_factor)
+    elif resolution != 1:
+        dem_out /= np.float32(resolution)
+    return dem_out
+
+
+def classify_tile(dem):
+    """
+    Classifies tile (prepared dem, no data is np.nan), so that visualization functions can skip work:
+    'nodata' (all pixels are nan), 'constant' (no nan and all pixels are equal, e.g. water surface),
+    'valid' (no nan, nan mask doesn't have to be applied to outputs) or 'voids' (some pixels are nan).
+    Tiles without nan are classified with min and max only (no mask is allocated).
+    """
+    minimum = dem.min()  # nan if there is any nan
+    if np.isnan(minimum):
+        if np.isnan(dem).all():
+            return "nodata"
+        return "voids"
+    if minimum == dem.max():
+        return "constant"
+    return "valid"
+
+
+def tile_class(dem, function):
+    """Classifies tile with classify_tile and counts it for function (see fast_path_stats)."""
+    tile = classify_tile(dem)
+    with _tile_class_counts_lock:
+        _tile_class_counts[(function, tile)] += 1
+    return tile
+
+
+def fast_path_stats():
+    """
+    Number of tiles of each class by visualization function, {function: {tile class: count}}. For 'nodata' and
+    'constant' tiles (fast paths) outputs are returned without computation (where they are known, see functions),
+    for 'valid' tiles nan masks are skipped.
+    """
+    stats = {}
+    with _tile_class_counts_lock:
+        for (function, tile), count in _tile_class_counts.items():
+            stats.setdefault(function, {})[tile] = count
+    return stats
+
+
+def clear_fast_path_stats():
+    """Resets counters of fast_path_stats."""
+    with _tile_class_counts_lock:
+        _tile_class_counts.clear()
+
+
 def slope_aspect(dem,
                  resolution_x=1,
                  resolution_y=1,
                  output_units="radian",
                  ve_factor=1,
-                 no_data=None
+                 no_data=None,
+                 overwrite_dem=False
                  ):
     """
     Procedure can return terrain slope and aspect in radian units (default) or in alternative units (if specified).
@@ -146,6 +230,8 @@ def slope_aspect(dem,
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan. Only has to be specified if
         a numerical value is used for nodata (e.g. -9999).
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
 
     Returns
     -------
@@ -160,26 +246,28 @@ def slope_aspect(dem,
         raise Exception("rvt.visualization.slope_aspect: ve_factor must be between -10000 and 10000!")
     if resolution_x < 0 or resolution_y < 0:
         raise Exception("rvt.visualization.slope_aspect: resolution must be a positive number!")
+    if output_units not in ("percent", "degree", "radian"):
+        raise Exception("rvt.visualization.calculate_slope: Wrong function input 'output_units'!")
 
-    # Make sure array has the correct dtype!
-    dem = dem.astype(np.float32)
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
 
-    # Change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
+    tile = tile_class(dem, "slope_aspect")
+    if tile == "nodata" or tile == "constant":  # slope and aspect are nan or 0 (also in all units)
+        fill_value = np.nan if tile == "nodata" else 0
+        return {"slope": np.full(dem.shape, fill_value, dtype=np.float32),
+                "aspect": np.full(dem.shape, fill_value, dtype=np.float32)}
 
     # Save NaN mask
-    nan_dem = np.isnan(dem)
+    nan_dem = np.isnan(dem) if tile == "voids" else None
 
     # Add 1 pixel edge padding
     dem = np.pad(array=dem, pad_width=1, mode="edge")
 
-    # Vertical exaggeration
-    dem = dem * ve_factor
-
-    # Derivatives in X and Y direction
-    dzdx = ((roll_fill_nans(dem, 1, axis=1) - roll_fill_nans(dem, -1, axis=1)) / 2) / resolution_x
-    dzdy = ((roll_fill_nans(dem, -1, axis=0) - roll_fill_nans(dem, 1, axis=0)) / 2) / resolution_y
+    # Derivatives in X and Y direction (without voids roll doesn't have to fill nans)
+    roll = roll_fill_nans if tile == "voids" else np.roll
+    dzdx = ((roll(dem, 1, axis=1) - roll(dem, -1, axis=1)) / 2) / resolution_x
+    dzdy = ((roll(dem, -1, axis=0) - roll(dem, 1, axis=0)) / 2) / resolution_y
     tan_slope = np.sqrt(dzdx ** 2 + dzdy ** 2)
 
     # Compute slope
@@ -207,8 +295,9 @@ def slope_aspect(dem,
     slope_out = slope_out[1:-1, 1:-1]
 
     # Apply NaN mask
-    slope_out[nan_dem] = np.nan
-    aspect_out[nan_dem] = np.nan
+    if nan_dem is not None:
+        slope_out[nan_dem] = np.nan
+        aspect_out[nan_dem] = np.nan
 
     return {"slope": slope_out, "aspect": aspect_out}
 
@@ -236,7 +325,8 @@ def hillshade(dem,
               slope=None,
               aspect=None,
               ve_factor=1,
-              no_data=None
+              no_data=None,
+              overwrite_dem=False
               ):
     """
     Compute hillshade.
@@ -261,6 +351,8 @@ def hillshade(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan.
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
 
     Returns
     -------
@@ -276,15 +368,6 @@ def hillshade(dem,
     if resolution_x < 0 or resolution_y < 0:
         raise Exception("rvt.visualization.hillshade: resolution must be a positive number!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
-
-    dem = dem.astype(np.float32)
-    # add 1 pixel edge padding
-    dem = np.pad(array=dem, pad_width=1, mode="edge")
-    dem = dem * ve_factor
-
     # Convert solar position (degrees) to radians
     sun_azimuth_rad = np.deg2rad(sun_azimuth)
     sun_elevation_rad = np.deg2rad(sun_elevation)
@@ -292,11 +375,20 @@ def hillshade(dem,
     # Convert to solar zenith angle
     sun_zenith_rad = np.pi / 2 - sun_elevation_rad
 
-    # are slope and aspect already calculated and presented
+    # are slope and aspect already calculated and presented (dem is only needed to calculate them)
     if slope is None or aspect is None:
+        # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+        dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
+        tile = tile_class(dem, "hillshade")
+        if tile == "nodata":
+            return np.full(dem.shape, np.nan, dtype=np.float32)
+        elif tile == "constant":  # slope is 0, hillshade is cos of solar zenith angle
+            return np.full(dem.shape, max(np.cos(sun_zenith_rad), 0), dtype=np.float32)
+        # add 1 pixel edge padding
+        dem = np.pad(array=dem, pad_width=1, mode="edge")
         # calculates slope and aspect
         dict_slp_asp = slope_aspect(dem=dem, resolution_x=resolution_x, resolution_y=resolution_y,
-                                    output_units="radian")
+                                    output_units="radian", overwrite_dem=True)
         slope = dict_slp_asp["slope"]
         aspect = dict_slp_asp["aspect"]
 
@@ -320,7 +412,8 @@ def multi_hillshade(dem,
                     slope=None,
                     aspect=None,
                     ve_factor=1,
-                    no_data=None
+                    no_data=None,
+                    overwrite_dem=False
                     ):
     """
     Calculates hillshades from multiple directions.
@@ -345,6 +438,8 @@ def multi_hillshade(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
 
     Returns
     -------
@@ -362,78 +457,91 @@ def multi_hillshade(dem,
     if not (10000 >= ve_factor >= -10000):
         raise Exception("rvt.visualization.multi_hillshade: ve_factor must be between -10000 and 10000!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
-
-    dem = dem.astype(np.float32)
-    dem = dem * ve_factor
-
-    # calculates slope and aspect if they are not added
+    # calculates slope and aspect if they are not added (dem is only needed to calculate them)
     if slope is None or aspect is None:  # slope and aspect are the same, so we have to calculate it once
+        # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+        dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
         dict_slp_asp = slope_aspect(dem=dem, resolution_x=resolution_x, resolution_y=resolution_y,
-                                    output_units="radian")
+                                    output_units="radian", overwrite_dem=True)
         slope = dict_slp_asp["slope"]
         aspect = dict_slp_asp["aspect"]
 
-    hillshades_arr_list = []  # list of all hillshades in different directions
+    multi_hillshade_out = None  # hillshades in different directions (bands), allocated with the first one
     for i_direction in range(nr_directions):
         sun_azimuth = (360 / nr_directions) * i_direction
         hillshading = hillshade(dem=dem, resolution_x=resolution_x, resolution_y=resolution_y,
                                 sun_elevation=sun_elevation, sun_azimuth=sun_azimuth, slope=slope, aspect=aspect)
-        hillshades_arr_list.append(hillshading)
-    multi_hillshade_out = np.asarray(hillshades_arr_list)
+        if multi_hillshade_out is None:
+            multi_hillshade_out = np.empty((nr_directions,) + hillshading.shape, dtype=hillshading.dtype)
+        multi_hillshade_out[i_direction] = hillshading
 
     return multi_hillshade_out
 
 
-def mean_filter(dem, kernel_radius):
+def mean_filter(dem, kernel_radius, workspace=None):
     """Applies mean filter (low pass filter) on DEM. Kernel radius is in pixels. Kernel size is 2 * kernel_radius + 1.
-    It uses matrix shifting (roll) instead of convolutional approach (works faster).
+    Kernel sums are differences of integral images (summed-area tables), which works faster than convolution.
+    Work arrays are taken from workspace (rvt.workspace.Workspace) if given.
     It returns mean filtered dem as numpy.ndarray (2D numpy array)."""
     radius_cell = int(kernel_radius)
 
     if kernel_radius == 0:
         return dem
 
-    # store nans
-    idx_nan_dem = np.isnan(dem)
+    rows, columns = dem.shape
+    kernel_size = 2 * radius_cell + 1
+    pad_shape = (rows + kernel_size, columns + kernel_size)
 
-    # mean filter
-    dem_pad = np.pad(dem, (radius_cell + 1, radius_cell), mode="edge")
+    # mean filter, edge padding (radius_cell + 1 before, radius_cell after)
+    dem_pad = rvt.workspace.empty(workspace, "mean_filter_dem_pad", pad_shape, dem.dtype)
+    dem_pad[radius_cell + 1:radius_cell + 1 + rows, radius_cell + 1:radius_cell + 1 + columns] = dem
+    rvt.padding.edge_pad(dem_pad, (radius_cell + 1, radius_cell, radius_cell + 1, radius_cell), out=dem_pad)
     # store nans
-    idx_nan_dem_pad = np.isnan(dem_pad)
+    idx_nan_dem_pad = rvt.workspace.empty(workspace, "mean_filter_nan_pad", pad_shape, bool)
+    np.isnan(dem_pad, out=idx_nan_dem_pad)
     # change nan to 0
     dem_pad[idx_nan_dem_pad] = 0
 
     # kernel nr pixel integral image
-    dem_i_nr_pixels = np.ones(dem_pad.shape)
-    dem_i_nr_pixels[idx_nan_dem_pad] = 0
-    dem_i_nr_pixels = integral_image(dem_i_nr_pixels, np.int64)
-
-    dem_i1 = integral_image(dem_pad)
-
-    kernel_nr_pix_arr = (np.roll(dem_i_nr_pixels, (radius_cell, radius_cell), axis=(0, 1)) +
-                         np.roll(dem_i_nr_pixels, (-radius_cell - 1, -radius_cell - 1), axis=(0, 1)) -
-                         np.roll(dem_i_nr_pixels, (-radius_cell - 1, radius_cell), axis=(0, 1)) -
-                         np.roll(dem_i_nr_pixels, (radius_cell, -radius_cell - 1), axis=(0, 1)))
-    mean_out = (np.roll(dem_i1, (radius_cell, radius_cell), axis=(0, 1)) +
-                np.roll(dem_i1, (-radius_cell - 1, -radius_cell - 1), axis=(0, 1)) -
-                np.roll(dem_i1, (-radius_cell - 1, radius_cell), axis=(0, 1)) -
-                np.roll(dem_i1, (radius_cell, -radius_cell - 1), axis=(0, 1)))
-    mean_out = mean_out / kernel_nr_pix_arr
+    valid_pad = np.logical_not(idx_nan_dem_pad, out=idx_nan_dem_pad)
+    dem_i_nr_pixels = rvt.workspace.empty(workspace, "mean_filter_i_nr_pixels", pad_shape, np.int64)
+    np.cumsum(valid_pad, axis=0, dtype=np.int64, out=dem_i_nr_pixels)
+    np.cumsum(dem_i_nr_pixels, axis=1, out=dem_i_nr_pixels)
+
+    dem_i1 = rvt.workspace.empty(workspace, "mean_filter_i1", pad_shape, np.float64)
+    np.cumsum(dem_pad, axis=0, dtype=np.float64, out=dem_i1)
+    np.cumsum(dem_i1, axis=1, out=dem_i1)
+
+    # kernel sums for the original extent (padding is not computed)
+    kernel_nr_pix_arr = rvt.workspace.empty(workspace, "mean_filter_nr_pix", (rows, columns), np.int64)
+    kernel_sum(dem_i_nr_pixels, kernel_size, out=kernel_nr_pix_arr)
+    mean_out = rvt.workspace.empty(workspace, "mean_filter_sum", (rows, columns), np.float64)
+    kernel_sum(dem_i1, kernel_size, out=mean_out)
+    np.divide(mean_out, kernel_nr_pix_arr, out=mean_out)
     mean_out = mean_out.astype(np.float32)
-    mean_out = mean_out[radius_cell:-(radius_cell + 1), radius_cell:-(radius_cell + 1)]  # remove padding
     # nan back to nan
-    mean_out[idx_nan_dem] = np.nan
+    mean_out[np.isnan(dem)] = np.nan
 
     return mean_out
 
 
+def kernel_sum(integral, kernel_size, out=None):
+    """Sums of kernel_size x kernel_size windows from integral image (summed-area table) of array padded with
+    kernel_size // 2 + 1 before and kernel_size // 2 after, for the original (not padded) extent."""
+    rows = integral.shape[0] - kernel_size
+    columns = integral.shape[1] - kernel_size
+    out = np.add(integral[:rows, :columns], integral[kernel_size:, kernel_size:], out=out)
+    np.subtract(out, integral[kernel_size:, :columns], out=out)
+    np.subtract(out, integral[:rows, kernel_size:], out=out)
+    return out
+
+
 def slrm(dem,
          radius_cell=20,
          ve_factor=1,
-         no_data=None
+         no_data=None,
+         overwrite_dem=False,
+         workspace=None
          ):
     """
     Calculates Simple local relief model.
@@ -448,6 +556,10 @@ def slrm(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -461,26 +573,31 @@ def slrm(dem,
     if not (10000 >= ve_factor >= -10000):
         raise Exception("rvt.visualization.slrm: ve_factor must be between -10000 and 10000!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
 
-    dem = dem.astype(np.float32)
-    dem = dem * ve_factor
+    tile = tile_class(dem, "slrm")
+    if tile == "nodata":
+        return np.full(dem.shape, np.nan, dtype=np.float32)
+    elif tile == "constant":  # dem is equal to its mean
+        return np.zeros(dem.shape, dtype=np.float32)
 
     # mean filter
-    dem_mean_filter = mean_filter(dem=dem, kernel_radius=radius_cell)
-    slrm_out = dem - dem_mean_filter
+    dem_mean_filter = mean_filter(dem=dem, kernel_radius=radius_cell, workspace=workspace)
+    slrm_out = np.subtract(dem, dem_mean_filter, out=dem_mean_filter)
 
     return slrm_out
 
 
 def horizon_shift_vector(num_directions=16,
                          radius_pixels=10,
-                         min_radius=1
+                         min_radius=1,
+                         use_cache=True
                          ):
     """
     Calculates Sky-View determination movements.
+    Movements depend only on the parameters, if use_cache is True they are computed once and reused by the following
+    calls (tiles). Cached dict is shared, it must not be modified.
 
     Parameters
     ----------
@@ -490,6 +607,8 @@ def horizon_shift_vector(num_directions=16,
         Radius to consider in pixels (not in meters).
     min_radius : int
         Radius to start searching for horizon in pixels (not in meters).
+    use_cache : bool
+        If True movements are taken from (and stored to) the cache.
 
     Returns
     -------
@@ -500,16 +619,62 @@ def horizon_shift_vector(num_directions=16,
             - the second key is "distance":
                 values for this key is a list of search radius used for the computation of the elevation angle 
     """
+    if use_cache:
+        cache_key = (num_directions, radius_pixels, min_radius)
+        with _shift_vector_cache_lock:
+            shift = _shift_vector_cache.get(cache_key)
+        if shift is not None:
+            return shift
 
     # Initialize the output dict
     shift = {}
 
-    # Generate angles and corresponding normal shifts in X (columns)
-    # and Y (lines) direction
+    # Generate angles of search directions
     angles = (2 * np.pi / num_directions) * np.arange(num_directions)
-    x = np.cos(angles)
-    y = np.sin(angles)
-    angles = np.round(np.degrees(angles), decimals=1)
+
+    # For each direction compute all possible horizon point position
+    for i in range(num_directions):
+        # write for each direction shifts and corresponding distances
+        shift[np.round(np.degrees(angles[i]), decimals=1)] = horizon_shift_direction(angles[i], radius_pixels,
+                                                                                      min_radius)
+
+    if use_cache:
+        with _shift_vector_cache_lock:
+            _shift_vector_cache[cache_key] = shift
+
+    return shift
+
+
+def clear_shift_vector_cache():
+    """Empties the cache of horizon search movements (see horizon_shift_vector)."""
+    with _shift_vector_cache_lock:
+        _shift_vector_cache.clear()
+
+
+def horizon_shift_direction(angle,
+                            radius_pixels=10,
+                            min_radius=1
+                            ):
+    """
+    Calculates Sky-View determination movements for a single direction.
+
+    Parameters
+    ----------
+    angle : float
+        Search direction in radians (the same angle convention as in horizon_shift_vector).
+    radius_pixels : int
+        Radius to consider in pixels (not in meters).
+    min_radius : int
+        Radius to start searching for horizon in pixels (not in meters).
+
+    Returns
+    -------
+    shift : dict
+        {"shift": list of tuples prepared for np.roll, "distance": search radius used for each shift}
+    """
+    # Normal shifts in X (columns) and Y (lines) direction
+    x = np.cos(angle)
+    y = np.sin(angle)
 
     # Generate a range of radius values in pixels.
     # Make it finer for the selected scaling.
@@ -518,26 +683,21 @@ def horizon_shift_vector(num_directions=16,
     scale = 3.
     radii = np.arange((radius_pixels - min_radius) * scale + 1) / scale + min_radius
 
-    # For each direction compute all possible horizon point position
-    # and round them to integers
-    for i in range(num_directions):
-        x_int = np.round(x[i] * radii, decimals=0)
-        y_int = np.round(y[i] * radii, decimals=0)
-        # consider only the minimal number of points
-        # use the trick with set and complex number as the input
-        coord_complex = set(x_int + 1j * y_int)
-        # to sort proportional with increasing radius, 
-        # set has to be converted to numpy array
-        shift_pairs = np.array([(k.real, k.imag) for k in coord_complex]).astype(int)
-        distance = np.sqrt(np.sum(shift_pairs ** 2, axis=1))
-        sort_index = np.argsort(distance)
-        # write for each direction shifts and corresponding distances
-        shift[angles[i]] = {
-            "shift": [(k[0], k[1]) for k in shift_pairs[sort_index]],
-            "distance": distance[sort_index],
-        }
-
-    return shift
+    # Compute all possible horizon point position and round them to integers
+    x_int = np.round(x * radii, decimals=0)
+    y_int = np.round(y * radii, decimals=0)
+    # consider only the minimal number of points
+    # use the trick with set and complex number as the input
+    coord_complex = set(x_int + 1j * y_int)
+    # to sort proportional with increasing radius, 
+    # set has to be converted to numpy array
+    shift_pairs = np.array([(k.real, k.imag) for k in coord_complex]).astype(int)
+    distance = np.sqrt(np.sum(shift_pairs ** 2, axis=1))
+    sort_index = np.argsort(distance)
+    return {
+        "shift": [(k[0], k[1]) for k in shift_pairs[sort_index]],
+        "distance": distance[sort_index],
+    }
 
 
 def sky_view_factor_compute(height_arr,
@@ -549,7 +709,9 @@ def sky_view_factor_compute(height_arr,
                             compute_asvf=False,
                             a_main_direction=315.,
                             a_poly_level=4,
-                            a_min_weight=0.4
+                            a_min_weight=0.4,
+                            halo=0,
+                            workspace=None
                             ):
     """
     Calculates horizon based visualizations: Sky-view factor, Anisotropic SVF and Openness.
@@ -586,6 +748,12 @@ def sky_view_factor_compute(height_arr,
         Weight to consider anisotropy:
                  0 - low anisotropy, 
                  1 - high  anisotropy (no illumination from the direction opposite the main direction)
+    halo : int
+        Number of pixels on each side of height_arr which are only context for horizon search (e.g. tile padding),
+        outputs are computed for height_arr[halo:-halo, halo:-halo]. Mirrored padding is added only if halo is smaller
+        than radius_max.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -596,21 +764,28 @@ def sky_view_factor_compute(height_arr,
         opns_out, openness : 2D numpy array (numpy.ndarray) openness (elevation angle of horizon).
     """
 
-    # Pad the array for the radius_max on all 4 sides
-    height = np.pad(height_arr, radius_max, mode='reflect')
+    # Pad the array on all 4 sides, so there is radius_max of context (halo and padding) around the output extent
+    pad_width = max(radius_max - halo, 0)
+    height = height_arr.astype(np.float32, copy=False)
+    if pad_width > 0:
+        height = np.pad(height, pad_width, mode='reflect')
+    # Outputs are computed only for the output extent (halo and padding are cut away), horizon is searched in height
+    margin = pad_width + halo
+    rows, columns = height_arr.shape[0] - 2 * halo, height_arr.shape[1] - 2 * halo
+    height_center = height[margin:margin + rows, margin:margin + columns]
 
     # Compute the vector of movement and corresponding distances
     move = horizon_shift_vector(num_directions=num_directions, radius_pixels=radius_max, min_radius=radius_min)
 
     # Initiate the output for SVF
     if compute_svf:
-        svf_out = height * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
+        svf_out = height_center * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
     else:
         svf_out = None
 
     # Initiate the output for azimuth dependent SVF
     if compute_asvf:
-        asvf_out = height * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
+        asvf_out = height_center * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
         w_m = a_min_weight
         w_a = np.deg2rad(a_main_direction)
         weight = np.arange(num_directions) * (2 * np.pi / num_directions)
@@ -621,47 +796,60 @@ def sky_view_factor_compute(height_arr,
 
     # Initiate the output for Openness
     if compute_opns:
-        opns_out = height * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
+        opns_out = height_center * 0  # Multiply with 0 instead of using np.zeros to preserve nodata
     else:
         opns_out = None
 
+    # Work arrays (original extent), reused for all directions and radii
+    max_slope = rvt.workspace.empty(workspace, "svf_max_slope", (rows, columns), np.float32)
+    slope = rvt.workspace.empty(workspace, "svf_slope", (rows, columns), np.float32)
+
     # Search for horizon in each direction...
     for i_dir, direction in enumerate(move):
         # Reset maximum at each iteration (i.e. at the start of new direction),
         # smallest possible elevation angle is -1000 rad (i.e. -90 deg)
-        max_slope = np.zeros(height.shape, dtype=np.float32) - 1000
+        max_slope.fill(-1000)
 
         # ... and for each search radius
         for i_rad, radius in enumerate(move[direction]["distance"]):
-            # Get shift index from move dictionary
-            shift_indx = move[direction]["shift"][i_rad]
+            # Get shift index from move dictionary (the same as np.roll of height, without wrap around in the extent)
+            shift_row, shift_column = move[direction]["shift"][i_rad]
+            height_shift = height[margin - shift_row:margin - shift_row + rows,
+                                  margin - shift_column:margin - shift_column + columns]
             # Estimate the slope
-            _ = (np.roll(height, shift_indx, axis=(0, 1)) - height) / radius
+            np.subtract(height_shift, height_center, out=slope)
+            np.divide(slope, np.float32(radius), out=slope)
             # Compare to the previous max slope and keep the largest values (element wise). Use np.fmax to prevent NaN
             # values contaminating the edge of the image (if one of the elements is NaN, pick non-NaN element)
-            max_slope = np.fmax(max_slope, _)
+            np.fmax(max_slope, slope, out=max_slope)
 
         # Convert to angle in radians and compute directional output
-        max_slope = np.arctan(max_slope)
+        np.arctan(max_slope, out=max_slope)
 
         # Sum max angle for all directions
-        if compute_svf:
+        if compute_svf or compute_asvf:
             # For SVF minimum possible angle is 0 (hemisphere), use np.fmax() to change NaNs to 0
-            svf_out = svf_out + (1 - np.sin(np.fmax(max_slope, 0)))
-        if compute_asvf:
-            # For SVF minimum possible angle is 0 (hemisphere), use np.fmax() to change NaNs to 0
-            asvf_out = asvf_out + (1 - np.sin(np.fmax(max_slope, 0))) * weight[i_dir]
+            np.fmax(max_slope, 0, out=slope)
+            np.sin(slope, out=slope)
+            np.subtract(1, slope, out=slope)
+            if compute_svf:
+                svf_out += slope
+            if compute_asvf:
+                slope *= np.float32(weight[i_dir])
+                asvf_out += slope
         if compute_opns:
             # For Openness taking the entire sphere
-            opns_out = opns_out + max_slope
+            opns_out += max_slope
 
-    # Cut to original extent and average the directional output over all directions
+    # Average the directional output over all directions
     if compute_svf:
-        svf_out = svf_out[radius_max:-radius_max, radius_max:-radius_max] / num_directions
+        svf_out /= np.float32(num_directions)
     if compute_asvf:
-        asvf_out = asvf_out[radius_max:-radius_max, radius_max:-radius_max] / np.sum(weight)
+        asvf_out /= np.float32(np.sum(weight))
     if compute_opns:
-        opns_out = np.rad2deg(0.5 * np.pi - (opns_out[radius_max:-radius_max, radius_max:-radius_max] / num_directions))
+        opns_out /= np.float32(num_directions)
+        np.subtract(np.float32(0.5 * np.pi), opns_out, out=opns_out)
+        np.rad2deg(opns_out, out=opns_out)
 
     # Return results within dict
     dict_svf_asvf_opns = {"svf": svf_out, "asvf": asvf_out, "opns": opns_out}
@@ -681,7 +869,10 @@ def sky_view_factor(dem,
                     asvf_dir=315,
                     asvf_level=1,
                     ve_factor=1,
-                    no_data=None
+                    no_data=None,
+                    overwrite_dem=False,
+                    halo=0,
+                    workspace=None
                     ):
     """
     Prepare the data, call sky_view_factor_compute, reformat and return back 2D arrays.
@@ -713,6 +904,13 @@ def sky_view_factor(dem,
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan. Use this parameter when nodata
         is not np.nan.
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+    halo : int
+        Number of pixels on each side of dem which are only context (e.g. tile padding), outputs are computed for
+        dem[halo:-halo, halo:-halo]. Mirrored padding is added only if halo is smaller than svf_r_max.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -738,9 +936,9 @@ def sky_view_factor(dem,
         raise Exception("rvt.visualization.sky_view_factor: All computes are false!")
     if resolution < 0:
         raise Exception("rvt.visualization.sky_view_factor: resolution must be a positive number!")
-
-    # Make sure array has the correct dtype!
-    dem = dem.astype(np.float32)
+    if halo < 0 or 2 * halo >= min(dem.shape):
+        raise Exception("rvt.visualization.sky_view_factor: halo must be a non-negative number, smaller than half of "
+                        "dem size!")
 
     # CONSTANTS
     # Level of polynomial that determines the anisotropy, selected with asvf_level (1 - low, 2 - high)
@@ -750,16 +948,23 @@ def sky_view_factor(dem,
     # selected with svf_noise (0-3)
     sc_svf_r_min = [0., 10., 20., 40.]
 
-    # Before doing anything to the array, make sure all NODATA values are set to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
-    # Save NaN mask (processing may change NaNs to arbitrary values)
-    nan_mask = np.isnan(dem)
-
-    # Vertical exaggeration
-    dem = dem * ve_factor
-    # Pixel size (adjust elevation to correctly calculate the vertical elevation angle, calculation thinks 1px == 1m)
-    dem = dem / resolution
+    # float32 (copy unless dem may be overwritten), all NODATA values set to np.nan, vertical exaggeration and pixel
+    # size (adjust elevation to correctly calculate the vertical elevation angle, calculation thinks 1px == 1m)
+    dem = prepare_dem(dem, ve_factor=ve_factor, resolution=resolution, no_data=no_data, overwrite_dem=overwrite_dem)
+    dem_center = dem[halo:dem.shape[0] - halo, halo:dem.shape[1] - halo]
+
+    tile = tile_class(dem, "sky_view_factor")
+    if tile == "nodata" or tile == "constant":  # no horizon search, horizon is flat (elevation angle 0) everywhere
+        values = {"svf": 1, "asvf": 1, "opns": np.rad2deg(np.float32(0.5 * np.pi))}
+        computes = {"svf": compute_svf, "asvf": compute_asvf, "opns": compute_opns}
+        return {k: np.full(dem_center.shape, np.nan if tile == "nodata" else value, dtype=np.float32)
+                for k, value in values.items() if computes[k]}
+
+    # Save NaN mask of output extent (processing may change NaNs to arbitrary values)
+    if tile == "voids":
+        nan_mask = np.isnan(dem_center, out=rvt.workspace.empty(workspace, "svf_nan_mask", dem_center.shape, bool))
+    else:
+        nan_mask = None
 
     # Minimal search radius depends on the noise level, it has to be an integer not smaller than 1
     svf_r_min = max(np.round(svf_r_max * sc_svf_r_min[svf_noise] * 0.01, decimals=0), 1)
@@ -779,12 +984,15 @@ def sky_view_factor(dem,
         compute_asvf=compute_asvf,
         a_main_direction=asvf_dir,
         a_poly_level=poly_level,
-        a_min_weight=min_weight
+        a_min_weight=min_weight,
+        halo=halo,
+        workspace=workspace
     )
 
     # Apply NaN mask to outputs
-    for item in dict_svf_asvf_opns.values():
-        item[nan_mask] = np.nan
+    if nan_mask is not None:
+        for item in dict_svf_asvf_opns.values():
+            item[nan_mask] = np.nan
 
     return dict_svf_asvf_opns
 
@@ -796,7 +1004,10 @@ def local_dominance(dem,
                     angular_res=15,
                     observer_height=1.7,
                     ve_factor=1,
-                    no_data=None
+                    no_data=None,
+                    overwrite_dem=False,
+                    halo=0,
+                    workspace=None
                     ):
     """
     Compute Local Dominance dem visualization.
@@ -820,6 +1031,13 @@ def local_dominance(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+    halo : int
+        Number of pixels on each side of dem which are only context (e.g. tile padding), output is computed for
+        dem[halo:-halo, halo:-halo]. Edge padding is added only if halo is smaller than max_rad.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -831,15 +1049,27 @@ def local_dominance(dem,
     if not (10000 >= ve_factor >= -10000):
         raise Exception("rvt.visualization.local_dominance: ve_factor must be between -10000 and 10000!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
+    if halo < 0 or 2 * halo >= min(dem.shape):
+        raise Exception("rvt.visualization.local_dominance: halo must be a non-negative number, smaller than half of "
+                        "dem size!")
+
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
+
+    tile = tile_class(dem, "local_dominance")
+    output_shape = (dem.shape[0] - 2 * halo, dem.shape[1] - 2 * halo)
+    if tile == "nodata":
+        return np.full(output_shape, np.nan, dtype=np.float32)
+    elif tile == "constant" and observer_height > 0:  # all surroundings are observer_height lower, normalized to 1
+        return np.ones(output_shape, dtype=np.float32)
 
-    dem = dem.astype(np.float32)
-    # add max_rad pixel edge padding
-    pad_width = max_rad
-    dem = np.pad(array=dem, pad_width=pad_width, mode="edge")
-    dem = dem * ve_factor
+    # add edge padding, so there is max_rad pixels of context (halo and padding) around the output extent
+    pad_width = max(max_rad - halo, 0)
+    if pad_width > 0:
+        dem = np.pad(array=dem, pad_width=pad_width, mode="edge")
+    margin = pad_width + halo
+    rows, columns = dem.shape[0] - 2 * margin, dem.shape[1] - 2 * margin
+    dem_center = dem[margin:margin + rows, margin:margin + columns]
 
     # create a vector with possible distances
     n_dist = int((max_rad - min_rad) / rad_inc + 1)
@@ -857,20 +1087,23 @@ def local_dominance(dem,
     distances = (np.outer(np.ones(n_ang), distances)).reshape(n_shifts)
     dist_factor = 2 * distances + rad_inc
 
-    local_dom_out = dem * 0
+    # Outputs only for the output extent, shifted dem is a view of the padded dem (shifts are not larger than max_rad)
+    local_dom_out = dem_center * 0
+    observer_dem = rvt.workspace.empty(workspace, "local_dom_observer", dem_center.shape, dem_center.dtype)
+    np.add(dem_center, observer_height, out=observer_dem)
+    height_diff = rvt.workspace.empty(workspace, "local_dom_height_diff", dem_center.shape, dem_center.dtype)
     for i_s in range(n_shifts):
-        dem_moved = np.roll(dem, int(round(y_t[i_s])), axis=0)
-        dem_moved = np.roll(dem_moved, int(round(x_t[i_s])), axis=1)
-        idx_lower = np.where((dem + observer_height) > dem_moved)
-        if idx_lower[0].size > 0:
-            local_dom_out[idx_lower[0], idx_lower[1]] = local_dom_out[idx_lower[0], idx_lower[1]] + \
-                                                        (dem[idx_lower[0], idx_lower[1]] + observer_height -
-                                                         dem_moved[idx_lower[0], idx_lower[1]]) / \
-                                                        distances[i_s] * dist_factor[i_s]
-    local_dom_out = local_dom_out / norma
-
-    # Remove padding
-    local_dom_out = local_dom_out[pad_width:-pad_width, pad_width:-pad_width]
+        shift_row = int(round(y_t[i_s]))
+        shift_column = int(round(x_t[i_s]))
+        dem_moved = dem[margin - shift_row:margin - shift_row + rows,
+                        margin - shift_column:margin - shift_column + columns]
+        # only lower surroundings contribute (negative differences and nan are 0)
+        np.subtract(observer_dem, dem_moved, out=height_diff)
+        np.fmax(height_diff, 0, out=height_diff)
+        np.divide(height_diff, distances[i_s], out=height_diff)
+        np.multiply(height_diff, dist_factor[i_s], out=height_diff)
+        local_dom_out += height_diff
+    local_dom_out /= norma
 
     return local_dom_out
 
@@ -878,55 +1111,31 @@ def local_dominance(dem,
 def horizon_generate_coarse_dem(dem_fine,
                                 pyramid_scale,
                                 conv_from,
-                                conv_to,
                                 max_radius
                                 ):
     # first reduce the size for the edge required for horizon search
     dem_fine = dem_fine[max_radius:-max_radius, max_radius:-max_radius]
 
-    # get and adjust the array sizes
-    in_shape = dem_fine.shape
-    n_col_fine = in_shape[1]
-    n_lin_fine = in_shape[0]
+    # get the array sizes
+    n_lin_fine, n_col_fine = dem_fine.shape
     n_lin_coarse = int(np.floor(n_lin_fine / pyramid_scale)) + 1
     n_col_coarse = int(np.floor(n_col_fine / pyramid_scale)) + 1
-    # The corner points must fit in the new grid.
-    # This is always the case with the left most column or the upper line.
-    # But you have to adjust ne number of columns to the right and number of lines below.
-    # The final number of columns/lines has to fulfill:
-    #     n_coarse = pyramid_scale * n_fine + 1
-    # columns
-    mod_col = n_col_fine % pyramid_scale
-    pad_col = 0
-    if mod_col != 1:
-        pad_col = np.abs(1 - mod_col)
-    # lines
-    mod_lin = n_lin_fine % pyramid_scale
-    pad_lin = 0
-    if mod_lin != 1:
-        pad_lin = np.abs(1 - mod_lin)
-    # Here we extend it to right and below, so padding with edge is OK
-    # Edge-mode otherwise creates artefacts on left and above.
-    dem_fine = np.pad(dem_fine, ((0, pad_lin), (0, pad_col)), mode="edge")
-
-    # Once you have data in the shape appropriate for resizing,
-    # pad the data to support np.move.
-    dem_fine = np.pad(dem_fine, ((-conv_from, conv_to), (-conv_from, conv_to)), mode="symmetric")
-
-    # Convolution (keep maximum)
-    dem_convolve = np.zeros(dem_fine.shape)
-    for i in np.arange(pyramid_scale) + conv_from:
-        for j in np.arange(pyramid_scale) + conv_from:
-            dem_convolve = np.maximum(dem_convolve, np.roll(dem_fine, (i, j), axis=(0, 1)))
+    # Coarse point i lies on the fine point i * pyramid_scale and takes the maximum of the window
+    # (i * pyramid_scale - conv_from - pyramid_scale + 1) ... (i * pyramid_scale - conv_from).
+    # Pad the fine array (edge), so the windows are aligned with the blocks of pyramid_scale x pyramid_scale pixels
+    # and the last window fits in the array, then crop what is past the last window.
+    pad_before = pyramid_scale - 1 + conv_from
+    pad_lin_after = max(n_lin_coarse * pyramid_scale - pad_before - n_lin_fine, 0)
+    pad_col_after = max(n_col_coarse * pyramid_scale - pad_before - n_col_fine, 0)
+    dem_fine = np.pad(dem_fine.astype(np.float32, copy=False),
+                      ((pad_before, pad_lin_after), (pad_before, pad_col_after)), mode="edge")
+    dem_fine = dem_fine[:n_lin_coarse * pyramid_scale, :n_col_coarse * pyramid_scale]
+
+    # Block maximum
+    dem_coarse = dem_fine.reshape(n_lin_coarse, pyramid_scale, n_col_coarse, pyramid_scale).max(axis=(1, 3))
     # Divide by pyramid_scale to account for the change of resolution
     # (important for the angle computation later on)
-    dem_convolve = dem_convolve / pyramid_scale
-
-    # Consider only the selected convoluted points according to the scale change.
-    # As we select slice's end point make sure to consider at least 1 point more 
-    # to the right / below to really include it (Python way of considering end index).
-    dem_coarse = dem_convolve[-conv_from:(n_lin_coarse * pyramid_scale + 1):pyramid_scale,
-                              -conv_from:(n_col_coarse * pyramid_scale + 1):pyramid_scale]
+    dem_coarse /= pyramid_scale
 
     # Final padding to enable searching the horizon over the edge:
     # use constant-mode set to the minimal height, so it doesn't 
@@ -942,7 +1151,59 @@ def horizon_generate_pyramids(dem,
                               max_fine_radius=100,
                               max_pyramid_radius=7,
                               pyramid_scale=3,
+                              use_cache=True
                               ):
+    """
+    Generates DEM pyramid for horizon searching, dict with a key for each level (0 is the input resolution) containing
+    "num_directions", "radius_pixels", "min_radius", "shift", "dem", "i_lin", "i_col" and "upsample".
+    DEM levels don't depend on num_directions, if use_cache is True they are stored in a bounded cache (keyed by DEM
+    content and pyramid parameters) and reused by the following calls on the same DEM (e.g. sky_illumination and
+    shadow_horizon on the same tile). Cached arrays are shared, they must not be modified.
+    """
+    if use_cache:
+        cache_key = (hashlib.blake2b(np.ascontiguousarray(dem)).hexdigest(), dem.shape, dem.dtype.str,
+                     max_fine_radius, max_pyramid_radius, pyramid_scale)
+        with _pyramid_cache_lock:
+            dem_levels = _pyramid_cache.get(cache_key)
+            if dem_levels is not None:
+                _pyramid_cache.move_to_end(cache_key)
+        if dem_levels is None:
+            dem_levels = horizon_generate_dem_levels(dem, max_fine_radius=max_fine_radius,
+                                                     max_pyramid_radius=max_pyramid_radius,
+                                                     pyramid_scale=pyramid_scale)
+            with _pyramid_cache_lock:
+                _pyramid_cache[cache_key] = dem_levels
+                while len(_pyramid_cache) > PYRAMID_CACHE_SIZE:
+                    _pyramid_cache.popitem(last=False)
+    else:
+        dem_levels = horizon_generate_dem_levels(dem, max_fine_radius=max_fine_radius,
+                                                 max_pyramid_radius=max_pyramid_radius, pyramid_scale=pyramid_scale)
+
+    pyramid = {}
+    for level in dem_levels:
+        # determine the dict of shifts (with num_directions=0 they are left to be computed in horizon_max_slope)
+        if num_directions > 0:
+            shift = horizon_shift_vector(num_directions, dem_levels[level]["radius_pixels"],
+                                         dem_levels[level]["min_radius"])
+        else:
+            shift = {}
+        pyramid[level] = dict(dem_levels[level], num_directions=num_directions, shift=shift)
+
+    return pyramid
+
+
+def clear_pyramid_cache():
+    """Empties the cache of DEM pyramids (see horizon_generate_pyramids)."""
+    with _pyramid_cache_lock:
+        _pyramid_cache.clear()
+
+
+def horizon_generate_dem_levels(dem,
+                                max_fine_radius=100,
+                                max_pyramid_radius=7,
+                                pyramid_scale=3,
+                                ):
+    """Generates the direction independent part of DEM pyramid (see horizon_generate_pyramids)."""
     # In the levels higher than 1, determine the minimal search distance
     # and number of search distances.
     # If you have for instance
@@ -987,34 +1248,150 @@ def horizon_generate_pyramids(dem,
         # the level 0 contains the other min_radius as the rest of levels
         if level == 0:
             min_radius = 1
-            dem_fine = np.copy(np.pad(dem, max_pyramid_radius, mode="constant", constant_values=dem.min()))
+            dem_fine = np.pad(dem.astype(np.float32, copy=False), max_pyramid_radius, mode="constant",
+                              constant_values=dem.min())
         else:
             min_radius = min_pyramid_radius - 1
-            dem_fine = np.copy(dem_coarse)
+            dem_fine = horizon_generate_coarse_dem(pyramid[level - 1]["dem"], pyramid_scale, conv_from,
+                                                   max_pyramid_radius)
         # the last level contains the other radius_pixels as the rest of levels
         if level == pyramid_levels:
             max_radius = last_radius
         else:
             max_radius = max_pyramid_radius
-        # determine the dict of shifts
-        shift = horizon_shift_vector(num_directions, max_radius, min_radius)
-        dem_coarse = horizon_generate_coarse_dem(dem_fine, pyramid_scale, conv_from, conv_to, max_pyramid_radius)
         i_lin = np.arange(dem_fine.shape[0])
         i_col = np.arange(dem_fine.shape[1])
 
         pyramid[level] = {
-            "num_directions": num_directions,
             "radius_pixels": max_radius,
             "min_radius": min_radius,
-            "shift": shift,
             "dem": dem_fine,
             "i_lin": i_lin,
             "i_col": i_col,
         }
 
+    # precompute the operators for resampling the horizon from each level to the next lower (finer) level
+    offset = conv_from + max_pyramid_radius * pyramid_scale - max_pyramid_radius
+    pyramid[0]["upsample"] = None
+    for level in np.arange(1, pyramid_levels + 1):
+        pyramid[level]["upsample"] = (
+            horizon_upsample_operator(n_coarse=pyramid[level]["i_lin"].size, n_fine=pyramid[level - 1]["i_lin"].size,
+                                      pyramid_scale=pyramid_scale, offset=offset),
+            horizon_upsample_operator(n_coarse=pyramid[level]["i_col"].size, n_fine=pyramid[level - 1]["i_col"].size,
+                                      pyramid_scale=pyramid_scale, offset=offset)
+        )
+
     return pyramid
 
 
+def horizon_upsample_operator(n_coarse,
+                              n_fine,
+                              pyramid_scale,
+                              offset
+                              ):
+    """
+    Precomputes linear interpolation (along one axis) from coarse pyramid level to the finer one. Coarse pixel i lies
+    on fine position i * pyramid_scale, fine pixel j is sampled at position j + offset. Positions outside the coarse
+    grid are clamped to its edge.
+
+    Returns
+    -------
+    operator : tuple
+        (i_0, i_1, w_0, w_1), for each fine pixel indices of the two neighbouring coarse pixels and their weights.
+    """
+    position = (np.arange(n_fine) + offset) / pyramid_scale
+    position = np.clip(position, 0, n_coarse - 1)
+    i_0 = np.minimum(np.floor(position).astype(int), max(n_coarse - 2, 0))
+    i_1 = np.minimum(i_0 + 1, n_coarse - 1)
+    w_1 = (position - i_0).astype(np.float32)
+    w_0 = 1 - w_1
+    return i_0, i_1, w_0, w_1
+
+
+def horizon_upsample(arr, upsample):
+    """Bilinear (separable) resampling of coarse pyramid level array to the finer level, with operators from
+    horizon_upsample_operator (first for lines and second for columns)."""
+    (lin_0, lin_1, lin_w_0, lin_w_1), (col_0, col_1, col_w_0, col_w_1) = upsample
+    arr = arr[lin_0, :] * lin_w_0[:, np.newaxis] + arr[lin_1, :] * lin_w_1[:, np.newaxis]
+    return arr[:, col_0] * col_w_0 + arr[:, col_1] * col_w_1
+
+
+def horizon_max_slope(pyramid, direction):
+    """
+    Searches for the horizon in one direction, from the top (coarsest) to the bottom pyramid level.
+    Direction (degrees) doesn't have to be one of the pyramid directions (keys of pyramid[level]["shift"]), movements
+    for other directions are calculated on the fly.
+    Returns the maximal slope (tangent of horizon elevation angle, 0 or more) on the grid of pyramid level 0.
+    """
+    n_levels = np.max([i for i in pyramid])
+    # reset maximum at each iteration (direction)
+    max_slope = np.zeros(pyramid[n_levels]["dem"].shape, dtype=np.float32) - 1000
+
+    for i_level in reversed(range(n_levels + 1)):
+        height = pyramid[i_level]["dem"]
+        if direction in pyramid[i_level]["shift"]:
+            move = pyramid[i_level]["shift"][direction]
+        else:
+            move = horizon_shift_direction(np.radians(direction), pyramid[i_level]["radius_pixels"],
+                                           pyramid[i_level]["min_radius"])
+
+        # ... and to the search radius
+        for i_rad, radius in enumerate(move["distance"]):
+            # get shift index from move dictionary
+            shift_indx = move["shift"][i_rad]
+            # estimate the slope
+            _ = np.maximum((np.roll(height, shift_indx, axis=(0, 1)) - height) / radius, 0.)
+            # compare to the previous max slope and keep the larges
+            max_slope = np.maximum(max_slope, _)
+
+        # resample the max_slope to a lower pyramid level
+        if i_level > 0:
+            max_slope = horizon_upsample(max_slope, pyramid[i_level]["upsample"])
+
+    return max_slope
+
+
+def sky_illumination_directions(pyramid,
+                                directions,
+                                aspect,
+                                da,
+                                compute_overcast=True,
+                                shadow_az=None
+                                ):
+    """
+    Sums up the sky illumination intermediate results (uniform_a, uniform_b, overcast_c, overcast_d) over the
+    selected directions. If shadow_az is in directions, its horizon angle (radians) is returned as "horizon".
+    """
+    # init the intermediate results for uniform SI
+    uniform_a = np.zeros(aspect.shape, dtype=np.float32)
+    uniform_b = np.copy(uniform_a)
+    # init the intermediate results for overcast SI
+    if compute_overcast:
+        overcast_c = np.copy(uniform_a)
+        overcast_d = np.copy(uniform_a)
+    else:
+        overcast_c = None
+        overcast_d = None
+    horizon = None
+
+    for direction in directions:
+        dir_rad = np.radians(direction)
+        # convert to angle in radians and compute directional output
+        _ = np.arctan(horizon_max_slope(pyramid, direction))
+        uniform_a = uniform_a + (np.cos(_)) ** 2
+        _d_aspect = -2 * np.sin(da) * np.cos(dir_rad - aspect)
+        uniform_b = uniform_b + np.maximum(_d_aspect * (np.pi / 4. - _ / 2. - np.sin(2. * _) / 4.), 0)
+        if compute_overcast:
+            _cos3 = (np.cos(_)) ** 3
+            overcast_c = overcast_c + np.maximum(_cos3, 0)
+            overcast_d = overcast_d + np.maximum(_d_aspect * (2. / 3. - np.cos(_) + _cos3 / 3.), 0)
+        if direction == shadow_az:
+            horizon = _
+
+    return {"uniform_a": uniform_a, "uniform_b": uniform_b, "overcast_c": overcast_c, "overcast_d": overcast_d,
+            "horizon": horizon}
+
+
 def sky_illumination(dem,
                      resolution,
                      sky_model="overcast",
@@ -1025,7 +1402,10 @@ def sky_illumination(dem,
                      shadow_az=315,
                      shadow_el=35,
                      ve_factor=1,
-                     no_data=None
+                     no_data=None,
+                     n_workers=None,
+                     outputs=None,
+                     overwrite_dem=False
                      ):
     """
     Compute topographic corrections for sky illumination.
@@ -1047,18 +1427,26 @@ def sky_illumination(dem,
     num_directions : int
         Number of directions to search for horizon.
     shadow_az : int or float
-        Shadow azimuth.
+        Shadow azimuth (any azimuth, it is not snapped to the search directions).
     shadow_el : int or float
         Shadow elevation.
     ve_factor : int or float
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    n_workers : int
+        Number of threads among which the horizon search directions are split. If None, number of CPUs is used.
+    outputs : list of str
+        If not None, any subset of "uniform", "overcast", "shadow", "horizon", "uniform_shaded" and
+        "overcast_shaded" which are all computed in one horizon search (sky_model, compute_shadow and
+        shadow_horizon_only are then ignored).
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
 
     Returns
     -------
     sky_illumination : numpy.ndarray
-        2D numpy result array of Sky illumination.
+        2D numpy result array of Sky illumination. If outputs is not None, dict with a key for each of the outputs.
     """
     # standard pyramid settings
     pyramid_scale = 2
@@ -1073,12 +1461,8 @@ def sky_illumination(dem,
     if resolution < 0:
         raise Exception("rvt.visualization.sky_illumination: resolution must be a positive number!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
-
-    dem = dem.astype(np.float32)
-    dem = dem * ve_factor
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
 
     if sky_model.lower() == "overcast":
         compute_overcast = True
@@ -1089,10 +1473,28 @@ def sky_illumination(dem,
     else:
         raise Exception("rvt.visualization.sky_illumination: sky_model must be overcast or uniform!")
 
-    # generate slope and aspect
-    _ = slope_aspect(np.pad(dem, max_pyramid_radius, mode="symmetric"), resolution, resolution)
-    slope = _["slope"]
-    aspect = _["aspect"]
+    if outputs is not None:
+        outputs = [output.lower() for output in outputs]
+        if len(outputs) == 0 or not set(outputs).issubset({"uniform", "overcast", "shadow", "horizon",
+                                                            "uniform_shaded", "overcast_shaded"}):
+            raise Exception("rvt.visualization.sky_illumination: outputs must be a subset of uniform, overcast, "
+                            "shadow, horizon, uniform_shaded, overcast_shaded!")
+        compute_overcast = "overcast" in outputs or "overcast_shaded" in outputs
+        compute_shadow = not {"shadow", "horizon", "uniform_shaded", "overcast_shaded"}.isdisjoint(outputs)
+        shadow_horizon_only = {"uniform", "overcast", "uniform_shaded", "overcast_shaded"}.isdisjoint(outputs)
+
+    if tile_class(dem, "sky_illumination") == "nodata":  # no horizon search, outputs are nan (shadow is 0)
+        def nodata_output(name):
+            if name == "shadow":
+                return np.zeros(dem.shape, dtype=np.uint8)
+            return np.full(dem.shape, np.nan, dtype=np.float64 if name.endswith("_shaded") else np.float32)
+
+        if outputs is not None:
+            return {name: nodata_output(name) for name in ("uniform", "overcast", "shadow", "horizon",
+                                                           "uniform_shaded", "overcast_shaded") if name in outputs}
+        if compute_shadow and shadow_horizon_only:
+            return {"shadow": nodata_output("shadow"), "horizon": nodata_output("horizon")}
+        return nodata_output(sky_model.lower() + ("_shaded" if compute_shadow else ""))
 
     # build DEM pyramids
     pyramid = horizon_generate_pyramids(dem,
@@ -1100,97 +1502,75 @@ def sky_illumination(dem,
                                         max_fine_radius=max_fine_radius,
                                         max_pyramid_radius=max_pyramid_radius,
                                         pyramid_scale=pyramid_scale, )
-    n_levels = np.max([i for i in pyramid])
+    directions = [d for d in pyramid[0]["shift"]]
+
+    if compute_shadow and shadow_horizon_only:
+        # only the shadow direction is needed (exact azimuth, not snapped to the pyramid directions)
+        horizon_out = horizon_elevation(pyramid, azimuth=shadow_az, max_pyramid_radius=max_pyramid_radius)
+        shadow_out = (horizon_out < shadow_el).astype(np.uint8)
+        if outputs is not None:
+            return {k: v for k, v in {"shadow": shadow_out, "horizon": horizon_out}.items() if k in outputs}
+        return {"shadow": shadow_out, "horizon": horizon_out}
+
+    # generate slope and aspect
+    _ = slope_aspect(np.pad(dem, max_pyramid_radius, mode="symmetric"), resolution, resolution)
+    slope = _["slope"]
+    aspect = _["aspect"]
 
-    # get the convolution window indices
-    conv_to = int(np.floor(pyramid_scale / 2.))
-    if (pyramid_scale % 2) == 0:
-        conv_from = 1 - conv_to
-    else:
-        conv_from = -conv_to
     # directional halve-resolution for integration limits
     da = np.pi / num_directions
 
-    # init the intermediate results for uniform SI
-    uniform_a = np.zeros((dem.shape[0] + 2 * max_pyramid_radius, dem.shape[1] + 2 * max_pyramid_radius),
-                         dtype=np.float32)
-    uniform_b = np.copy(uniform_a)
-    # init the output for overcast SI
-    if compute_overcast:
-        overcast_out = np.zeros(dem.shape, dtype=np.float32)
-        overcast_c = np.zeros((dem.shape[0] + 2 * max_pyramid_radius, dem.shape[1] + 2 * max_pyramid_radius),
-                              dtype=np.float32)
-        overcast_d = np.copy(overcast_c)
+    # search direction (pyramid angle convention) of the shadow azimuth, its horizon is taken from the directions
+    # loop if it is one of the pyramid directions, otherwise it is searched separately (exact azimuth)
+    if compute_shadow:
+        shadow_direction = (360 - shadow_az) % 360
+        if shadow_direction not in directions:
+            shadow_direction = None
     else:
-        overcast_out = None
-    # init the output for shadows
+        shadow_direction = None
+
+    # search for horizon in each direction, directions are independent so they are split among the workers,
+    # each worker returns its own intermediate results (accumulators) which are summed up at the end
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(int(n_workers), len(directions)))
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        partial_results = list(executor.map(
+            lambda i_worker: sky_illumination_directions(pyramid=pyramid,
+                                                         directions=directions[i_worker::n_workers],
+                                                         aspect=aspect,
+                                                         da=da,
+                                                         compute_overcast=compute_overcast,
+                                                         shadow_az=shadow_direction),
+            range(n_workers)
+        ))
+
+    # reduce the intermediate results for uniform SI
+    uniform_a = sum(partial["uniform_a"] for partial in partial_results)
+    uniform_b = sum(partial["uniform_b"] for partial in partial_results)
+    # reduce the intermediate results for overcast SI
+    if compute_overcast:
+        overcast_c = sum(partial["overcast_c"] for partial in partial_results)
+        overcast_d = sum(partial["overcast_d"] for partial in partial_results)
+    overcast_out = None
+    # output for shadows
     if compute_shadow:
-        # use closest direction from pyramids as proxy for shadow azimuth
-        # (just in case it is not the same as standard directions)
-        _ = np.array([d for d in pyramid[0]["shift"]])
-        i = np.argmin(np.abs(_ - (360 - shadow_az)))
-        shadow_az = _[i]
-        # binary shadows
-        shadow_out = np.zeros(dem.shape, dtype=np.float32)
-        # height of horizon in degrees
-        horizon_out = np.zeros(dem.shape, dtype=np.float32)
-        # overcast model + binary shadow
-        if compute_overcast:
-            overcast_sh_out = np.zeros(dem.shape, dtype=np.float32)
+        if shadow_direction is not None:
+            horizon_out = [partial["horizon"] for partial in partial_results if partial["horizon"] is not None][0]
+            # height of horizon in degrees
+            horizon_out = np.degrees(horizon_out[max_pyramid_radius:-max_pyramid_radius,
+                                                 max_pyramid_radius:-max_pyramid_radius])
         else:
-            overcast_sh_out = None
-        # uniform model + binary shadow
-        uniform_sh_out = np.zeros(dem.shape, dtype=np.float32)
+            horizon_out = horizon_elevation(pyramid, azimuth=shadow_az, max_pyramid_radius=max_pyramid_radius)
+        # binary shadows
+        shadow_out = (horizon_out < shadow_el).astype(np.uint8)
     else:
         shadow_out = None
         horizon_out = None
-        overcast_sh_out = None
-        uniform_sh_out = None
-
-    # search for horizon in each direction...
-    for i_dir, direction in enumerate(pyramid[0]["shift"]):
-        dir_rad = np.radians(direction)
-        # reset maximum at each iteration (direction)
-        max_slope = np.zeros(pyramid[n_levels]["dem"].shape, dtype=np.float32) - 1000
-
-        for i_level in reversed(range(n_levels + 1)):
-            height = pyramid[i_level]["dem"]
-            move = pyramid[i_level]["shift"]
-
-            # ... and to the search radius
-            for i_rad, radius in enumerate(move[direction]["distance"]):
-                # get shift index from move dictionary
-                shift_indx = move[direction]["shift"][i_rad]
-                # estimate the slope
-                _ = np.maximum((np.roll(height, shift_indx, axis=(0, 1)) - height) / radius, 0.)
-                # compare to the previous max slope and keep the larges
-                max_slope = np.maximum(max_slope, _)
-
-            # resample the max_slope to a lower pyramid level
-            if i_level > 0:
-                lin_fine = pyramid[i_level - 1]["i_lin"] + (
-                        conv_from + max_pyramid_radius * pyramid_scale - max_pyramid_radius)
-                col_fine = pyramid[i_level - 1]["i_col"] + (
-                        conv_from + max_pyramid_radius * pyramid_scale - max_pyramid_radius)
-                lin_coarse = pyramid[i_level]["i_lin"] * pyramid_scale
-                col_coarse = pyramid[i_level]["i_col"] * pyramid_scale
-                interp_spline = RectBivariateSpline(lin_coarse, col_coarse, max_slope, kx=1, ky=1)
-                max_slope = interp_spline(lin_fine, col_fine)
-
-        # convert to angle in radians and compute directional output
-        _ = np.arctan(max_slope)
-        uniform_a = uniform_a + (np.cos(_)) ** 2
-        _d_aspect = -2 * np.sin(da) * np.cos(dir_rad - aspect)
-        uniform_b = uniform_b + np.maximum(_d_aspect * (np.pi / 4. - _ / 2. - np.sin(2. * _) / 4.), 0)
-        if compute_overcast:
-            _cos3 = (np.cos(_)) ** 3
-            overcast_c = overcast_c + np.maximum(_cos3, 0)
-            overcast_d = overcast_d + np.maximum(_d_aspect * (2. / 3. - np.cos(_) + _cos3 / 3.), 0)
-        if compute_shadow and (direction == shadow_az):
-            horizon_out = np.degrees(_[max_pyramid_radius:-max_pyramid_radius, max_pyramid_radius:-max_pyramid_radius])
-            shadow_out = (horizon_out < shadow_el) * 1
-            if shadow_horizon_only:
-                return {"shadow": shadow_out, "horizon": horizon_out}
+    overcast_sh_out = None
+    uniform_sh_out = None
 
     # because of numeric stability check if the uniform_b is less then pi
     uniform_out = da * np.cos(slope) * uniform_a + np.sin(slope) * np.minimum(uniform_b, np.pi)
@@ -1209,16 +1589,16 @@ def sky_illumination(dem,
     # normalize
     uniform_out = uniform_out / np.pi
 
-    # # return results within dict
-    # dict_sky_illumination = {"uniform": uniform_out,
-    #                          "overcast": overcast_out,
-    #                          "shadow": shadow_out,
-    #                          "horizon": horizon_out,
-    #                          "uniform_shaded": uniform_sh_out,
-    #                          "overcast_shaded": overcast_sh_out,
-    #                          }
-    # dict_sky_illumination = {k: v for k, v in dict_sky_illumination.items() if v is not None}  # filter out none
-    # return dict_sky_illumination
+    # return results within dict
+    if outputs is not None:
+        dict_sky_illumination = {"uniform": uniform_out,
+                                 "overcast": overcast_out,
+                                 "shadow": shadow_out,
+                                 "horizon": horizon_out,
+                                 "uniform_shaded": uniform_sh_out,
+                                 "overcast_shaded": overcast_sh_out,
+                                 }
+        return {k: v for k, v in dict_sky_illumination.items() if k in outputs}
 
     # output
     if compute_uniform and not compute_shadow:
@@ -1235,11 +1615,15 @@ def shadow_horizon(dem,
                    resolution,
                    shadow_az=315,
                    shadow_el=35,
+                   max_fine_radius=100,
                    ve_factor=1,
-                   no_data=None
+                   no_data=None,
+                   pack_shadow=False,
+                   overwrite_dem=False
                    ):
     """
-    Compute shadow and horizon.
+    Compute shadow and horizon. Horizon is searched only in the direction of shadow_az (any azimuth, it is not snapped
+    to the sky illumination directions).
 
     Parameters
     ----------
@@ -1251,18 +1635,29 @@ def shadow_horizon(dem,
         Shadow azimuth.
     shadow_el : int or float
         Shadow elevation.
+    max_fine_radius : int
+        Max shadow modeling distance in pixels.
     ve_factor : int or float
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    pack_shadow : bool
+        If True, shadow is returned as bitmask packed along rows (np.packbits(shadow, axis=1)), unpack it with
+        np.unpackbits(shadow, axis=1, count=dem.shape[1]).
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
 
     Returns
     -------
     dict_out : dict
         Returns {"shadow": shadow, "horizon": horizon};
-        shadow : 2D binary numpy array (numpy.ndarray) of shadows;
+        shadow : 2D binary numpy array (numpy.ndarray) of shadows, uint8 (1 - illuminated, 0 - in shadow);
         horizon; 2D numpy array (numpy.ndarray) of horizon.
     """
+    # standard pyramid settings (the same as in sky_illumination)
+    pyramid_scale = 2
+    max_pyramid_radius = 20
+
     if not (10000 >= ve_factor >= -10000):
         raise Exception("rvt.visualization.shadow_horizon: ve_factor must be between -10000 and 10000!")
     if shadow_az > 360 or shadow_az < 0:
@@ -1272,9 +1667,140 @@ def shadow_horizon(dem,
     if resolution < 0:
         raise Exception("rvt.visualization.shadow_horizon: resolution must be a positive number!")
 
-    return sky_illumination(dem=dem, resolution=resolution, compute_shadow=True,
-                            shadow_horizon_only=True, shadow_el=shadow_el, shadow_az=shadow_az, ve_factor=ve_factor,
-                            no_data=no_data)
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
+
+    tile = tile_class(dem, "shadow_horizon")
+    if tile == "nodata" or tile == "constant":  # no horizon search, horizon is nan or flat (elevation angle 0)
+        horizon_out = np.full(dem.shape, np.nan if tile == "nodata" else 0, dtype=np.float32)
+    else:
+        # build DEM pyramids, shift vectors are computed only for the shadow direction (in horizon_max_slope)
+        pyramid = horizon_generate_pyramids(dem,
+                                            num_directions=0,
+                                            max_fine_radius=max_fine_radius,
+                                            max_pyramid_radius=max_pyramid_radius,
+                                            pyramid_scale=pyramid_scale, )
+        horizon_out = horizon_elevation(pyramid, azimuth=shadow_az, max_pyramid_radius=max_pyramid_radius)
+    shadow_out = (horizon_out < shadow_el).astype(np.uint8)
+    if pack_shadow:
+        shadow_out = np.packbits(shadow_out, axis=1)
+
+    return {"shadow": shadow_out, "horizon": horizon_out}
+
+
+def horizon_elevation(pyramid, azimuth, max_pyramid_radius):
+    """Horizon elevation angle in degrees in the direction of azimuth (clockwise from North, in degrees), pyramid
+    padding (max_pyramid_radius) is removed."""
+    # search direction (pyramid angle convention) of the azimuth
+    direction = (360 - azimuth) % 360
+    horizon_out = np.degrees(np.arctan(horizon_max_slope(pyramid, direction)))
+    return horizon_out[max_pyramid_radius:-max_pyramid_radius, max_pyramid_radius:-max_pyramid_radius]
+
+
+def shadow_horizon_batch(dem,
+                         resolution,
+                         sun_positions,
+                         accumulate=False,
+                         weights=None,
+                         max_fine_radius=100,
+                         ve_factor=1,
+                         no_data=None,
+                         overwrite_dem=False
+                         ):
+    """
+    Compute cast shadows for many sun positions. DEM pyramids are built once and horizon is searched once for each
+    distinct azimuth, shadows for all the elevations with the same azimuth are thresholds of that horizon.
+
+    Parameters
+    ----------
+    dem : numpy.ndarray
+        Input digital elevation model as 2D numpy array.
+    resolution : float
+        DEM pixel size.
+    sun_positions : list of tuple(float, float)
+        Sun positions as (azimuth, elevation) pairs in degrees.
+    accumulate : bool
+        If False it returns stacked shadows, if True it returns the sum of weights of the sun positions for which
+        pixel is in shadow (e.g. hours in shadow).
+    weights : list of float
+        Weight (e.g. time step in hours) of each sun position, used if accumulate is True. If None, all are 1.
+    max_fine_radius : int
+        Max shadow modeling distance in pixels.
+    ve_factor : int or float
+        Vertical exaggeration factor.
+    no_data : int or float
+        Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+
+    Returns
+    -------
+    shadow_out : numpy.ndarray
+        If accumulate is False, 3D uint8 numpy array (sun position, y, x) of shadows (1 - illuminated,
+        0 - in shadow, the same as in shadow_horizon). If accumulate is True, 2D float32 numpy array of accumulated
+        weights of sun positions for which pixel is in shadow (np.nan where dem is no data). In both modes pixels
+        with no data horizon are in shadow.
+    """
+    # standard pyramid settings (the same as in sky_illumination)
+    pyramid_scale = 2
+    max_pyramid_radius = 20
+
+    if not (10000 >= ve_factor >= -10000):
+        raise Exception("rvt.visualization.shadow_horizon_batch: ve_factor must be between -10000 and 10000!")
+    if len(sun_positions) == 0:
+        raise Exception("rvt.visualization.shadow_horizon_batch: sun_positions is empty!")
+    for sun_az, sun_el in sun_positions:
+        if sun_az > 360 or sun_az < 0:
+            raise Exception("rvt.visualization.shadow_horizon_batch: azimuth must be between 0 and 360!")
+        if sun_el > 90 or sun_el < 0:
+            raise Exception("rvt.visualization.shadow_horizon_batch: elevation must be between 0 and 90!")
+    if weights is None:
+        weights = np.ones(len(sun_positions))
+    if len(weights) != len(sun_positions):
+        raise Exception("rvt.visualization.shadow_horizon_batch: weights and sun_positions must have the same length!")
+    if resolution < 0:
+        raise Exception("rvt.visualization.shadow_horizon_batch: resolution must be a positive number!")
+
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
+    no_data_mask = np.isnan(dem) if accumulate else None
+
+    tile = tile_class(dem, "shadow_horizon_batch")
+    if tile == "nodata" or tile == "constant":  # no horizon search, horizon is nan or flat (elevation angle 0)
+        pyramid = None
+        flat_horizon = np.full(dem.shape, np.nan if tile == "nodata" else 0, dtype=np.float32)
+    else:
+        # build DEM pyramids once for all the sun positions
+        pyramid = horizon_generate_pyramids(dem,
+                                            num_directions=0,
+                                            max_fine_radius=max_fine_radius,
+                                            max_pyramid_radius=max_pyramid_radius,
+                                            pyramid_scale=pyramid_scale, )
+
+    # group sun positions by azimuth
+    azimuth_positions = {}
+    for i_position, (sun_az, sun_el) in enumerate(sun_positions):
+        azimuth_positions.setdefault(sun_az % 360, []).append(i_position)
+
+    if accumulate:
+        shadow_out = np.zeros(dem.shape, dtype=np.float32)
+    else:
+        shadow_out = np.zeros((len(sun_positions),) + dem.shape, dtype=np.uint8)
+    for sun_az, i_positions in azimuth_positions.items():
+        if pyramid is None:
+            horizon = flat_horizon
+        else:
+            horizon = horizon_elevation(pyramid, azimuth=sun_az, max_pyramid_radius=max_pyramid_radius)
+        for i_position in i_positions:
+            sun_el = sun_positions[i_position][1]
+            if accumulate:  # not illuminated (also nan horizon) is in shadow, the same as stacked shadows
+                shadow_out[~(horizon < sun_el)] += weights[i_position]
+            else:
+                np.less(horizon, sun_el, out=shadow_out[i_position], casting="unsafe")
+    if accumulate:
+        shadow_out[no_data_mask] = np.nan
+
+    return shadow_out
 
 
 def msrm(dem,
@@ -1283,7 +1809,9 @@ def msrm(dem,
          feature_max,
          scaling_factor,
          ve_factor=1,
-         no_data=None
+         no_data=None,
+         overwrite_dem=False,
+         workspace=None
          ):
     """
     Compute Multi-scale relief model (MSRM).
@@ -1305,6 +1833,10 @@ def msrm(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -1316,12 +1848,14 @@ def msrm(dem,
     if resolution < 0:
         raise Exception("rvt.visualization.msrm: resolution must be a positive number!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
 
-    dem = dem.astype(np.float32)
-    dem = dem * ve_factor
+    tile = tile_class(dem, "msrm")
+    if tile == "nodata":
+        return np.full(dem.shape, np.nan)
+    elif tile == "constant":  # all filtered surfaces are equal to dem
+        return np.zeros(dem.shape)
 
     if feature_min < resolution:  # feature_min can't be smaller than resolution
         feature_min = resolution
@@ -1341,9 +1875,11 @@ def msrm(dem,
     for ndx in range(i, n + 1, 1):
         kernel_radius = ndx ** scaling_factor
         # calculate mean filtered surface
-        lpf_surface = mean_filter(dem=dem, kernel_radius=kernel_radius)
+        lpf_surface = mean_filter(dem=dem, kernel_radius=kernel_radius, workspace=workspace)
         if not ndx == i:  # if not first surface
-            relief_models_sum += (last_lpf_surface - lpf_surface)  # substitution of 2 consecutive lpf_surface
+            # substitution of 2 consecutive lpf_surface
+            relief_model = rvt.workspace.empty(workspace, "msrm_relief_model", dem.shape, lpf_surface.dtype)
+            relief_models_sum += np.subtract(last_lpf_surface, lpf_surface, out=relief_model)
             nr_relief_models += 1
         last_lpf_surface = lpf_surface
 
@@ -1443,7 +1979,7 @@ def topographic_dev(dem, dem_i_nr_pixels, dem_i1, dem_i2, kernel_radius):
     return dev_out
 
 
-def max_elevation_deviation(dem, minimum_radius, maximum_radius, step):
+def max_elevation_deviation(dem, minimum_radius, maximum_radius, step, workspace=None):
     """
     Calculates maximum deviation from mean elevation, dev_max (Maximum Deviation from mean elevation) for each
     grid cell in a digital elevation model (DEM) across a range specified spatial scales.
@@ -1458,6 +1994,8 @@ def max_elevation_deviation(dem, minimum_radius, maximum_radius, step):
         Maximum radius to calculate DEV (topographic_dev).
     step : int
         Step from minimum to maximum radius to calc DEV (topographic_dev).
+    workspace : rvt.workspace.Workspace
+        If given, work arrays (integral images) are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -1473,18 +2011,26 @@ def max_elevation_deviation(dem, minimum_radius, maximum_radius, step):
 
     dem_pad = np.pad(dem, (maximum_radius + 1, maximum_radius), mode="symmetric")
     # store nans
-    idx_nan_dem_pad = np.isnan(dem_pad)
+    idx_nan_dem_pad = rvt.workspace.empty(workspace, "max_dev_nan_pad", dem_pad.shape, bool)
+    np.isnan(dem_pad, out=idx_nan_dem_pad)
     # change nan to 0
     dem_pad[idx_nan_dem_pad] = 0
 
     # number of pixels for summed area table
-    dem_i_nr_pixels = np.ones(dem_pad.shape)
-    dem_i_nr_pixels[idx_nan_dem_pad] = 0
-    dem_i_nr_pixels = integral_image(dem_i_nr_pixels, np.int64)
+    valid_pad = np.logical_not(idx_nan_dem_pad, out=idx_nan_dem_pad)
+    dem_i_nr_pixels = rvt.workspace.empty(workspace, "max_dev_i_nr_pixels", dem_pad.shape, np.int64)
+    np.cumsum(valid_pad, axis=0, dtype=np.int64, out=dem_i_nr_pixels)
+    np.cumsum(dem_i_nr_pixels, axis=1, out=dem_i_nr_pixels)
 
     # This outputs float64, which is by design. Change final array to float32 at the end of the function (at return)
-    dem_i1 = integral_image(dem_pad)
-    dem_i2 = integral_image(dem_pad ** 2)
+    dem_i1 = rvt.workspace.empty(workspace, "max_dev_i1", dem_pad.shape, np.float64)
+    np.cumsum(dem_pad, axis=0, dtype=np.float64, out=dem_i1)
+    np.cumsum(dem_i1, axis=1, out=dem_i1)
+    dem_square = rvt.workspace.empty(workspace, "max_dev_square", dem_pad.shape, dem_pad.dtype)
+    np.square(dem_pad, out=dem_square)
+    dem_i2 = rvt.workspace.empty(workspace, "max_dev_i2", dem_pad.shape, np.float64)
+    np.cumsum(dem_square, axis=0, dtype=np.float64, out=dem_i2)
+    np.cumsum(dem_i2, axis=1, out=dem_i2)
 
     for kernel_radius in range(minimum_radius, maximum_radius + 1, step):
         dev = topographic_dev(dem_pad, dem_i_nr_pixels, dem_i1, dem_i2, kernel_radius)[
@@ -1511,7 +2057,9 @@ def mstp(dem,
          broad_scale=(223, 2023, 180),
          lightness=1.2,
          ve_factor=1,
-         no_data=None
+         no_data=None,
+         overwrite_dem=False,
+         workspace=None
          ):
     """
     Compute Multi-scale topographic position (MSTP).
@@ -1532,6 +2080,10 @@ def mstp(dem,
         Vertical exaggeration factor.
     no_data : int or float
         Value that represents no_data, all pixels with this value are changed to np.nan .
+    overwrite_dem : bool
+        If True and dem is float32, dem is modified in place (caller gives up the array), else it is copied.
+    workspace : rvt.workspace.Workspace
+        If given, work arrays are taken from (and kept in) workspace.
 
     Returns
     -------
@@ -1547,19 +2099,21 @@ def mstp(dem,
     if not (10000 >= ve_factor >= -1000):
         raise Exception("rvt.visualization.mstp: ve_factor must be between -10000 and 10000!")
 
-    # change no_data to np.nan
-    if no_data is not None:
-        dem[dem == no_data] = np.nan
+    # float32 (copy unless dem may be overwritten), no_data to np.nan, vertical exaggeration
+    dem = prepare_dem(dem, ve_factor=ve_factor, no_data=no_data, overwrite_dem=overwrite_dem)
 
-    dem = dem.astype(np.float32)
-    dem = dem * ve_factor
+    tile = tile_class(dem, "mstp")
+    if tile == "nodata":
+        return np.full((3,) + dem.shape, np.nan, dtype=np.float32)
+    elif tile == "constant":  # deviation from mean elevation is 0 at all scales
+        return np.zeros((3,) + dem.shape, dtype=np.float32)
 
     local_dev = max_elevation_deviation(dem=dem, minimum_radius=local_scale[0], maximum_radius=local_scale[1],
-                                        step=local_scale[2])
+                                        step=local_scale[2], workspace=workspace)
     meso_dev = max_elevation_deviation(dem=dem, minimum_radius=meso_scale[0], maximum_radius=meso_scale[1],
-                                       step=meso_scale[2])
+                                       step=meso_scale[2], workspace=workspace)
     broad_dev = max_elevation_deviation(dem=dem, minimum_radius=broad_scale[0], maximum_radius=broad_scale[1],
-                                        step=broad_scale[2])
+                                        step=broad_scale[2], workspace=workspace)
 
     cutoff = lightness
     # RGB order - broad, meso, local
@@ -1578,6 +2132,169 @@ def mstp(dem,
     return np.asarray([red, green, blue])  # RGB float32 (3 x 32bit)
 
 
+def idw_kernel(radius=20, power=2):
+    """
+    Inverse distance weights (1 / distance ** power) in a square window of size 2 * radius + 1, center weight is 0.
+    """
+    i_row, i_column = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    dist = np.sqrt(i_row ** 2 + i_column ** 2)
+    dist[radius, radius] = np.inf  # can't divide with zero, center weight is 0
+    return 1 / dist ** power
+
+
+def idw_fill(dem, mask, radius=20, power=2, tile_size=512):
+    """
+    Inverse Distance Weighting interpolation of masked pixels as normalized convolution, weighted sum of valid
+    pixels in the (2 * radius + 1) square window divided by the sum of their weights. Only tiles which contain
+    masked pixels are convolved (FFT), together with the radius halo. Pixels without valid neighbour in the window
+    stay np.nan.
+
+    Parameters
+    -------
+    dem : numpy.ndarray
+        Input digital elevation model as 2D numpy array, filled in place.
+    mask : numpy.ndarray
+        2D bool array, True where dem should be filled (np.nan).
+    radius : int
+        Interpolation radius in pixels.
+    power : float
+        Power of the inverse distance weights.
+    tile_size : int
+        Size of the tiles in pixels.
+
+    Returns
+    -------
+    dem : numpy.ndarray
+        Filled dem.
+    """
+    from scipy.signal import fftconvolve
+
+    kernel = idw_kernel(radius=radius, power=power)
+    min_weight = kernel[0, 0]  # corner of the window
+    valid = (~mask).astype(np.float64)
+    values = np.where(mask, 0, dem).astype(np.float64)
+    n_rows, n_columns = dem.shape
+    for i_row in range(0, n_rows, tile_size):
+        for i_column in range(0, n_columns, tile_size):
+            tile_mask = mask[i_row:i_row + tile_size, i_column:i_column + tile_size]
+            if not tile_mask.any():  # no voids in tile
+                continue
+            # tile with halo (window of pixels at the edges is clipped by dem extent, like zeros outside)
+            row_start = max(i_row - radius, 0)
+            column_start = max(i_column - radius, 0)
+            row_end = min(i_row + tile_size + radius, n_rows)
+            column_end = min(i_column + tile_size + radius, n_columns)
+            halo = (slice(i_row - row_start, i_row - row_start + tile_mask.shape[0]),
+                    slice(i_column - column_start, i_column - column_start + tile_mask.shape[1]))
+            weighted_sum = fftconvolve(values[row_start:row_end, column_start:column_end], kernel, mode="same")
+            weight_sum = fftconvolve(valid[row_start:row_end, column_start:column_end], kernel, mode="same")
+            weighted_sum = weighted_sum[halo][tile_mask]
+            weight_sum = weight_sum[halo][tile_mask]
+            # FFT round-off, no valid pixel in window if sum of weights is below the smallest weight
+            no_valid = weight_sum < min_weight / 2
+            weight_sum[no_valid] = 1
+            filled = weighted_sum / weight_sum
+            filled[no_valid] = np.nan
+            dem[i_row:i_row + tile_size, i_column:i_column + tile_size][tile_mask] = filled
+    return dem
+
+
+def nearest_fill(dem, mask, chunk_size=1000000):
+    """
+    Nearest neighbour interpolation of masked pixels. The nearest valid pixel of a masked pixel always borders a
+    masked pixel, so the K-D Tree is built only from valid pixels on the rim of the voids and queried in chunks
+    (in parallel), memory scales with the voids instead of the whole dem.
+
+    Parameters
+    -------
+    dem : numpy.ndarray
+        Input digital elevation model as 2D numpy array, filled in place.
+    mask : numpy.ndarray
+        2D bool array, True where dem should be filled (np.nan).
+    chunk_size : int
+        Number of masked pixels queried at once.
+
+    Returns
+    -------
+    dem : numpy.ndarray
+        Filled dem.
+    """
+    from scipy.ndimage import binary_dilation
+    from scipy.spatial import cKDTree
+
+    rim = binary_dilation(mask, structure=np.ones((3, 3), dtype=bool)) & ~mask  # valid pixels bordering voids
+    if not rim.any():  # only nan
+        return dem
+    xy_rim = np.transpose(np.nonzero(rim))
+    z_rim = dem[rim]
+    tree = cKDTree(data=xy_rim, leafsize=16)
+    x_bad, y_bad = np.nonzero(mask)
+    for i_start in range(0, x_bad.size, chunk_size):
+        x_chunk = x_bad[i_start:i_start + chunk_size]
+        y_chunk = y_bad[i_start:i_start + chunk_size]
+        nearest = tree.query(np.column_stack((x_chunk, y_chunk)), workers=-1)[1]
+        dem[x_chunk, y_chunk] = z_rim[nearest]
+    return dem
+
+
+def laplace_fill(dem, mask):
+    """
+    Laplace inpainting of masked pixels, each filled pixel is the mean of its 4 neighbours and valid pixels around
+    the voids are the boundary condition (smooth membrane over the void). The sparse linear system has one unknown per
+    masked pixel, so the cost scales with the voids. Voids without any valid neighbour stay np.nan.
+
+    Parameters
+    -------
+    dem : numpy.ndarray
+        Input digital elevation model as 2D numpy array, filled in place.
+    mask : numpy.ndarray
+        2D bool array, True where dem should be filled (np.nan).
+
+    Returns
+    -------
+    dem : numpy.ndarray
+        Filled dem.
+    """
+    from scipy.ndimage import binary_dilation, label
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.linalg import spsolve
+
+    cross = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=bool)
+    labels = label(mask, structure=cross)[0]
+    rim = binary_dilation(mask, structure=cross) & ~mask  # valid pixels bordering voids
+    labels_touching = np.unique(labels[binary_dilation(rim, structure=cross) & mask])
+    solve_mask = mask & np.isin(labels, labels_touching)  # voids with boundary condition
+    n_unknowns = np.count_nonzero(solve_mask)
+    if n_unknowns == 0:
+        return dem
+    i_unknown = np.full(dem.shape, -1, dtype=np.int64)
+    i_unknown[solve_mask] = np.arange(n_unknowns)
+    i_row, i_column = np.nonzero(solve_mask)
+    diagonal = np.zeros(n_unknowns)
+    b = np.zeros(n_unknowns)
+    a_rows = [np.arange(n_unknowns)]
+    a_columns = [np.arange(n_unknowns)]
+    a_values = []
+    for d_row, d_column in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        nb_row = i_row + d_row
+        nb_column = i_column + d_column
+        inside = (nb_row >= 0) & (nb_row < dem.shape[0]) & (nb_column >= 0) & (nb_column < dem.shape[1])
+        diagonal += inside  # outside of dem neighbour is ignored (zero gradient)
+        i_inside = np.flatnonzero(inside)
+        nb_row = nb_row[inside]
+        nb_column = nb_column[inside]
+        nb_void = mask[nb_row, nb_column]
+        a_rows.append(i_inside[nb_void])
+        a_columns.append(i_unknown[nb_row[nb_void], nb_column[nb_void]])
+        a_values.append(-np.ones(np.count_nonzero(nb_void)))
+        b[i_inside[~nb_void]] += dem[nb_row[~nb_void], nb_column[~nb_void]]
+    a_values.insert(0, diagonal)
+    a = csr_matrix((np.concatenate(a_values), (np.concatenate(a_rows), np.concatenate(a_columns))),
+                   shape=(n_unknowns, n_unknowns))
+    dem[i_row, i_column] = spsolve(a.tocsc(), b)
+    return dem
+
+
 def fill_where_nan(dem, method="idw"):
     """
     Replaces np.nan values, with interpolation (extrapolation).
@@ -1586,7 +2303,7 @@ def fill_where_nan(dem, method="idw"):
     -------
     dem : numpy.ndarray
         Input digital elevation model as 2D numpy array.
-    method : {'linear_row', 'idw_r_p', 'kd_tree', 'nearest_neighbour'}
+    method : {'linear_row', 'idw_r_p', 'kd_tree', 'nearest_neighbour', 'laplace'}
         'linear_row', Linear row interpolation, array is flattened and then linear interpolation is performed.
         This method is fast but very inaccurate.
         'idw_r_p', Inverse Distance Weighting interpolation. If you only input idw it will take default parameters
@@ -1594,8 +2311,9 @@ def fill_where_nan(dem, method="idw"):
         idw_5_2 means radius = 5, power = 2.)
         'kd_tree', K-D Tree interpolation.
         'nearest_neighbour', Nearest neighbour interpolation.
+        'laplace', Laplace inpainting (smooth surface over the voids), suitable for large voids.
     """
-    if np.all(~np.isnan(dem)):  # if there is no nan return dem
+    if tile_class(dem, "fill_where_nan") != "voids":  # no nan to fill (or no values to fill from), return dem
         return dem
 
     dem_out = np.copy(dem)
@@ -1611,57 +2329,15 @@ def fill_where_nan(dem, method="idw"):
         if len(method.split("_")) == 3:
             radius = int(method.split("_")[1])
             power = float(method.split("_")[2])
-        nan_idx = zip(*np.where(mask))  # find nan positions
-        for i_row, i_column in nan_idx:  # iterate through nans
-            # nan surrounding array based on radius
-            i_row_start = i_row - radius  # start row idx of nan surrounding
-            i_column_start = i_column - radius  # start col idx of nan surrounding
-            i_row_end = i_row + radius + 1  # end row idx of nan surrounding
-            i_column_end = i_column + radius + 1  # end col idx of nan surrounding
-            # row idx center pixel (nan pixel to idw) of nan surrounding array
-            i_row_center = i_row - i_row_start
-            # col idx center pixel (nan pixel to idw) of nan surrounding array
-            i_column_center = i_column - i_column_start
-            if i_row_start < 0:  # edge
-                i_row_center = i_row
-                i_row_start = 0
-            if i_column_start < 0:  # edge
-                i_column_center = i_column
-                i_column_start = 0
-            if i_row_end > dem.shape[0]:  # edge
-                i_row_end = dem.shape[0]
-            if i_column_end > dem.shape[1]:  # edge
-                i_column_end = dem.shape[0]
-            nan_surrounding_arr = dem[i_row_start:i_row_end, i_column_start:i_column_end]
-            if np.all(np.isnan(nan_surrounding_arr)):  # whole surrounding array is nan
-                dem_out[i_row, i_column] = np.nan
-            else:
-                # calculate distance array (wight matrix)
-                dist_arr = np.ones(nan_surrounding_arr.shape)  # all ones
-                # center pixel is 0 to calc distance matrix around 0 pixel with distance_transform_edt
-                dist_arr[i_row_center, i_column_center] = 0
-                dist_arr = distance_transform_edt(dist_arr)
-                dist_arr[dist_arr == 0] = np.nan  # can't divide with zero
-                dist_arr = 1 / dist_arr ** power
-                nan_mask = np.isnan(nan_surrounding_arr)
-                dist_arr[nan_mask] = 0  # where nan weight matrix is zero
-                # calculate idw for one nan value
-                dem_out[i_row, i_column] = np.nansum(nan_surrounding_arr * dist_arr) / np.nansum(dist_arr)
+        dem_out = idw_fill(dem=dem_out, mask=mask, radius=radius, power=power)
 
     elif method == "kd_tree" or method == "nearest_neighbour" or method == "nearest_neighbor":
-        x, y = np.mgrid[0:dem_out.shape[0], 0:dem_out.shape[1]]
-        xy_good = np.array((x[~mask], y[~mask])).T
-        xy_bad = np.array((x[mask], y[mask])).T
-
-        # cKD-Tree (K-D Tree) interpolation
+        # cKD-Tree (K-D Tree) nearest neighbour interpolation
         # https://stackoverflow.com/questions/3662361/fill-in-missing-values-with-nearest-neighbour-in-python-numpy-masked-arrays
-        if method == "kd_tree":
-            leaf_size = 1000
-            dem_out[mask] = dem_out[~mask][cKDTree(data=xy_good, leafsize=leaf_size).query(xy_bad)[1]]
+        dem_out = nearest_fill(dem=dem_out, mask=mask)
 
-        # Nearest neighbour interpolation
-        elif method == "nearest_neighbour" or method == "nearest_neighbor":
-            dem_out[mask] = griddata(xy_good, dem_out[~mask], xy_bad, method='nearest')
+    elif method == "laplace":
+        dem_out = laplace_fill(dem=dem_out, mask=mask)
 
     else:
         raise Exception("rvt.visualization.fill_where_nan: Wrong method!")
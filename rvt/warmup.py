@@ -0,0 +1,308 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Contains functions for warming up a raster function worker (e.g. ArcGIS Server process) before the first request.
+
+The first tile computed in a new process pays for one-time work: imports of modules needed only by some functions,
+horizon search movements (rvt.vis.horizon_shift_vector), colormap and 8-bit blend lookup tables
+(rvt.blend_func.colormap_lut, rvt.blend_func.blend_lut_8bit). Warm-up evaluates raster function templates (.rft.xml)
+on a small synthetic elevation model tile with the parameters stored in the templates, so all of this is done
+(and cached) before the first user request.
+
+Usage (in the worker process, e.g. from the server startup script):
+    import rvt.warmup
+    rvt.warmup.warm_up()  # all templates in the functions directory
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import glob
+import importlib.util
+import os
+import time
+import xml.etree.ElementTree as ET
+
+# python3 site-packages
+import numpy as np
+
+# Directory with raster function templates (.rft.xml) and python raster function modules
+FUNCTIONS_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+_wrapper_modules = {}  # python raster function module path: module
+
+
+def _local_name(element):
+    return element.tag.split("}")[-1]
+
+
+def _xsi_type(element):
+    return element.get(_XSI_TYPE, "").split(":")[-1]
+
+
+def _child(element, name):
+    for child in element:
+        if _local_name(child) == name:
+            return child
+    return None
+
+
+def _template_value(element):
+    """Converts value element of template (by its xsi:type) to python value, None if empty."""
+    if element is None or element.text is None or element.text.strip() == "":
+        return None
+    value_type = _xsi_type(element)
+    if value_type in ("int", "short", "long"):
+        return int(element.text)
+    elif value_type in ("double", "float"):
+        return float(element.text)
+    elif value_type == "boolean":
+        return element.text.strip().lower() == "true"
+    else:
+        return element.text
+
+
+def parse_template(template_path):
+    """
+    Reads raster function template (.rft.xml) into a tree of functions.
+
+    Parameters
+    ----------
+    template_path : str
+        Path to raster function template.
+
+    Returns
+    -------
+    function : dict
+        Function (root of template), dict with keys:
+            "python_module" : str or None
+                File name of python raster function module (None if function isn't python raster function).
+            "class_name" : str or None
+                Name of python raster function class.
+            "scalars" : dict
+                Scalar arguments (name: value).
+            "rasters" : dict
+                Raster arguments (name: function), function is None for input dataset (elevation model).
+    """
+    root = ET.parse(template_path).getroot()
+    elements_by_id = {}
+    for element in root.iter():
+        if element.get("id") is not None and element.get("href") is None:
+            elements_by_id.setdefault(element.get("id"), element)
+
+    def resolve(element):
+        if element.get("href") is not None:
+            return elements_by_id[element.get("href")]
+        return element
+
+    def parse_raster(element):  # raster argument, function or None (input dataset)
+        element = resolve(element)
+        if _xsi_type(element) == "RasterFunctionVariable":
+            value = _child(element, "Value")
+            if value is not None and _xsi_type(value) == "RasterFunctionTemplate":
+                return parse_function(value)
+            return None
+        return parse_function(element)
+
+    def is_raster(element):
+        element = resolve(element)
+        if _xsi_type(element) == "RasterFunctionTemplate":
+            return True
+        if _xsi_type(element) == "RasterFunctionVariable":
+            value = _child(element, "Value")
+            is_dataset = _child(element, "IsDataset")
+            return (is_dataset is not None and is_dataset.text == "true") or \
+                   (value is not None and _xsi_type(value) == "RasterFunctionTemplate")
+        return False
+
+    def parse_function(template):
+        template = resolve(template)
+        function = resolve(_child(template, "Function"))
+        arguments = resolve(_child(template, "Arguments"))
+        out = {"python_module": None, "class_name": None, "scalars": {}, "rasters": {}}
+        names = [name.text for name in _child(arguments, "Names")]
+        for name, value in zip(names, _child(arguments, "Values")):
+            value = resolve(value)
+            if is_raster(value):
+                out["rasters"][name] = parse_raster(value)
+                continue
+            if _xsi_type(value) == "RasterFunctionVariable":
+                value = _child(value, "Value")
+            if name == "PythonModule":
+                out["python_module"] = os.path.basename(value.text.replace("\\", "/"))
+            elif name == "ClassName":
+                out["class_name"] = value.text
+            else:
+                out["scalars"][name] = _template_value(value)
+        if _xsi_type(function) != "PythonAdapterFunction":  # other (esri) functions, only data flow is needed
+            out["python_module"] = None
+            out["class_name"] = None
+        return out
+
+    return parse_function(root)
+
+
+def synthetic_dem(shape, resolution=1.):
+    """
+    Synthetic elevation model (2D float32 array) of shape, smooth hills with small scale noise and a small void (nan)
+    in the middle, so that also no data handling (e.g. void filling) is triggered.
+    """
+    i_row, i_column = np.ogrid[:shape[0], :shape[1]]
+    dem = 100 + 20 * np.sin(i_row * resolution / 17) * np.cos(i_column * resolution / 23) + \
+        5 * np.sin((i_row + i_column) * resolution / 5)
+    dem = dem + np.random.default_rng(0).random(shape)
+    dem = dem.astype(np.float32)
+    dem[shape[0] // 2 - 1:shape[0] // 2 + 1, shape[1] // 2 - 1:shape[1] // 2 + 1] = np.nan
+    return dem
+
+
+def load_raster_function(python_module, class_name, directory=FUNCTIONS_DIRECTORY):
+    """Creates instance of python raster function class from module (file name) in directory."""
+    module_path = os.path.join(directory, python_module)
+    module = _wrapper_modules.get(module_path)
+    if module is None:
+        if not os.path.isfile(module_path):
+            raise Exception("rvt.warmup.load_raster_function: Python module {} doesn't exist!".format(module_path))
+        spec = importlib.util.spec_from_file_location(os.path.splitext(python_module)[0], module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _wrapper_modules[module_path] = module
+    return getattr(module, class_name)()
+
+
+def configure_function(function, directory=FUNCTIONS_DIRECTORY):
+    """
+    Creates python raster function of function (see parse_template) and configures it (getConfiguration) with template
+    scalars, missing scalars have default values (getParameterInfo). Returns raster function and its padding.
+    """
+    raster_function = load_raster_function(function["python_module"], function["class_name"], directory)
+    scalars = {parameter["name"]: parameter["value"] for parameter in raster_function.getParameterInfo()
+               if parameter["dataType"] != "raster"}
+    scalars.update({name: value for name, value in function["scalars"].items() if value is not None})
+    padding = int(raster_function.getConfiguration(**scalars).get("padding", 0))
+    return raster_function, padding
+
+
+def configure_functions(function, directory=FUNCTIONS_DIRECTORY):
+    """Configures all python raster functions of function (see parse_template) and its inputs."""
+    if function is None:
+        return
+    if function["python_module"] is not None:
+        configure_function(function, directory)
+    for raster in function["rasters"].values():
+        configure_functions(raster, directory)
+
+
+def evaluate_function(function, shape, resolution=1., max_padding=256, directory=FUNCTIONS_DIRECTORY):
+    """
+    Evaluates function (see parse_template) as ArcGIS does (getConfiguration, updateRasterInfo, updatePixels) on
+    synthetic elevation model, inputs are padded for function padding. Functions with padding larger than max_padding
+    (e.g. broad scale of multi-scale topographic position) are only configured, evaluation of the synthetic tile would
+    take longer than the first request.
+
+    Returns
+    -------
+    raster_info, pixels : dict, 3D numpy array
+        Output raster info and pixels (bands, shape[0], shape[1]), None, None if function isn't evaluated.
+    """
+    if function is None:  # input dataset
+        dem = synthetic_dem(shape, resolution)
+        raster_info = {"bandCount": 1, "pixelType": "f4", "noData": None, "cellSize": (resolution, resolution),
+                       "statistics": ({"minimum": float(np.nanmin(dem)), "maximum": float(np.nanmax(dem))},),
+                       "histogram": ()}
+        return raster_info, dem[np.newaxis]
+
+    if function["python_module"] is None:  # other function, passes through its first input (data flow only)
+        rasters = list(function["rasters"].values())
+        return evaluate_function(rasters[0] if rasters else None, shape, resolution, max_padding, directory)
+
+    raster_function, padding = configure_function(function, directory)
+    if padding > max_padding:
+        for raster in function["rasters"].values():
+            configure_functions(raster, directory)
+        return None, None
+    input_shape = (shape[0] + 2 * padding, shape[1] + 2 * padding)
+
+    raster_infos = {}
+    pixel_blocks = {}
+    for parameter in raster_function.getParameterInfo():
+        if parameter["dataType"] != "raster":
+            continue
+        name = parameter["name"]
+        if name in function["rasters"]:
+            raster = function["rasters"][name]
+        else:  # argument names differ from parameter names, take raster arguments in order
+            raster = list(function["rasters"].values())[len(raster_infos)] if function["rasters"] else None
+        raster_infos[name + "_info"], pixel_blocks[name + "_pixels"] = evaluate_function(raster, input_shape,
+                                                                                        resolution, max_padding,
+                                                                                        directory)
+    if any(pixels is None for pixels in pixel_blocks.values()):  # input not evaluated
+        return None, None
+
+    output_info = dict(list(raster_infos.values())[0])
+    output_info = raster_function.updateRasterInfo(output_info=output_info, **raster_infos)["output_info"]
+    # synthetic raster extent is the requested pixel block, its padding is outside
+    props = {"extent": (0., 0., shape[1] * resolution, shape[0] * resolution), "cellSize": (resolution, resolution),
+             "noData": None, "pixelType": output_info["pixelType"]}
+    tlc = (0., shape[0] * resolution)
+    pixels = raster_function.updatePixels(tlc=tlc, shape=shape, props=props, **pixel_blocks)["output_pixels"]
+    if pixels.ndim == 2:  # single band output, ArcGIS passes pixel blocks (bands, rows, columns) to next function
+        pixels = pixels[np.newaxis]
+    return output_info, pixels
+
+
+def warm_up_template(template_path, tile_size=64, resolution=1., max_padding=256, directory=FUNCTIONS_DIRECTORY):
+    """
+    Evaluates raster function template on synthetic elevation model tile (tile_size x tile_size + padding), which
+    fills the caches (lookup tables, horizon search movements) and imports modules needed by its functions.
+    Returns output pixels of template (None if it isn't evaluated, see evaluate_function).
+    """
+    function = parse_template(template_path)
+    _, pixels = evaluate_function(function, (tile_size, tile_size), resolution=resolution, max_padding=max_padding,
+                                  directory=directory)
+    return pixels
+
+
+def warm_up(templates=None, tile_size=64, resolution=1., max_padding=256, directory=FUNCTIONS_DIRECTORY):
+    """
+    Warms up raster functions of templates, so that the first request is computed as fast as the following ones.
+
+    Parameters
+    ----------
+    templates : list of str
+        Paths to raster function templates (.rft.xml), if None all templates in directory are used.
+    tile_size : int
+        Size of synthetic tile (in pixels, without padding).
+    resolution : float
+        Cell size of synthetic elevation model.
+    max_padding : int
+        Functions with larger padding (in pixels) are only configured, not evaluated.
+    directory : str
+        Directory with python raster function modules (and templates).
+
+    Returns
+    -------
+    times : dict
+        Warm-up time in seconds for each template (template file name: seconds).
+    """
+    if templates is None:
+        templates = sorted(glob.glob(os.path.join(directory, "*.rft.xml")))
+    times = {}
+    for template_path in templates:
+        start = time.perf_counter()
+        warm_up_template(template_path, tile_size=tile_size, resolution=resolution, max_padding=max_padding,
+                         directory=directory)
+        times[os.path.basename(template_path)] = time.perf_counter() - start
+    return times
@@ -0,0 +1,151 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+Contains workspace (scratch buffers) which is reused between calls of visualization functions.
+
+ArcGIS calls updatePixels of a raster function many times with pixel blocks of the same shape. Visualization functions
+which take an optional workspace (e.g. rvt.vis.sky_view_factor, rvt.vis.mean_filter) draw their work arrays from it,
+so arrays of the same name, shape and dtype are allocated once and reused for the following pixel blocks. Outputs of
+the functions are never workspace buffers, a buffer is only valid until the next call which uses the workspace.
+
+Usage (raster function holds one workspace per instance):
+    self.workspace = rvt.workspace.Workspace()
+    ...
+    rvt.vis.sky_view_factor(dem=dem, ..., workspace=self.workspace)
+    self.workspace.stats()  # bytes reused versus allocated
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+    Nejc Čož
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+# python libraries
+import threading
+import weakref
+from collections import OrderedDict
+
+# python3 site-packages
+import numpy as np
+
+WORKSPACE_MAX_BYTES = 512 * 2 ** 20  # default max size of buffers kept by one workspace (per thread)
+_workspaces = weakref.WeakSet()  # all workspaces, for workspace_stats
+_workspaces_lock = threading.Lock()
+
+
+class Workspace:
+    """
+    Scratch buffers keyed by (name, shape, dtype), kept between calls. Each thread has its own buffers, so the same
+    workspace can be used by concurrent calls. Least recently used buffers are dropped when buffers of a thread take
+    more than max_bytes.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Max size (in bytes) of buffers kept for one thread, larger buffers are allocated but not kept.
+    """
+
+    def __init__(self, max_bytes=WORKSPACE_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"allocations": 0, "allocated_bytes": 0, "reuses": 0, "reused_bytes": 0}
+        self._held = {}  # thread id: bytes of kept buffers
+        with _workspaces_lock:
+            _workspaces.add(self)
+
+    def _buffers(self):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = OrderedDict()
+            self._local.buffers = buffers
+        return buffers
+
+    def empty(self, name, shape, dtype=np.float32):
+        """Uninitialized buffer of shape and dtype (like np.empty), reused if it was already allocated under name."""
+        dtype = np.dtype(dtype)
+        shape = (int(shape),) if np.isscalar(shape) else tuple(int(size) for size in shape)
+        key = (name, shape, dtype.str)
+        buffers = self._buffers()
+        buffer = buffers.get(key)
+        if buffer is not None:
+            buffers.move_to_end(key)
+            with self._lock:
+                self._stats["reuses"] += 1
+                self._stats["reused_bytes"] += buffer.nbytes
+            return buffer
+        buffer = np.empty(shape, dtype=dtype)
+        with self._lock:
+            self._stats["allocations"] += 1
+            self._stats["allocated_bytes"] += buffer.nbytes
+        if buffer.nbytes <= self.max_bytes:
+            buffers[key] = buffer
+            held = sum(kept.nbytes for kept in buffers.values())
+            while held > self.max_bytes:  # drop least recently used
+                _, dropped = buffers.popitem(last=False)
+                held -= dropped.nbytes
+            with self._lock:
+                self._held[threading.get_ident()] = held
+        return buffer
+
+    def full(self, name, shape, fill_value, dtype=np.float32):
+        """Buffer of shape and dtype filled with fill_value (like np.full), see empty."""
+        buffer = self.empty(name, shape, dtype)
+        buffer.fill(fill_value)
+        return buffer
+
+    def clear(self):
+        """Drops buffers of the calling thread (statistics are kept)."""
+        self._buffers().clear()
+        with self._lock:
+            self._held.pop(threading.get_ident(), None)
+
+    def stats(self):
+        """
+        Workspace statistics.
+
+        Returns
+        -------
+        stats : dict
+            "allocations", "allocated_bytes" : number and size of newly allocated buffers;
+            "reuses", "reused_bytes" : number and size of buffers reused instead of allocated;
+            "held_bytes" : size of buffers kept (all threads).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["held_bytes"] = sum(self._held.values())
+        return stats
+
+
+def empty(workspace, name, shape, dtype=np.float32):
+    """Buffer from workspace (see Workspace.empty), new np.empty array if workspace is None."""
+    if workspace is None:
+        return np.empty(shape, dtype=dtype)
+    return workspace.empty(name, shape, dtype)
+
+
+def full(workspace, name, shape, fill_value, dtype=np.float32):
+    """Buffer from workspace filled with fill_value (see Workspace.full), new np.full array if workspace is None."""
+    if workspace is None:
+        return np.full(shape, fill_value, dtype=dtype)
+    return workspace.full(name, shape, fill_value, dtype)
+
+
+def workspace_stats():
+    """Statistics (see Workspace.stats) summed over all workspaces (e.g. of all raster function instances)."""
+    total = {"allocations": 0, "allocated_bytes": 0, "reuses": 0, "reused_bytes": 0, "held_bytes": 0}
+    with _workspaces_lock:
+        workspaces = list(_workspaces)
+    for workspace in workspaces:
+        for key, value in workspace.stats().items():
+            total[key] += value
+    return total
@@ -0,0 +1,227 @@
+"""
+Relief Visualization Toolbox – Visualization Functions
+
+RVT Sky illumination esri raster function
+rvt_py, rvt.vis.sky_illumination
+
+Credits:
+    Žiga Kokalj (ziga.kokalj@zrc-sazu.si)
+    Krištof Oštir (kristof.ostir@fgg.uni-lj.si)
+    Klemen Zakšek
+    Peter Pehani
+    Klemen Čotar
+    Maja Somrak
+    Žiga Maroh
+
+Copyright:
+    2010-2020 Research Centre of the Slovenian Academy of Sciences and Arts
+    2016-2020 University of Ljubljana, Faculty of Civil and Geodetic Engineering
+"""
+
+import numpy as np
+import rvt.vis
+import rvt.blend_func
+import rvt.stats
+import rvt.padding
+
+
+class RVTSkyIllum:
+    def __init__(self):
+        self.name = "RVT Sky illumination"
+        self.description = "Calculates Sky illumination."
+        # default values
+        self.sky_model = "overcast"
+        self.compute_shadow = False
+        self.max_fine_radius = 100.
+        self.num_directions = 32.
+        self.shadow_az = 315.
+        self.shadow_el = 35.
+        self.multi_band = False
+        self.padding = int(self.max_fine_radius)
+        # 8bit (bytscale) parameters
+        self.calc_8_bit = True
+        self.mode_bytscl = "value"
+        self.min_bytscl = 0
+        self.max_bytscl = 1
+        self.max_bytscl_horizon = 90
+
+    def getParameterInfo(self):
+        return [
+            {
+                'name': 'raster',
+                'dataType': 'raster',
+                'value': None,
+                'required': True,
+                'displayName': "Input Raster",
+                'description': "Input raster for which to create the sky illumination map."
+            },
+            {
+                'name': 'calc_8_bit',
+                'dataType': 'boolean',
+                'value': self.calc_8_bit,
+                'required': False,
+                'displayName': "Calculate 8-bit",
+                'description': "If True it returns 8-bit raster (0-255)."
+            },
+            {
+                'name': 'sky_model',
+                'dataType': 'string',
+                'value': self.sky_model,
+                'required': False,
+                'displayName': "Sky model",
+                'domain': ("overcast", "uniform"),
+                'description': "Sky model, it can be 'overcast' or 'uniform'."
+            },
+            {
+                'name': 'compute_shadow',
+                'dataType': 'boolean',
+                'value': self.compute_shadow,
+                'required': False,
+                'displayName': "Compute shadow",
+                'description': "If True it adds shadow (shaded sky illumination)."
+            },
+            {
+                'name': 'max_fine_radius',
+                'dataType': 'numeric',
+                'value': self.max_fine_radius,
+                'required': False,
+                'displayName': "Max shadow modeling distance",
+                'description': "Max shadow modeling distance in pixels."
+            },
+            {
+                'name': 'num_directions',
+                'dataType': 'numeric',
+                'value': self.num_directions,
+                'required': False,
+                'displayName': "Number of directions",
+                'description': "Number of directions to search for horizon."
+            },
+            {
+                'name': 'shadow_az',
+                'dataType': 'numeric',
+                'value': self.shadow_az,
+                'required': False,
+                'displayName': "Shadow azimuth",
+                'description': "Shadow azimuth in degrees."
+            },
+            {
+                'name': 'shadow_el',
+                'dataType': 'numeric',
+                'value': self.shadow_el,
+                'required': False,
+                'displayName': "Shadow elevation",
+                'description': "Shadow elevation in degrees."
+            },
+            {
+                'name': 'multi_band',
+                'dataType': 'boolean',
+                'value': self.multi_band,
+                'required': False,
+                'displayName': "Multi-band output",
+                'description': "If True it returns 4 bands (uniform, overcast, shadow, horizon) computed in one "
+                               "horizon search."
+            }
+        ]
+
+    def getConfiguration(self, **scalars):
+        self.prepare(sky_model=scalars.get('sky_model'), compute_shadow=scalars.get('compute_shadow'),
+                     max_fine_radius=scalars.get("max_fine_radius"), num_directions=scalars.get("num_directions"),
+                     shadow_az=scalars.get("shadow_az"), shadow_el=scalars.get("shadow_el"),
+                     multi_band=scalars.get("multi_band"), calc_8_bit=scalars.get("calc_8_bit"))
+        return {
+            'compositeRasters': False,
+            'inheritProperties': 2 | 4,
+            'invalidateProperties': 2 | 4 | 8,
+            'inputMask': False,
+            'resampling': False,
+            'padding': self.padding,
+            'resamplingType': 1
+        }
+
+    def updateRasterInfo(self, **kwargs):
+        kwargs['output_info']['noData'] = np.nan
+        if not self.calc_8_bit:
+            kwargs['output_info']['pixelType'] = 'f4'
+        else:
+            kwargs['output_info']['pixelType'] = 'u1'
+        kwargs['output_info']['bandCount'] = 4 if self.multi_band else 1
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        elif self.multi_band:
+            kwargs['output_info']['histogram'] = ()
+            kwargs['output_info']['statistics'] = 3 * ({'minimum': 0, 'maximum': 1},) + \
+                                                  ({'minimum': 0, 'maximum': 90},)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
+        return kwargs
+
+    def updatePixels(self, tlc, shape, props, **pixelBlocks):
+        dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
+        pixel_size = props['cellSize']
+        if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
+            raise Exception("Input raster cell size is invalid.")
+        no_data = props["noData"]
+        if no_data is not None:
+            no_data = props["noData"][0]
+
+        if self.multi_band:
+            outputs = ["uniform", "overcast", "shadow", "horizon"]
+        elif self.compute_shadow:
+            outputs = ["{}_shaded".format(self.sky_model)]
+        else:
+            outputs = [self.sky_model]
+        dict_sky_illum = rvt.vis.sky_illumination(dem=dem, resolution=pixel_size[0], sky_model=self.sky_model,
+                                                  compute_shadow=self.compute_shadow,
+                                                  max_fine_radius=self.max_fine_radius,
+                                                  num_directions=self.num_directions, shadow_az=self.shadow_az,
+                                                  shadow_el=self.shadow_el, no_data=no_data, outputs=outputs,
+                                                  overwrite_dem=True)
+
+        bands = []
+        for output in outputs:
+            band = dict_sky_illum[output][self.padding:-self.padding, self.padding:-self.padding]  # remove padding
+            if self.calc_8_bit:
+                max_bytscl = self.max_bytscl_horizon if output == "horizon" else self.max_bytscl
+                band = rvt.blend_func.normalize_byte_scale(visualization="sky illumination", image=band,
+                                                           min_norm=self.min_bytscl, max_norm=max_bytscl,
+                                                           normalization=self.mode_bytscl, no_data=no_data)
+            bands.append(band)
+        sky_illum = np.array(bands)
+
+        pixelBlocks['output_pixels'] = sky_illum.astype(props['pixelType'], copy=False)
+
+        return pixelBlocks
+
+    def updateKeyMetadata(self, names, bandIndex, **keyMetadata):
+        if bandIndex == -1:
+            if self.multi_band:
+                name = "SIM_D{}_{}px".format(self.num_directions, self.max_fine_radius)
+            else:
+                name = "SIM_{}_D{}_{}px".format(self.sky_model, self.num_directions, self.max_fine_radius)
+                if self.compute_shadow:
+                    name += "_A{}_H{}".format(self.shadow_az, self.shadow_el)
+            if self.calc_8_bit:
+                keyMetadata['datatype'] = 'Processed'
+                name += "_8bit"
+            else:
+                keyMetadata['datatype'] = 'Generic'
+            keyMetadata['productname'] = 'RVT {}'.format(name)
+        elif self.multi_band:
+            band_names = ("uniform", "overcast", "shadow_A{}_H{}".format(self.shadow_az, self.shadow_el),
+                          "horizon_A{}".format(self.shadow_az))
+            if bandIndex < len(band_names):
+                keyMetadata['bandname'] = "SIM_{}".format(band_names[bandIndex])
+        return keyMetadata
+
+    def prepare(self, sky_model="overcast", compute_shadow=False, max_fine_radius=100, num_directions=32,
+                shadow_az=315, shadow_el=35, multi_band=False, calc_8_bit=False):
+        self.sky_model = str(sky_model).lower()
+        self.compute_shadow = bool(compute_shadow)
+        self.max_fine_radius = int(max_fine_radius)
+        self.num_directions = int(num_directions)
+        self.shadow_az = float(shadow_az)
+        self.shadow_el = float(shadow_el)
+        self.multi_band = bool(multi_band)
+        self.padding = int(max_fine_radius)
+        self.calc_8_bit = calc_8_bit
@@ -21,6 +21,8 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
 
 
 class RVTSlope:
@@ -85,13 +87,27 @@ class RVTSlope:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        elif self.output_unit == "degree":
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=90)
+        elif self.output_unit == "radian":
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=np.pi / 2)
+        else:  # percent, statistics of windows sampled from whole input raster
+            rvt.stats.set_output_statistics(kwargs['output_info'], histograms=rvt.stats.output_histograms(
+                kwargs.get('raster'), r, ("slope", self.output_unit),
+                lambda dem: self.sample_visualization(dem, r['cellSize']), padding=self.padding))
         return kwargs
 
+    def sample_visualization(self, dem, pixel_size):
+        """Visualization of window with padding (see rvt.stats.output_histograms), the same as in updatePixels."""
+        slope = rvt.vis.slope_aspect(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
+                                     output_units=self.output_unit, overwrite_dem=True)["slope"]
+        return slope[self.padding:-self.padding, self.padding:-self.padding]
+
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -101,13 +117,13 @@ class RVTSlope:
             no_data = props["noData"][0]
 
         dict_slp_asp = rvt.vis.slope_aspect(dem=dem, resolution_x=pixel_size[0], resolution_y=pixel_size[1],
-                                            output_units=self.output_unit, no_data=no_data)
+                                            output_units=self.output_unit, no_data=no_data,
+                                            overwrite_dem=True)
         slope = dict_slp_asp["slope"][self.padding:-self.padding, self.padding:-self.padding]
         if self.calc_8_bit:
-            slope = rvt.blend_func.normalize_image(visualization="slope gradient", image=slope,
-                                                   min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                   normalization=self.mode_bytscl)
-            slope = rvt.vis.byte_scale(data=slope, no_data=no_data)
+            slope = rvt.blend_func.normalize_byte_scale(visualization="slope gradient", image=slope,
+                                                        min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                        normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = slope.astype(props['pixelType'], copy=False)
 
@@ -127,24 +143,3 @@ class RVTSlope:
     def prepare(self, output_unit=35, calc_8_bit=False):
         self.output_unit = output_unit
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
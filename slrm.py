@@ -21,6 +21,9 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTSlrm:
@@ -30,6 +33,7 @@ class RVTSlrm:
         # default values
         self.radius_cell = 20.
         self.padding = int(self.radius_cell)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
         self.mode_bytscl = "value"
@@ -84,24 +88,33 @@ class RVTSlrm:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:  # statistics of windows sampled from whole input raster
+            rvt.stats.set_output_statistics(kwargs['output_info'], histograms=rvt.stats.output_histograms(
+                kwargs.get('raster'), r, ("slrm", self.radius_cell), self.sample_visualization,
+                padding=self.padding))
         return kwargs
 
+    def sample_visualization(self, dem):
+        """Visualization of window with padding (see rvt.stats.output_histograms), the same as in updatePixels."""
+        slrm = rvt.vis.slrm(dem=dem, radius_cell=self.radius_cell, overwrite_dem=True)
+        return slrm[self.padding:-self.padding, self.padding:-self.padding]
+
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         no_data = props["noData"]
         if no_data is not None:
             no_data = props["noData"][0]
 
-        slrm = rvt.vis.slrm(dem=dem, radius_cell=self.radius_cell, no_data=no_data)
+        slrm = rvt.vis.slrm(dem=dem, radius_cell=self.radius_cell, no_data=no_data, overwrite_dem=True,
+                            workspace=self.workspace)
         slrm = slrm[self.padding:-self.padding, self.padding:-self.padding]
         if self.calc_8_bit:
-            slrm = rvt.blend_func.normalize_image(visualization="simple local relief model", image=slrm,
-                                                  min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                  normalization=self.mode_bytscl)
-            slrm = rvt.vis.byte_scale(data=slrm, no_data=no_data, c_min=0, c_max=1)
+            slrm = rvt.blend_func.normalize_byte_scale(visualization="simple local relief model", image=slrm,
+                                                       min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                       normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = slrm.astype(props['pixelType'], copy=False)
 
@@ -122,24 +135,3 @@ class RVTSlrm:
         self.radius_cell = int(radius_cell)
         self.padding = int(radius_cell)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out
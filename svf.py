@@ -21,6 +21,9 @@ Copyright:
 import numpy as np
 import rvt.vis
 import rvt.blend_func
+import rvt.stats
+import rvt.padding
+import rvt.workspace
 
 
 class RVTSvf:
@@ -32,6 +35,7 @@ class RVTSvf:
         self.max_rad = 10.
         self.noise = "0-don't remove"
         self.padding = int(self.max_rad)
+        self.workspace = rvt.workspace.Workspace()  # scratch buffers reused between pixel blocks
         # 8bit (bytscale) parameters
         self.calc_8_bit = True
         self.mode_bytscl = "value"
@@ -104,13 +108,15 @@ class RVTSvf:
             kwargs['output_info']['pixelType'] = 'f4'
         else:
             kwargs['output_info']['pixelType'] = 'u1'
-        kwargs['output_info']['histogram'] = ()
-        kwargs['output_info']['statistics'] = ()
+        if self.calc_8_bit:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=255)
+        else:
+            rvt.stats.set_output_statistics(kwargs['output_info'], minimum=0, maximum=1)
         return kwargs
 
     def updatePixels(self, tlc, shape, props, **pixelBlocks):
         dem = np.array(pixelBlocks['raster_pixels'], dtype='f4', copy=False)[0]  # Input pixel array.
-        dem = change_0_pad_to_edge_pad(dem, self.padding)
+        dem = rvt.padding.change_0_pad_to_edge_pad(dem, self.padding, tlc=tlc, props=props)
         pixel_size = props['cellSize']
         if (pixel_size[0] <= 0) | (pixel_size[1] <= 0):
             raise Exception("Input raster cell size is invalid.")
@@ -120,13 +126,13 @@ class RVTSvf:
 
         dict_svf = rvt.vis.sky_view_factor(dem=dem, resolution=pixel_size[0], compute_svf=True, compute_asvf=False,
                                            compute_opns=False, svf_n_dir=self.nr_directions, svf_r_max=self.max_rad,
-                                           svf_noise=self.noise, no_data=no_data)
-        svf = dict_svf["svf"][self.padding:-self.padding, self.padding:-self.padding]  # remove padding
+                                           svf_noise=self.noise, no_data=no_data, overwrite_dem=True,
+                                           halo=self.padding, workspace=self.workspace)
+        svf = dict_svf["svf"]  # computed without padding
         if self.calc_8_bit:
-            svf = rvt.blend_func.normalize_image(visualization="sky-view factor", image=svf,
-                                                 min_norm=self.min_bytscl, max_norm=self.max_bytscl,
-                                                 normalization=self.mode_bytscl)
-            svf = rvt.vis.byte_scale(data=svf, no_data=no_data)
+            svf = rvt.blend_func.normalize_byte_scale(visualization="sky-view factor", image=svf,
+                                                      min_norm=self.min_bytscl, max_norm=self.max_bytscl,
+                                                      normalization=self.mode_bytscl, no_data=no_data)
 
         pixelBlocks['output_pixels'] = svf.astype(props['pixelType'], copy=False)
 
@@ -149,33 +155,3 @@ class RVTSvf:
         self.noise = int(noise[0])
         self.padding = int(max_rad)
         self.calc_8_bit = calc_8_bit
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    if np.any(dem[0:pad_width, :]) or np.any(dem[-pad_width:, :]) or\
-            np.any(dem[:, 0:pad_width]) or np.any(dem[:, -pad_width:]):
-        return dem
-    dem = dem[pad_width:-pad_width, pad_width:-pad_width]  # remove esri 0 padding
-    dem = np.pad(array=dem, pad_width=pad_width, mode="edge")  # add new edge padding
-    return dem
-
-
-def change_0_pad_to_edge_pad(dem, pad_width):
-    dem_out = dem.copy()
-    if not np.any(dem[:pad_width, :]):  # if all top padding zeros
-        dem_out = dem_out[pad_width:, :]  # remove esri 0 padding top
-        # pad top
-        dem_out = np.pad(array=dem_out, pad_width=((pad_width,0), (0,0)), mode="edge")
-    if not np.any(dem[-pad_width:, :]):  # if all bottom padding zeros
-        dem_out = dem_out[:-pad_width, :]  # remove esri 0 padding bottom
-        # pad bottom
-        dem_out = np.pad(array=dem_out, pad_width=((0, pad_width), (0, 0)), mode="edge")
-    if not np.any(dem[:, :pad_width]):  # if all left padding zeros
-        dem_out = dem_out[:, pad_width:]  # remove esri 0 padding left
-        # pad left
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (pad_width, 0)), mode="edge")
-    if not np.any(dem[:, -pad_width:]):  # if all right padding zeros
-        dem_out = dem_out[:, :-pad_width]  # remove esri 0 padding right
-        # pad right
-        dem_out = np.pad(array=dem_out, pad_width=((0, 0), (0, pad_width)), mode="edge")
-    return dem_out